@@ -3,6 +3,7 @@ from pathlib import Path
 import pyzx as zx
 import os
 import time
+import tracemalloc
 import multiprocessing as mp
 
 
@@ -88,7 +89,34 @@ def runner(arg):
     sys.stdout.flush()
     return s
 
-if __name__ == '__main__':
+def graph_memory(fname, backends=('simple', 'array')):
+    """Returns the number of bytes per vertex used by the graph of the circuit in ``fname``,
+    after ``full_reduce``, for each of the given graph backends."""
+    g = zx.Circuit.load(fname).to_basic_gates().to_graph()
+    zx.simplify.full_reduce(g)
+    sizes = []
+    for backend in backends:
+        tracemalloc.start()
+        g2 = g.copy(backend=backend)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        sizes.append(size / max(g2.num_vertices(), 1))
+        del g2
+    return g.num_vertices(), g.num_edges(), sizes
+
+def memory_benchmark(fnames, backends=('simple', 'array')):
+    print("Circuit".ljust(30), "vertices".rjust(9), "edges".rjust(9), *(b.rjust(10) for b in backends))
+    for fname in fnames:
+        nv, ne, sizes = graph_memory(fname, backends)
+        print(os.path.basename(fname).ljust(30), str(nv).rjust(9), str(ne).rjust(9),
+              *("{:.0f}".format(s).rjust(10) for s in sizes))
+
+if __name__ == '__main__' and sys.argv[1:2] == ['memory']:
+    # Report the bytes per vertex of the graph backends: python benchmark.py memory [circuit files]
+    fnames = sys.argv[2:] or [os.path.join('circuits', 'QFT_and_Adders', f)
+                              for f in ('QFT32_before', 'Adder32_before', 'QFTAdd32_before')]
+    memory_benchmark(fnames)
+elif __name__ == '__main__':
     circ_dir = Path('circuits')
     dirs = [circ_dir / 'Arithmetic_and_Toffoli',
             circ_dir / 'QFT_and_Adders',
@@ -44,6 +44,8 @@ from . import hsimplify
 from . import d3
 from . import tikz
 from . import simulate
+from . import cache
+from . import profiling
 from . import editor
 from . import routing
 from . import local_search
@@ -0,0 +1,35 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A reproducible benchmark suite for PyZX.
+
+It runs the main routines (parsing, :func:`~pyzx.simplify.full_reduce`,
+:func:`~pyzx.extract.extract_circuit`, :func:`~pyzx.optimize.basic_optimization`,
+:func:`~pyzx.optimize.phase_block_optimize`, :func:`~pyzx.tensor.tensorfy` and routing)
+on the circuits in ``circuits/Fast``, ``circuits/QFT_and_Adders``,
+``circuits/Arithmetic_and_Toffoli`` and on circuits generated with fixed seeds, and
+records the run time, the peak memory and the quality of the output of each.
+The results are stored as JSON, and can be compared to a baseline to catch regressions.
+
+From the command line::
+
+    python -m pyzx bench run -s fast -o baseline.json
+    python -m pyzx bench run -s fast -o new.json --compare baseline.json
+    python -m pyzx bench compare baseline.json new.json --threshold 0.2
+"""
+
+from .suite import Case, Task, SUITES, TASKS, load_cases, circuit_quality
+from .runner import run_task, run_benchmarks, save_results, load_results, compare_results, Regression
@@ -0,0 +1,187 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Running the benchmarks, storing the results as JSON and comparing two sets of results."""
+
+import json
+import time
+import platform
+import datetime
+import tracemalloc
+from typing import Any, Dict, List, Optional, Callable
+
+from .suite import Case, Task, TASKS
+
+__all__ = ['run_task', 'run_benchmarks', 'save_results', 'load_results', 'compare_results', 'Regression']
+
+
+def run_task(task: Task, case: Case, repeat: int=1, memory: bool=True) -> Dict[str, Any]:
+    """Runs ``task`` on ``case`` and returns the result as a dictionary with the keys:
+
+    - ``case``, ``suite``, ``task``: What was run.
+    - ``status``: ``'ok'``, or ``'error'`` in which case ``error`` holds the message.
+    - ``time``: The smallest wall time in seconds of ``repeat`` runs, and ``times`` all of them.
+    - ``peak_memory``: The peak number of bytes allocated by Python during a separate,
+      untimed run (which is slower because of the tracing), if ``memory`` is set.
+    - ``quality``: The measures of the output given by the task, e.g. T-count and 2-qubit count.
+    """
+    result: Dict[str, Any] = {'case': case.name, 'suite': case.suite, 'task': task.name}
+    try:
+        times = []
+        for _ in range(max(repeat, 1)):
+            data = task.prepare(case)
+            start = time.perf_counter()
+            output = task.run(data)
+            times.append(time.perf_counter() - start)
+        result['time'] = min(times)
+        result['times'] = times
+        result['quality'] = task.quality(output)
+        if memory:
+            data = task.prepare(case)
+            tracemalloc.start()
+            try:
+                task.run(data)
+                result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = "{}: {}".format(type(e).__name__, e)
+    return result
+
+def run_benchmarks(cases: List[Case], tasks: Optional[List[str]]=None, repeat: int=1,
+                   memory: bool=True, options: Optional[Dict[str, Any]]=None,
+                   progress: Optional[Callable[[Dict[str, Any]], None]]=None) -> Dict[str, Any]:
+    """Runs every task on every case it applies to, and returns the results together
+    with a description of the environment, in the format stored by :func:`save_results`.
+
+    Args:
+        cases: The cases to run, see :func:`~pyzx.benchmark.suite.load_cases`.
+        tasks: The names of the tasks to run, by default all of :data:`~pyzx.benchmark.suite.TASKS`.
+        repeat: The number of timed runs of each task.
+        memory: Whether to measure the peak memory use in an extra run.
+        options: Options for deciding which tasks apply, such as ``max_tensor_qubits`` and ``max_phase_block_tcount``.
+        progress: Called with every result as soon as it is available.
+    """
+    options = options or {}
+    selected = [TASKS[t] for t in (tasks if tasks is not None else list(TASKS))]
+    results = []
+    for case in cases:
+        for task in selected:
+            try:
+                applies = task.applies(case, options)
+            except Exception:  # The circuit could not be loaded, which run_task reports
+                applies = True
+            if not applies:
+                continue
+            result = run_task(task, case, repeat, memory)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    from .. import __version__
+    return {
+        'pyzx': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'repeat': repeat,
+        'results': results,
+    }
+
+def save_results(results: Dict[str, Any], path: str) -> None:
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1)
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class Regression(object):
+    """A difference between a baseline and a new set of results that is flagged by :func:`compare_results`.
+
+    Attributes:
+        key: ``suite/case:task``.
+        kind: ``'time'``, ``'memory'``, ``'quality'`` or ``'status'``.
+        metric: The name of the quality measure, for quality regressions.
+        old: The value in the baseline.
+        new: The new value.
+    """
+    def __init__(self, key: str, kind: str, old: Any, new: Any, metric: str='') -> None:
+        self.key = key
+        self.kind = kind
+        self.metric = metric
+        self.old = old
+        self.new = new
+
+    def __str__(self) -> str:
+        if self.kind == 'time':
+            return "{}: {:.3f}s -> {:.3f}s ({:+.0%})".format(self.key, self.old, self.new, self.new/self.old - 1)
+        if self.kind == 'memory':
+            return "{}: {:.1f}MB -> {:.1f}MB ({:+.0%})".format(
+                self.key, self.old/2**20, self.new/2**20, self.new/self.old - 1)
+        if self.kind == 'quality':
+            return "{}: {} {} -> {}".format(self.key, self.metric, self.old, self.new)
+        return "{}: {} -> {}".format(self.key, self.old, self.new)
+
+    def __repr__(self) -> str:
+        return "Regression({})".format(str(self))
+
+
+def _by_key(results: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {"{}/{}:{}".format(r['suite'], r['case'], r['task']): r for r in results['results']}
+
+def compare_results(baseline: Dict[str, Any], new: Dict[str, Any], threshold: float=0.25,
+                    min_time: float=0.01, memory_threshold: Optional[float]=None,
+                    quality: bool=True) -> List[Regression]:
+    """Compares new results to a baseline made by :func:`run_benchmarks`, and returns
+    the regressions among the benchmarks present in both.
+
+    Args:
+        baseline: The old results.
+        new: The new results.
+        threshold: A benchmark is flagged when its time grew by more than this fraction.
+        min_time: Differences in time smaller than this many seconds are ignored as noise.
+        memory_threshold: A benchmark is flagged when its peak memory grew by more than this fraction.
+            By default this is ``threshold``.
+        quality: Whether to flag benchmarks whose output got worse, i.e. whose gate count,
+            T-count, 2-qubit count or depth increased.
+    """
+    if memory_threshold is None:
+        memory_threshold = threshold
+    old_results = _by_key(baseline)
+    regressions = []
+    for key, r in _by_key(new).items():
+        if key not in old_results:
+            continue
+        o = old_results[key]
+        if o['status'] == 'ok' and r['status'] != 'ok':
+            regressions.append(Regression(key, 'status', 'ok', r.get('error', r['status'])))
+            continue
+        if o['status'] != 'ok' or r['status'] != 'ok':
+            continue
+        if r['time'] > o['time'] * (1 + threshold) and r['time'] - o['time'] > min_time:
+            regressions.append(Regression(key, 'time', o['time'], r['time']))
+        if 'peak_memory' in o and 'peak_memory' in r and o['peak_memory'] > 0 and \
+                r['peak_memory'] > o['peak_memory'] * (1 + memory_threshold):
+            regressions.append(Regression(key, 'memory', o['peak_memory'], r['peak_memory']))
+        if quality:
+            for metric, v in r['quality'].items():
+                if metric in o['quality'] and v > o['quality'][metric]:
+                    regressions.append(Regression(key, 'quality', o['quality'][metric], v, metric))
+    return regressions
@@ -0,0 +1,232 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The benchmark cases and the tasks that are run on them.
+
+A :class:`Case` is a circuit, either one of the files in the ``circuits`` directory
+of the repository or one generated with a fixed seed by :mod:`pyzx.generate`.
+A :class:`Task` is one of the routines of PyZX. It prepares its input from the
+circuit outside of the timed region, runs, and reports the quality of its output.
+"""
+
+import os
+import random
+import functools
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..circuit import Circuit
+from ..circuit.gates import ZPhase
+from ..graph.base import BaseGraph
+from .. import generate
+from ..simplify import full_reduce, tcount
+from ..extract import extract_circuit
+from ..optimize import basic_optimization, phase_block_optimize
+from ..tensor import tensorfy
+from ..routing.architecture import create_architecture, SQUARE
+from ..routing.parity_maps import CNOT_tracker
+from ..routing.steiner import steiner_gauss
+from ..routing.phase_poly import route_phase_poly
+
+__all__ = ['Case', 'Task', 'SUITES', 'TASKS', 'load_cases', 'circuit_quality']
+
+SUITES = {
+    'fast': 'Fast',
+    'qft': 'QFT_and_Adders',
+    'arith': 'Arithmetic_and_Toffoli',
+    'generated': None,
+}
+"""The names of the suites, and the subdirectory of ``circuits`` they come from."""
+
+
+class Case(object):
+    """A circuit to benchmark.
+
+    Args:
+        name: A name that is unique within the suite.
+        suite: The name of the suite, one of the keys of :data:`SUITES`.
+        load: Returns the circuit. Generated circuits are the same on every call.
+        path: The file the circuit is read from, if any.
+        kind: ``'circuit'`` for general circuits, ``'cnots'`` for CNOT circuits and
+            ``'phase_poly'`` for CNOT+phase circuits. The last two can be routed.
+    """
+    def __init__(self, name: str, suite: str, load: Callable[[], Circuit],
+                 path: Optional[str]=None, kind: str='circuit') -> None:
+        self.name = name
+        self.suite = suite
+        self.load = load
+        self.path = path
+        self.kind = kind
+        self._qubits: Optional[int] = None
+
+    @property
+    def key(self) -> str:
+        return self.suite + '/' + self.name
+
+    @property
+    def qubits(self) -> int:
+        if self._qubits is None:
+            self._qubits = self.load().qubits
+        return self._qubits
+
+    def __repr__(self) -> str:
+        return "Case({})".format(self.key)
+
+
+def is_input_circuit(fname: str) -> bool:
+    """Whether a file of the corpus is an unoptimized circuit, rather than the
+    result of some other optimizer such as ``_after_heavy`` or ``_tpar`` files."""
+    if 'after' in fname or 'tpar' in fname:
+        return False
+    return 'before' in fname or os.path.splitext(fname)[1] in ('.qc', '.qasm', '.tfc')
+
+def _file_cases(suite: str, directory: str) -> List[Case]:
+    cases = []
+    for fname in sorted(os.listdir(directory)):
+        path = os.path.join(directory, fname)
+        if not os.path.isfile(path) or not is_input_circuit(fname):
+            continue
+        name = fname[:-7] if fname.endswith('_before') else fname
+        cases.append(Case(name, suite, functools.partial(Circuit.load, path), path))
+    return cases
+
+def _seeded(seed: int, f: Callable[[], Circuit]) -> Callable[[], Circuit]:
+    def load() -> Circuit:
+        random.seed(seed)
+        np.random.seed(seed)
+        return f()
+    return load
+
+def _cnot_circuit(qubits: int, depth: int) -> Circuit:
+    c = CNOT_tracker(qubits)
+    generate.build_random_parity_map(qubits, depth, circuit=c)
+    return c
+
+def _generated_cases() -> List[Case]:
+    s = 'generated'
+    cases = []
+    for q, d in ((8, 200), (16, 500), (32, 1000)):
+        cases.append(Case('cnot_had_phase_{}x{}'.format(q, d), s,
+                          _seeded(q, functools.partial(generate.CNOT_HAD_PHASE_circuit, q, d, p_had=0.2, p_t=0.2))))
+    for q in (8, 16):
+        cases.append(Case('qft_{}'.format(q), s, functools.partial(generate.qft, q)))
+    for q, d in ((9, 100), (16, 250)):
+        cases.append(Case('cnots_{}x{}'.format(q, d), s, _seeded(q, functools.partial(_cnot_circuit, q, d)),
+                          kind='cnots'))
+    for q, layers in ((9, 5), (16, 5)):
+        cases.append(Case('phase_poly_{}x{}'.format(q, layers), s,
+                          _seeded(q, functools.partial(generate.phase_poly, q, layers, 2 * q)),
+                          kind='phase_poly'))
+    return cases
+
+def default_circuit_dir() -> str:
+    """The ``circuits`` directory of a checkout of the repository."""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'circuits')
+
+def load_cases(suites: Optional[List[str]]=None, circuit_dir: Optional[str]=None) -> List[Case]:
+    """Returns the cases of the given suites (by default all of them).
+    The circuit files are looked up in ``circuit_dir``, by default the ``circuits``
+    directory of the repository."""
+    if suites is None:
+        suites = list(SUITES)
+    if circuit_dir is None:
+        circuit_dir = default_circuit_dir()
+    cases: List[Case] = []
+    for s in suites:
+        if s not in SUITES:
+            raise ValueError("Unknown suite '{}', pick from {}".format(s, ', '.join(SUITES)))
+        subdir = SUITES[s]
+        if subdir is None:
+            cases.extend(_generated_cases())
+        else:
+            cases.extend(_file_cases(s, os.path.join(circuit_dir, subdir)))
+    return cases
+
+
+def is_clifford_t(c: Circuit) -> bool:
+    """Whether the basic gates of the circuit are Clifford+T, as required by
+    :func:`~pyzx.optimize.phase_block_optimize`."""
+    for g in c.to_basic_gates().gates:
+        if g.name in ('CNOT', 'CZ', 'HAD'):
+            continue
+        if not isinstance(g, ZPhase) or g.phase.denominator not in (1, 2, 4):
+            return False
+    return True
+
+def circuit_quality(c: Circuit) -> Dict[str, int]:
+    """The measures of quality of a circuit recorded by the benchmarks."""
+    c = c.to_basic_gates()
+    return {'gates': len(c.gates), 'tcount': c.tcount(), 'twoqubit': c.twoqubitcount(), 'depth': c.depth()}
+
+def graph_quality(g: BaseGraph) -> Dict[str, int]:
+    return {'vertices': g.num_vertices(), 'edges': g.num_edges(), 'tcount': tcount(g)}
+
+
+class Task(object):
+    """A routine to benchmark.
+
+    Args:
+        name: The name of the task.
+        prepare: Turns the circuit of a case into the input of ``run``. This is not timed.
+        run: The routine that is timed. It may modify its input.
+        quality: Measures the output of ``run``.
+        applies: Whether the task should be run on a case, given the options of the run.
+    """
+    def __init__(self, name: str, prepare: Callable[[Case], Any], run: Callable[[Any], Any],
+                 quality: Callable[[Any], Dict[str, int]],
+                 applies: Callable[[Case, Dict[str, Any]], bool]=lambda case, options: True) -> None:
+        self.name = name
+        self.prepare = prepare
+        self.run = run
+        self.quality = quality
+        self.applies = applies
+
+    def __repr__(self) -> str:
+        return "Task({})".format(self.name)
+
+
+def _reduced_graph(case: Case) -> BaseGraph:
+    g = case.load().to_basic_gates().to_graph()
+    full_reduce(g)
+    return g
+
+def _route(data: Tuple[str, Circuit]) -> Circuit:
+    kind, c = data
+    arch = create_architecture(SQUARE, n_qubits=c.qubits)
+    if kind == 'cnots':
+        assert isinstance(c, CNOT_tracker)
+        tracker = CNOT_tracker(c.qubits)
+        steiner_gauss(c.matrix.copy(), arch, full_reduce=True, y=tracker)
+        return tracker
+    return route_phase_poly(c, arch)
+
+TASKS: Dict[str, Task] = {t.name: t for t in [
+    Task('parse', lambda case: case.path, lambda path: Circuit.load(path), circuit_quality,
+         lambda case, options: case.path is not None),
+    Task('full_reduce', lambda case: case.load().to_basic_gates().to_graph(),
+         lambda g: (full_reduce(g), g)[1], graph_quality),
+    Task('extract_circuit', _reduced_graph, extract_circuit, circuit_quality),
+    Task('basic_optimization', lambda case: case.load().to_basic_gates(), basic_optimization, circuit_quality),
+    Task('phase_block_optimize', lambda case: case.load().to_basic_gates(), phase_block_optimize, circuit_quality,
+         lambda case, options: case.load().tcount() <= options.get('max_phase_block_tcount', 120)
+                               and is_clifford_t(case.load())),
+    Task('tensorfy', lambda case: case.load().to_graph(), tensorfy, lambda t: {},
+         lambda case, options: case.qubits <= options.get('max_tensor_qubits', 10)),
+    Task('routing', lambda case: (case.kind, case.load()), _route, circuit_quality,
+         lambda case, options: case.kind in ('cnots', 'phase_poly')),
+]}
+"""The tasks, by name."""
@@ -0,0 +1,187 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements a persistent on-disk cache for the results of the
+optimization routines, so that running the same pipeline on the same circuit again
+only costs a file read.
+
+Entries are content-addressed: the key is a SHA-256 hash of a canonical description
+of the input (the QASM of a circuit, or the JSON of a graph with its vertices
+renumbered), the name of the routine, its options and the version of PyZX.
+Each entry is a single file in the cache directory. When the total size of the
+entries exceeds the configured bound, the least recently used ones are removed.
+
+For instance::
+
+    cache = ResultCache('.pyzx_cache')
+    c2 = cached_full_optimize(c, cache)   # Computed and stored
+    c2 = cached_full_optimize(c, cache)   # Read from disk
+
+The ``pyzx opt`` script accepts a ``--cache`` directory to cache its whole pipeline.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from typing import Any, Dict, Optional, Tuple, List
+
+from .circuit import Circuit
+from .graph.base import BaseGraph, VT, ET
+from .graph.jsonparser import json_to_graph
+from . import simplify
+from . import optimize
+
+__all__ = ['ResultCache', 'circuit_hash', 'graph_hash',
+           'cached_full_optimize', 'cached_full_reduce']
+
+
+def _version() -> str:
+    from . import __version__
+    return __version__
+
+def circuit_hash(circuit: Circuit) -> str:
+    """Returns a hash of the qubit count and gate list of the circuit. Circuits that
+    produce the same QASM description get the same hash."""
+    return hashlib.sha256(circuit.to_qasm().encode('utf-8')).hexdigest()
+
+def graph_hash(g: BaseGraph[VT,ET]) -> str:
+    """Returns a hash of the graph, its inputs, outputs, phases and scalar. The vertices
+    are renumbered consecutively first, so that the labels left over from earlier rewrites
+    do not matter. The layout (qubit and row positions) is ignored."""
+    g = g.copy()
+    types, phases = g.types(), g.phases()
+    vs = [(types[v], str(phases[v])) for v in g.vertices()]
+    es = sorted((*sorted(g.edge_st(e)), g.edge_type(e)) for e in g.edges())
+    data = [vs, es, list(g.inputs()), list(g.outputs()), g.scalar.to_json()]
+    return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """A directory of cached results with a bound on its total size.
+
+    Args:
+        directory: Where to store the entries. It is created if it does not exist.
+        max_bytes: The maximal total size of the entries. When a new entry makes
+            the cache larger than this, the least recently used entries are removed.
+
+    Attributes:
+        hits: The number of successful lookups by this object.
+        misses: The number of failed lookups by this object.
+    """
+    suffix = '.entry'
+
+    def __init__(self, directory: str, max_bytes: int=256*1024*1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, kind: str, input_hash: str, config: Optional[Dict[str, Any]]=None) -> str:
+        """Returns the key of the result of routine ``kind`` with options ``config``
+        applied to the input with hash ``input_hash``."""
+        data = [kind, input_hash, sorted((config or {}).items()), _version()]
+        return hashlib.sha256(json.dumps(data, default=str).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the stored entry or ``None``. A hit marks the entry as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """Stores an entry and evicts old entries if the cache has become too large.
+        The file is written under a temporary name first, so that concurrent readers
+        never see a partial entry."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(value)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """Returns ``(last use, size, path)`` for every entry, least recently used first."""
+        result = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.suffix): continue
+            try:
+                st = entry.stat()
+            except OSError: # Removed by another process
+                continue
+            result.append((st.st_mtime, st.st_size, entry.path))
+        result.sort()
+        return result
+
+    def size(self) -> int:
+        """The total size in bytes of the entries."""
+        return sum(s for _, s, _ in self.entries())
+
+    def evict(self) -> int:
+        """Removes the least recently used entries until the total size is at most
+        ``max_bytes``. Returns the number of removed entries."""
+        entries = self.entries()
+        total = sum(s for _, s, _ in entries)
+        removed = 0
+        for _, s, path in entries:
+            if total <= self.max_bytes: break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= s
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        for _, _, path in self.entries():
+            os.remove(path)
+
+
+def cached_full_optimize(circuit: Circuit, cache: ResultCache, quiet: bool=True) -> Circuit:
+    """Same as :func:`~pyzx.optimize.full_optimize`, but looks up the result in ``cache``
+    first and stores it there if it was not present."""
+    key = cache.key('full_optimize', circuit_hash(circuit))
+    value = cache.get(key)
+    if value is not None:
+        return Circuit.from_qasm(value)
+    c = optimize.full_optimize(circuit, quiet=quiet)
+    cache.put(key, c.to_qasm())
+    return c
+
+def cached_full_reduce(g: BaseGraph[VT,ET], cache: ResultCache, quiet: bool=True) -> BaseGraph:
+    """Returns the graph that :func:`~pyzx.simplify.full_reduce` turns ``g`` into, using
+    ``cache`` to look up or store the result. Unlike :func:`~pyzx.simplify.full_reduce`
+    this does not modify ``g``."""
+    key = cache.key('full_reduce', graph_hash(g), {'backend': g.backend})
+    value = cache.get(key)
+    if value is not None:
+        return json_to_graph(value, g.backend)
+    h = g.copy()
+    simplify.full_reduce(h, quiet=quiet)
+    cache.put(key, h.to_json())
+    return h
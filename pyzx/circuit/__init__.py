@@ -100,6 +100,23 @@ class Circuit(object):
         else:
             return False
 
+    def verify_equality_random(self, other: 'Circuit', up_to_swaps: bool = False, up_to_global_phase: bool = True,
+                               trials: int = 3) -> bool:
+        """Simulates both circuits on ``trials`` random product states and returns whether
+        they produce the same output states. This is much faster than :meth:`verify_equality` and
+        also works when the ZX-diagram does not reduce to the identity, but it takes memory
+        exponential in the number of qubits. See :class:`~pyzx.circuit.statevector.EquivalenceChecker`
+        for checking many circuits with caching.
+
+        Args:
+            other: the circuit to compare equality to.
+            up_to_swaps: if set to True, only checks equality up to a permutation of the input or the output qubits.
+            up_to_global_phase: if set to False, the global phases of the circuits should also be equal.
+            trials: the number of random input states.
+        """
+        from .statevector import random_equivalence
+        return random_equivalence(self, other, up_to_swaps, up_to_global_phase, trials)
+
     def add_gate(self, gate: Union[Gate,str], *args, **kwargs) -> None:
         """Adds a gate to the circuit. ``gate`` can either be
         an instance of a :class:`Gate`, or it can be the name of a gate,
@@ -0,0 +1,376 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements a statevector simulator for circuits. It applies the
+gates of a :class:`~pyzx.circuit.Circuit` directly to a vector of 2^n amplitudes,
+instead of building the 2^n x 2^n unitary through the ZX-diagram as
+:meth:`~pyzx.circuit.Circuit.to_matrix` does, so that it can handle circuits of 25 or
+more qubits, memory permitting (a state of 25 qubits takes 512MB)::
+
+    state = simulate(circuit)                      # Starting from |0...0>
+    state = simulate(circuit, random_state(n))     # Starting from any state
+
+Before simulating, consecutive gates are fused into blocks acting on a few qubits
+(see :func:`fuse_gates`), so that the state is traversed once per block instead of once
+per gate. Diagonal gates, such as phase gates, CZ and CCZ, are fused into larger
+diagonal blocks, which are applied by an in-place elementwise multiplication.
+
+The :class:`EquivalenceChecker` uses this to compare circuits on random input states.
+
+The amplitudes are ordered as in :meth:`~pyzx.circuit.Circuit.to_matrix`, with the first qubit
+as the most significant bit. Gates are simulated up to the global phase introduced by
+their decomposition into basic gates.
+"""
+
+import hashlib
+import itertools
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Set
+
+import numpy as np
+
+from . import Circuit
+from .gates import Gate, ZPhase, XPhase, HAD, CNOT, CZ
+from ..tensor import _basic_gate_matrix
+
+__all__ = ['FusedGate', 'fuse_gates', 'simulate', 'apply_gates', 'random_state', 'random_stabilizer_state',
+           'EquivalenceChecker', 'random_equivalence']
+
+CHUNK = 2**18
+"""The number of amplitudes that a dense gate is applied to at a time."""
+
+
+class FusedGate(object):
+    """A block of gates acting on a few qubits.
+
+    Attributes:
+        qubits: The qubits the block acts on, in increasing order.
+        diagonal: Whether the block is a diagonal matrix.
+        matrix: The 2^k x 2^k unitary of the block if it is not diagonal, or its
+            diagonal of 2^k entries if it is, with the first qubit as the most significant bit.
+        size: The number of gates in the block.
+    """
+    def __init__(self, qubits: Tuple[int, ...], diagonal: bool, matrix: np.ndarray, size: int) -> None:
+        self.qubits = qubits
+        self.diagonal = diagonal
+        self.matrix = matrix
+        self.size = size
+
+    def __repr__(self) -> str:
+        return "FusedGate({}, {}{} gates)".format(self.qubits, 'diagonal, ' if self.diagonal else '', self.size)
+
+
+def _apply_dense(state: np.ndarray, qubits: Tuple[int, ...], m: np.ndarray) -> None:
+    """Applies the 2^k x 2^k matrix ``m`` to the axes ``qubits`` of ``state``, in place.
+    The other axes are processed in chunks, so that the temporary arrays are small."""
+    k = len(qubits)
+    v = np.moveaxis(state, qubits, list(range(k)))
+    rest = v.ndim - k
+    r = 0
+    size = v.size >> k
+    while size > CHUNK and r < rest:
+        size >>= 1
+        r += 1
+    for idx in itertools.product(*[range(d) for d in v.shape[k:k+r]]):
+        w = v[(slice(None),)*k + idx]
+        w[...] = (m @ w.reshape(2**k, -1)).reshape(w.shape)
+
+def _apply_diagonal(state: np.ndarray, qubits: Tuple[int, ...], d: np.ndarray) -> None:
+    """Multiplies ``state`` in place with the diagonal ``d`` on the axes ``qubits``, which are increasing."""
+    shape = [1]*state.ndim
+    for q in qubits: shape[q] = 2
+    np.multiply(state, d.reshape(shape), out=state)
+
+def _gate_op(g: Gate) -> Optional[Tuple[Tuple[int, ...], np.ndarray]]:
+    """Returns the qubits a gate acts on and its unitary, or None if it is the identity."""
+    if isinstance(g, (ZPhase, XPhase, HAD, CNOT)) or type(g) is CZ:
+        return _basic_gate_matrix(g)
+    ops = [_basic_gate_matrix(b) for b in g.to_basic_gates()]
+    if not ops: return None
+    qubits = tuple(sorted(set(q for qs, _ in ops for q in qs)))
+    return qubits, _compose(qubits, ops)
+
+def _compose(qubits: Tuple[int, ...], ops: List[Tuple[Tuple[int, ...], np.ndarray]]) -> np.ndarray:
+    """Returns the unitary on ``qubits`` of the gates ``ops``, applied from first to last."""
+    k = len(qubits)
+    pos = {q: i for i, q in enumerate(qubits)}
+    u = np.eye(2**k, dtype=complex).reshape((2,)*k + (2**k,))
+    for qs, m in ops:
+        _apply_dense(u, tuple(pos[q] for q in qs), m)
+    return u.reshape(2**k, 2**k)
+
+def _is_diagonal(m: np.ndarray) -> bool:
+    return bool(np.abs(m - np.diag(np.diagonal(m))).max() < 1e-12)
+
+def _embed_diagonal(qubits: Tuple[int, ...], ops: List[Tuple[Tuple[int, ...], np.ndarray]]) -> np.ndarray:
+    """Returns the product of the diagonal gates ``ops`` as a diagonal on ``qubits``."""
+    k = len(qubits)
+    pos = {q: i for i, q in enumerate(qubits)}
+    d = np.ones((2,)*k, dtype=complex)
+    for qs, m in ops:
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        diag = np.diagonal(m).reshape((2,)*len(qs)).transpose(order)
+        shape = [1]*k
+        for q in qs: shape[pos[q]] = 2
+        d *= diag.reshape(shape)
+    return d.reshape(-1)
+
+def fuse_gates(circuit: Circuit, max_qubits: int=5, max_diagonal_qubits: int=10) -> List[FusedGate]:
+    """Groups the gates of the circuit into blocks that act on at most ``max_qubits`` qubits.
+
+    Every gate is added to the last block acting on any of its qubits, if the block then acts
+    on at most ``max_qubits`` qubits. This is correct because the gates that come after that
+    block in the circuit do not act on the qubits of the gate. Diagonal gates are fused with
+    diagonal blocks as long as these act on at most ``max_diagonal_qubits`` qubits, since a
+    diagonal takes only 2^k entries. Gates that can't be fused start a new block.
+
+    Raises:
+        TypeError: If the circuit contains a gate that is not unitary, or has symbolic phases.
+    """
+    blocks: List[Tuple[Set[int], bool, List[Tuple[Tuple[int, ...], np.ndarray]]]] = []
+    last: Dict[int, int] = {}  # The last block acting on each qubit
+    for g in circuit.gates:
+        op = _gate_op(g)
+        if op is None: continue
+        qs, m = op
+        diagonal = _is_diagonal(m)
+        b = max((last[q] for q in qs if q in last), default=-1)
+        if b >= 0:
+            block_qubits, block_diagonal, ops = blocks[b]
+            limit = max_diagonal_qubits if diagonal and block_diagonal else max_qubits
+            if len(block_qubits.union(qs)) <= limit:
+                block_qubits.update(qs)
+                ops.append((qs, m))
+                blocks[b] = (block_qubits, diagonal and block_diagonal, ops)
+                for q in qs: last[q] = b
+                continue
+        blocks.append((set(qs), diagonal, [(qs, m)]))
+        for q in qs: last[q] = len(blocks) - 1
+
+    fused = []
+    for qubit_set, diagonal, ops in blocks:
+        qubits = tuple(sorted(qubit_set))
+        if diagonal:
+            fused.append(FusedGate(qubits, True, _embed_diagonal(qubits, ops), len(ops)))
+        else:
+            fused.append(FusedGate(qubits, False, _compose(qubits, ops), len(ops)))
+    return fused
+
+def apply_gates(state: np.ndarray, gates: List[FusedGate]) -> np.ndarray:
+    """Applies the blocks made by :func:`fuse_gates` to a state of shape ``(2,)*n``, in place,
+    and returns the state. The state may have extra axes after the first n, to apply the
+    gates to several states at once."""
+    for g in gates:
+        if g.diagonal:
+            _apply_diagonal(state, g.qubits, g.matrix)
+        else:
+            _apply_dense(state, g.qubits, g.matrix)
+    return state
+
+def simulate(circuit: Circuit, state: Optional[np.ndarray]=None, inplace: bool=False,
+             max_qubits: int=5, max_diagonal_qubits: int=10) -> np.ndarray:
+    """Returns the state that the circuit maps ``state`` to.
+
+    Args:
+        circuit: The circuit to simulate. It should consist of unitary gates.
+        state: A vector of 2^n amplitudes, where n is the number of qubits of the circuit.
+            By default this is the all-zero state.
+        inplace: Whether to modify ``state`` itself, which saves a copy of the state.
+        max_qubits: See :func:`fuse_gates`.
+        max_diagonal_qubits: See :func:`fuse_gates`.
+    """
+    n = circuit.qubits
+    if state is None:
+        state = np.zeros(2**n, dtype=complex)
+        state[0] = 1
+    elif state.size != 2**n:
+        raise ValueError("The state has {} amplitudes, while the circuit has {} qubits".format(state.size, n))
+    elif not inplace or state.dtype != complex:
+        state = state.astype(complex)
+    gates = fuse_gates(circuit, max_qubits, max_diagonal_qubits)
+    return apply_gates(state.reshape((2,)*n), gates).reshape(-1)
+
+def random_state(qubits: int, seed: Optional[int]=None, product: bool=False) -> np.ndarray:
+    """Returns a random normalized state of the given number of qubits, either uniformly random or,
+    if ``product`` is set, a product of random single-qubit states."""
+    rng = np.random.default_rng(seed)
+    if not product:
+        state = rng.normal(size=2**qubits) + 1j*rng.normal(size=2**qubits)
+        return state / np.linalg.norm(state)
+    state = np.ones(1, dtype=complex)
+    for _ in range(qubits):
+        v = rng.normal(size=2) + 1j*rng.normal(size=2)
+        state = np.kron(state, v / np.linalg.norm(v))
+    return state
+
+def random_stabilizer_state(qubits: int, seed: Optional[int]=None) -> np.ndarray:
+    """Returns the state that a random Clifford circuit of depth ``4*qubits`` maps the all-zero state to."""
+    rng = np.random.default_rng(seed)
+    c = Circuit(qubits)
+    for _ in range(4*qubits):
+        for q in range(qubits):
+            r = rng.integers(3)
+            if r == 1: c.add_gate('HAD', q)
+            elif r == 2: c.add_gate('S', q)
+        perm = rng.permutation(qubits)
+        for i in range(0, qubits - 1, 2):
+            c.add_gate('CNOT', int(perm[i]), int(perm[i+1]))
+    return simulate(c)
+
+
+def _circuit_key(c: Circuit) -> str:
+    data = [c.qubits] + [(type(g).__name__, sorted((k, str(v)) for k, v in vars(g).items())) for g in c.gates]
+    return hashlib.sha256(repr(data).encode('utf-8')).hexdigest()
+
+def _qubit_signature(states: List[np.ndarray], qubits: int) -> np.ndarray:
+    """For every qubit, the probability of measuring it as 1 in each of the states."""
+    sig = np.empty((qubits, len(states)))
+    for t, s in enumerate(states):
+        probs = np.abs(s.reshape((2,)*qubits))**2
+        for q in range(qubits):
+            sig[q, t] = probs.sum(axis=tuple(i for i in range(qubits) if i != q))[1]
+    return sig
+
+
+class EquivalenceChecker(object):
+    """Checks whether circuits are equal by simulating them on a few random input states.
+
+    This is a cheap probabilistic alternative to :meth:`~pyzx.circuit.Circuit.verify_equality`,
+    for instance to check every result of an optimization pipeline before a slower check.
+    If the circuits implement different unitaries, a random product state tells them apart
+    with probability 1, so that a False answer is definite (up to numerical tolerance) while
+    a True answer is very strong evidence. Random stabilizer states are cheaper to reason
+    about but form a finite set, so they can miss differences, e.g. in T gates.
+
+    The output states of every circuit are cached, so that checking many circuits against
+    the same original simulates the original only once::
+
+        checker = EquivalenceChecker()
+        results = [checker.check(original, c) for c in optimized_circuits]
+
+    Args:
+        trials: The number of random input states.
+        states: ``'product'`` for random product states, or ``'stabilizer'`` for random stabilizer states.
+        seed: The seed for the random input states. These are the same for all circuits with the same number of qubits.
+        max_cache_bytes: The maximal total size of the cached output states.
+
+    Attributes:
+        hits: The number of times the output states of a circuit were found in the cache.
+        misses: The number of times a circuit had to be simulated.
+    """
+    def __init__(self, trials: int=3, states: str='product', seed: int=0, max_cache_bytes: int=2**28) -> None:
+        if states not in ('product', 'stabilizer'):
+            raise ValueError("Unknown kind of states '{}', pick from product, stabilizer".format(states))
+        self.trials = trials
+        self.states = states
+        self.seed = seed
+        self.max_cache_bytes = max_cache_bytes
+        self.hits = 0
+        self.misses = 0
+        self._inputs: Dict[int, List[np.ndarray]] = {}
+        self._cache: 'OrderedDict[str, List[np.ndarray]]' = OrderedDict()
+        self._cache_bytes = 0
+
+    def inputs(self, qubits: int) -> List[np.ndarray]:
+        """The input states used for circuits with the given number of qubits."""
+        if qubits not in self._inputs:
+            seeds = np.random.SeedSequence([self.seed, qubits]).generate_state(self.trials)
+            if self.states == 'product':
+                self._inputs[qubits] = [random_state(qubits, int(s), product=True) for s in seeds]
+            else:
+                self._inputs[qubits] = [random_stabilizer_state(qubits, int(s)) for s in seeds]
+        return self._inputs[qubits]
+
+    def outputs(self, c: Circuit) -> List[np.ndarray]:
+        """The states the circuit maps the input states to."""
+        key = _circuit_key(c)
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self.misses += 1
+        # The input states are simulated together, as an extra last axis of the state
+        states = np.stack(self.inputs(c.qubits), axis=-1).reshape((2,)*c.qubits + (self.trials,))
+        apply_gates(states, fuse_gates(c))
+        outputs = [states[..., t].reshape(-1) for t in range(self.trials)]
+        size = sum(s.nbytes for s in outputs)
+        if size <= self.max_cache_bytes:
+            self._cache[key] = outputs
+            self._cache_bytes += size
+            while self._cache_bytes > self.max_cache_bytes:
+                _, old = self._cache.popitem(last=False)
+                self._cache_bytes -= sum(s.nbytes for s in old)
+        return outputs
+
+    def clear(self) -> None:
+        """Removes the cached output states."""
+        self._cache.clear()
+        self._cache_bytes = 0
+
+    def check(self, c1: Circuit, c2: Circuit, up_to_swaps: bool=False,
+              up_to_global_phase: bool=True, atol: float=1e-8) -> bool:
+        """Returns whether the circuits map every input state to the same output state.
+
+        Args:
+            c1: The first circuit.
+            c2: The second circuit.
+            up_to_swaps: If True, the outputs or the inputs of ``c2`` may be a permutation of those
+                of ``c1``, as in the circuits made by ``extract_circuit(g, up_to_perm=True)``.
+            up_to_global_phase: If False, the circuits should also have the same global phase.
+            atol: The tolerance on the inner product of the output states.
+        """
+        if c1.qubits != c2.qubits: return False
+        s1 = self.outputs(c1)
+        s2 = self.outputs(c2)
+        if not up_to_swaps:
+            return self._equal(s1, s2, up_to_global_phase, atol)
+        if self._equal_up_to_permutation(s1, s2, c1.qubits, up_to_global_phase, atol):
+            return True
+        # If c2 = c1 P with P a permutation of the inputs, then c2^dagger = P^dagger c1^dagger
+        return self._equal_up_to_permutation(self.outputs(c1.adjoint()), self.outputs(c2.adjoint()),
+                                             c1.qubits, up_to_global_phase, atol)
+
+    def _equal_up_to_permutation(self, s1: List[np.ndarray], s2: List[np.ndarray], n: int,
+                                 up_to_global_phase: bool, atol: float) -> bool:
+        # A qubit of s2 can only be a permutation of a qubit of s1 with the same probabilities
+        sig1 = _qubit_signature(s1, n)
+        sig2 = _qubit_signature(s2, n)
+        candidates = [[i for i in range(n) if np.allclose(sig1[i], sig2[j], atol=1e-6)] for j in range(n)]
+        tried = 0
+        for perm in itertools.product(*candidates):
+            if len(set(perm)) < n: continue
+            tried += 1
+            if tried > 1000: break
+            permuted = [s.reshape((2,)*n).transpose(perm).reshape(-1) for s in s1]
+            if self._equal(permuted, s2, up_to_global_phase, atol):
+                return True
+        return False
+
+    def _equal(self, s1: List[np.ndarray], s2: List[np.ndarray], up_to_global_phase: bool, atol: float) -> bool:
+        phase = None
+        for a, b in zip(s1, s2):
+            z = np.vdot(a, b)
+            if abs(abs(z) - 1) > atol: return False
+            if phase is None: phase = z
+            elif abs(z - phase) > atol: return False
+        return up_to_global_phase or phase is None or abs(phase - 1) <= atol
+
+
+def random_equivalence(c1: Circuit, c2: Circuit, up_to_swaps: bool=False, up_to_global_phase: bool=True,
+                       trials: int=3, states: str='product', seed: int=0) -> bool:
+    """Checks whether two circuits are equal by simulating them on ``trials`` random input states.
+    See :class:`EquivalenceChecker`, which also caches the output states of the circuits."""
+    return EquivalenceChecker(trials, states, seed).check(c1, c2, up_to_swaps, up_to_global_phase)
@@ -15,21 +15,26 @@
 # limitations under the License.
 
 __all__ = ['extract_circuit', 'extract_simple', 'graph_to_swaps', 'extract_clifford_normal_form',
-           'lookahead_extract_base', 'lookahead_full', 'lookahead_fast', 'lookahead_extract']
+           'lookahead_extract_base', 'lookahead_full', 'lookahead_fast', 'lookahead_extract', 'anytime_extract']
 
 from fractions import Fraction
 import itertools
+import time
+import multiprocessing
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 
 from .utils import EdgeType, VertexType, toggle_edge
-from .linalg import Mat2, Z2
+from .linalg import Mat2, Z2, _pack
 from .simplify import id_simp, tcount,full_reduce
 from .rules import apply_rule, pivot, match_spider_parallel, spider
 from .circuit import Circuit
 from .circuit.gates import Gate, ParityPhase, CNOT, HAD, ZPhase, XPhase, CZ, XCX, SWAP, InitAncilla
 
 from .graph.base import BaseGraph, VT, ET
+from . import profiling
+from .profiling import profiled
 
-from typing import List, Optional, Tuple, Dict, Set, Union, Iterator
+from typing import List, Optional, Tuple, Dict, Set, Union, Iterator, Iterable, Generic, Any, Callable
 
 
 def bi_adj(g: BaseGraph[VT,ET], vs:List[VT], ws:List[VT]) -> Mat2:
@@ -42,16 +47,120 @@ def connectivity_from_biadj(
         m: Mat2, 
         left:List[VT], 
         right: List[VT], 
-        edgetype:EdgeType=EdgeType.HADAMARD):
+        edgetype:EdgeType=EdgeType.HADAMARD,
+        rows: Optional[Iterable[int]]=None):
     """Replace the connectivity in ``g`` between the vertices in ``left`` and ``right``
-    by the biadjacency matrix ``m``. The edges will be of type ``edgetype``."""
-    for i in range(len(right)):
+    by the biadjacency matrix ``m``. The edges will be of type ``edgetype``.
+    If ``rows`` is given, only the connectivity of the vertices ``right[i]`` for ``i`` in
+    ``rows`` is updated."""
+    for i in (range(len(right)) if rows is None else rows):
         for j in range(len(left)):
             if m.data[i][j] and not g.connected(right[i],left[j]):
                 g.add_edge((right[i],left[j]),edgetype)
             elif not m.data[i][j] and g.connected(right[i],left[j]):
                 g.remove_edge(g.edge(right[i],left[j]))
 
+class ExtractStats(object):
+    """Counters for the bookkeeping of :func:`extract_circuit`. Pass an instance as the
+    ``stats`` argument to see how much of the biadjacency matrix between the frontier
+    and its neighbours was carried over between iterations instead of rebuilt."""
+    def __init__(self) -> None:
+        self.iterations = 0
+        self.full_rebuilds = 0
+        self.rows_rebuilt = 0
+        self.rows_reused = 0
+    def __str__(self) -> str:
+        total = self.rows_rebuilt + self.rows_reused
+        return ("{:d} iterations, {:d} full rebuilds, {:d} of {:d} rows reused ({:.1%})".format(
+            self.iterations, self.full_rebuilds, self.rows_reused, total,
+            self.rows_reused / total if total else 0))
+
+
+class FrontierMatrix(Generic[VT, ET]):
+    """The biadjacency matrix between the frontier and its neighbours, kept up to date
+    across the iterations of :func:`extract_circuit` instead of being rebuilt every time.
+
+    Rows are stored per frontier vertex and columns per neighbour. Row operations done on
+    the matrix returned by :meth:`update` (as :func:`apply_cnots` does) act on the stored
+    rows directly. The other changes to the graph are picked up by :meth:`update`:
+    rows of vertices that left the frontier are dropped, rows of new frontier vertices
+    are built, and columns are added and removed as the set of neighbours changes.
+    Any other change to the connectivity of a frontier vertex, such as a pivot removing a
+    phase gadget, has to be reported with :meth:`invalidate`, or :meth:`reset`."""
+    def __init__(self, stats: Optional[ExtractStats]=None) -> None:
+        self.rows: Optional[Dict[VT, List[Z2]]] = None
+        self.neighbors: List[VT] = []
+        self.col: Dict[VT, int] = {}
+        self.dirty: Set[VT] = set()
+        self.stats = stats if stats is not None else ExtractStats()
+
+    def reset(self) -> None:
+        """Rebuilds the whole matrix at the next update."""
+        self.rows = None
+
+    def invalidate(self, vertices: Iterable[VT]) -> None:
+        """Rebuilds the rows of the given vertices at the next update."""
+        self.dirty.update(vertices)
+
+    def _build_row(self, g: BaseGraph[VT,ET], v: VT) -> List[Z2]:
+        row: List[Z2] = [0]*len(self.neighbors)
+        col = self.col
+        for w in g.neighbors(v):
+            if w in col: row[col[w]] = 1
+        self.stats.rows_rebuilt += 1
+        return row
+
+    def update(self, g: BaseGraph[VT,ET], frontier: List[VT], neighbor_set: Set[VT]) -> Tuple[Mat2, List[VT]]:
+        """Brings the matrix up to date with the graph and returns it with the list of
+        neighbours labelling its columns. The rows are in the order of ``frontier``."""
+        self.stats.iterations += 1
+        if self.rows is None:
+            self.stats.full_rebuilds += 1
+            self.neighbors = list(neighbor_set)
+            self.col = {w: j for j, w in enumerate(self.neighbors)}
+            self.rows = {}
+        rows = self.rows
+        fset = set(frontier)
+        for v in list(rows):
+            if v not in fset: del rows[v]
+        dirty, self.dirty = self.dirty, set()
+        removed = [j for j, w in enumerate(self.neighbors) if w not in neighbor_set]
+        if removed:
+            for j in removed:
+                # A neighbour that became a frontier vertex leaves behind edges to other
+                # frontier vertices that clean_frontier has already removed. Otherwise the
+                # rows that were connected to it have changed in some other way.
+                if self.neighbors[j] in fset: continue
+                dirty.update(v for v, row in rows.items() if row[j])
+            for row in rows.values():
+                for j in reversed(removed): del row[j]
+            self.neighbors = [w for w in self.neighbors if w in neighbor_set]
+            self.col = {w: j for j, w in enumerate(self.neighbors)}
+        added = [w for w in neighbor_set if w not in self.col]
+        if added:
+            for w in added:
+                self.col[w] = len(self.neighbors)
+                self.neighbors.append(w)
+            for row in rows.values(): row.extend([0]*len(added))
+            for w in added:
+                j = self.col[w]
+                for v in g.neighbors(w):
+                    if v in rows: rows[v][j] = 1
+        for v in frontier:
+            if v not in rows or v in dirty:
+                rows[v] = self._build_row(g, v)
+            else:
+                self.stats.rows_reused += 1
+        return Mat2([rows[v] for v in frontier]), self.neighbors
+
+    def row_add(self, frontier: List[VT], r0: int, r1: int) -> None:
+        """Adds the row of ``frontier[r0]`` to that of ``frontier[r1]``. Used when the row
+        operations were done on a copy of the matrix with its columns permuted."""
+        assert self.rows is not None
+        row0, row1 = self.rows[frontier[r0]], self.rows[frontier[r1]]
+        row1[:] = [1 if a != b else 0 for a, b in zip(row0, row1)]
+
+
 def streaming_extract(
         g:BaseGraph[VT,ET], 
         optimize_czs:bool=True, 
@@ -82,120 +191,234 @@ def permutation_as_swaps(perm:Dict[int,int]) -> List[Tuple[int,int]]:
     return swaps
 
 
-def column_optimal_swap(m: Mat2) -> Dict[int,int]:
-    """Given a matrix m, tries to find a permutation of the columns such that
+def column_optimal_swap(m: Mat2, weighted: bool = False) -> Dict[int,int]:
+    """Given a matrix m, finds a permutation of the columns such that
     there are as many ones on the diagonal as possible. 
     This reduces the number of row operations needed to do Gaussian elimination.
+
+    The ones are placed with a maximum bipartite matching between the rows and the columns
+    (see :func:`max_bipartite_matching`), which takes polynomial time. If ``weighted`` is set,
+    among all the maximum matchings one is picked whose pivot columns have the fewest ones
+    in total, since every other one in a pivot column has to be removed with a row operation
+    (see :func:`min_weight_matching`).
+    Returns a dictionary that sends each column to its new position.
     """
     r, c = m.rows(), m.cols()
-    connections:  Dict[int,Set[int]] = {i: set() for i in range(r)}
-    connectionsr: Dict[int,Set[int]] = {j: set() for j in range(c)}
-
-    for i in range(r):
-            for j in range(c):
-                if m.data[i][j]: 
-                    connections[i].add(j)
-                    connectionsr[j].add(i)
-
-    target = _find_targets(connections, connectionsr)
-    if target is None: target = dict()
-    #target = {v:k for k,v in target.items()}
+    adj = [[j for j in range(c) if m.data[i][j]] for i in range(min(r, c))]
+    if weighted:
+        col_weights = [sum(m.data[i][j] for i in range(r)) for j in range(c)]
+        match = min_weight_matching(adj, c, [[col_weights[j] for j in row] for row in adj])
+    else:
+        match = max_bipartite_matching(adj, c)
+    target = {j: i for i, j in enumerate(match) if j != -1}
     left = list(set(range(c)).difference(target.values()))
     right = list(set(range(c)).difference(target.keys()))
     for i in range(len(left)):
         target[right[i]] = left[i]
     return target
 
-def _find_targets(
-        conn: Dict[int,Set[int]],
-        connr: Dict[int,Set[int]],
-        target:Dict[int,int]={}
-        ) -> Optional[Dict[int,int]]:
-    """Helper function for :func:`column_optimal_swap`.
-    Recursively makes a choice for a permutation that places additional ones on the diagonal.
-    Backtracks when it gets stuck in an unfavorable configuration."""
-    target = target.copy()
-    r = len(conn)
-    c = len(connr)
-
-    claimedcols = set(target.keys())
-    claimedrows = set(target.values())
+def max_bipartite_matching(adj: List[List[int]], cols: int) -> List[int]:
+    """Finds a maximum matching in a bipartite graph with the Hopcroft-Karp algorithm,
+    in time O(E sqrt(V)). Used in :func:`column_optimal_swap`.
+
+    Args:
+        adj: for every left vertex (row), the right vertices (columns) it is connected to
+        cols: the number of right vertices
 
+    Returns:
+        For every row the column it is matched with, or -1 if it is unmatched.
+    """
+    rows = len(adj)
+    match_r = [-1] * rows
+    match_c = [-1] * cols
     while True:
-        min_index = -1
-        min_options = set(range(1000))
-        for i in range(r):
-            if i in claimedrows: continue
-            s = conn[i] - claimedcols # The free columns
-            if len(s) == 1:
-                j = s.pop()
-                target[j] = i
-                claimedcols.add(j)
-                claimedrows.add(i)
-                break
-            if len(s) == 0: return None # contradiction
-            found_col = False
-            for j in s:
-                t = connr[j] - claimedrows
-                if len(t) == 1: # j can only be connected to i
-                    target[j] = i
-                    claimedcols.add(j)
-                    claimedrows.add(i)
-                    found_col = True
+        # Breadth-first search for the layers of the shortest augmenting paths
+        dist = [-1] * rows
+        queue = [i for i in range(rows) if match_r[i] == -1]
+        for i in queue:
+            dist[i] = 0
+        found = False
+        for i in queue:  # The queue grows while we iterate over it
+            for j in adj[i]:
+                i2 = match_c[j]
+                if i2 == -1:
+                    found = True
+                elif dist[i2] == -1:
+                    dist[i2] = dist[i] + 1
+                    queue.append(i2)
+        if not found:
+            return match_r
+        # Depth-first search for disjoint augmenting paths along the layers, without recursion
+        pos = [0] * rows
+        for s in range(rows):
+            if match_r[s] != -1:
+                continue
+            stack = [s]
+            path: List[int] = []
+            while stack:
+                i = stack[-1]
+                if pos[i] == len(adj[i]):
+                    dist[i] = -1  # Dead end
+                    stack.pop()
+                    if path:
+                        path.pop()
+                    continue
+                j = adj[i][pos[i]]
+                pos[i] += 1
+                i2 = match_c[j]
+                if i2 == -1:
+                    path.append(j)
+                    for i3, j3 in zip(stack, path):
+                        match_r[i3] = j3
+                        match_c[j3] = i3
                     break
-            if found_col: break
-            if len(s) < len(min_options):
-                min_index = i
-                min_options = s
-        else: # Didn't find any forced choices
-            if not (conn.keys() - claimedrows): # we are done
-                return target
-            if min_index == -1: raise ValueError("This shouldn't happen ever")
-            # Start depth-first search
-            tgt = target.copy()
-            #print("backtracking on", min_index)
-            for i2 in min_options:
-                #print("trying option", i2)
-                tgt[i2] = min_index
-                new_target = _find_targets(conn, connr, tgt)
-                if new_target: return new_target
-            #print("Unsuccessful")
-            return target
+                if dist[i2] == dist[i] + 1:
+                    stack.append(i2)
+                    path.append(j)
+
+def min_weight_matching(adj: List[List[int]], cols: int, weights: List[List[int]]) -> List[int]:
+    """Finds a maximum matching in a bipartite graph that has the smallest total weight among
+    the maximum matchings, with the Hungarian algorithm in time O(rows^2 cols).
+    Used in :func:`column_optimal_swap`.
+
+    Args:
+        adj: for every left vertex (row), the right vertices (columns) it is connected to
+        cols: the number of right vertices, which should be at least the number of rows
+        weights: the non-negative weight of every edge, in the same layout as ``adj``
+
+    Returns:
+        For every row the column it is matched with, or -1 if it is unmatched.
+    """
+    rows = len(adj)
+    # Missing edges get a cost larger than any matching made of edges, so that the number of edges is maximal
+    missing = sum(max(w, default=0) for w in weights) + 1
+    cost = [[missing] * cols for _ in range(rows)]
+    for i in range(rows):
+        for j, w in zip(adj[i], weights[i]):
+            cost[i][j] = w
+    # Potentials u, v and the row assigned to each column, with a dummy column `cols`
+    u: List[float] = [0] * (rows + 1)
+    v: List[float] = [0] * (cols + 1)
+    assigned = [-1] * (cols + 1)
+    for i in range(rows):
+        assigned[cols] = i
+        j0 = cols
+        minv = [float('inf')] * (cols + 1)
+        way = [cols] * (cols + 1)
+        used = [False] * (cols + 1)
+        while assigned[j0] != -1:
+            used[j0] = True
+            i0 = assigned[j0]
+            delta = float('inf')
+            j1 = cols
+            for j in range(cols):
+                if not used[j]:
+                    cur = cost[i0][j] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(cols + 1):
+                if used[j]:
+                    u[assigned[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+        while j0 != cols:
+            j1 = way[j0]
+            assigned[j0] = assigned[j1]
+            j0 = j1
+    match_r = [-1] * rows
+    for j in range(cols):
+        i = assigned[j]
+        if i != -1 and cost[i][j] != missing:
+            match_r[i] = j
+    return match_r
 
 
 def xor_rows(l1: List[Z2], l2: List[Z2]) -> List[Z2]:
     return [0 if l1[i]==l2[i] else 1 for i in range(len(l1))]
 
 
-def find_minimal_sums(m: Mat2, reversed_search=False) -> Optional[Tuple[int, ...]]:
+def _popcount(x: int) -> int:
+    return bin(x).count('1')
+
+
+def _unit_in_span(rows: List[int], n: int) -> bool:
+    """Whether some vector with a single 1 among the first ``n`` bits is a sum of the bitset ``rows``."""
+    basis: Dict[int, int] = {}  # highest bit -> basis vector
+    for v in rows:
+        while v:
+            h = v.bit_length() - 1
+            if h not in basis:
+                basis[h] = v
+                break
+            v ^= basis[h]
+    for j in range(n):
+        v = 1 << j
+        while v:
+            h = v.bit_length() - 1
+            if h not in basis:
+                break
+            v ^= basis[h]
+        if not v:
+            return True
+    return False
+
+
+def find_minimal_sums(m: Mat2, reversed_search=False, max_combinations: int = 200000) -> Optional[Tuple[int, ...]]:
     """Returns a list of rows in m that can be added together to reduce one of the rows so that
-    it only contains a single 1. Used in :func:`greedy_reduction`"""
+    it only contains a single 1. Used in :func:`greedy_reduction`
+
+    The rows are packed into ints, and a meet-in-the-middle search finds a smallest such list:
+    a list of ``k`` rows is found by looking up, for every combination of ``k//2`` rows, whether
+    adding a unit vector to its sum gives the sum of one of the combinations of ``k - k//2`` rows.
+    Combinations earlier in the order of the rows are preferred, and ``reversed_search`` reverses
+    this order. The search gives up and returns None when a level of the search would have more
+    than ``max_combinations`` combinations, or straight away when no such list exists."""
     r = m.rows()
-    d = m.data
-    if any(sum(r) == 1 for r in d):
+    n = m.cols()
+    packed = _pack(m.data)
+    if any(_popcount(v) == 1 for v in packed):
         return tuple()
-    combs:  Dict[Tuple[int, ...], List[Z2]] = {(i,): d[i] for i in range(r)}
-    combs2: Dict[Tuple[int, ...], List[Z2]] = {}
-    iterations = 0
+    if not _unit_in_span(packed, n):
+        return None
+    order = list(range(r - 1, -1, -1)) if reversed_search else list(range(r))
+    vals = [packed[i] for i in order]
+    units = [1 << j for j in range(n)]
+    # levels[s] holds the combinations of s rows (as positions in order) and their sums,
+    # tables[s] maps each sum to the first combination with that sum
+    levels: List[List[Tuple[Tuple[int, ...], int]]] = [[((), 0)]]
+    tables: List[Dict[int, Tuple[int, ...]]] = [{0: ()}]
+    k = 1
     while True:
-        combs2 = {}
-        for index, l in combs.items():
-            max_index: int = max(index)
-            rr: range = range(max_index + 1, r) if not reversed_search else range(r - 1, max_index, -1)
-            for k in rr:
-                # Unrolled xor_rows(combs[index],d[k])
-                row: List[Z2] = [0 if v1 == v2 else 1 for v1, v2 in zip(combs[index], d[k])]
-                # row = xor_rows(combs[index],d[k])
-                if sum(row) == 1:
-                    return (*index, k)
-                combs2[(*index, k)] = row
-                iterations += 1
-            if iterations > 100000:
+        # There is no solution with fewer than k rows. If the two halves of a solution of
+        # k rows overlapped, leaving out the overlap would give a smaller one, so they don't.
+        k += 1
+        a, b = k // 2, k - k // 2
+        while len(levels) <= b:
+            level = []
+            for combo, x in levels[-1]:
+                for i in range(combo[-1] + 1 if combo else 0, r):
+                    level.append(((*combo, i), x ^ vals[i]))
+                if len(level) > max_combinations:
+                    return None
+            if not level:
                 return None
-        if not combs2:
-            return None
-            # raise ValueError("Irreducible input has been given")
-        combs = combs2
+            table: Dict[int, Tuple[int, ...]] = {}
+            for combo, x in level:
+                table.setdefault(x, combo)
+            levels.append(level)
+            tables.append(table)
+        table = tables[b]
+        for combo, x in levels[a]:
+            for u in units:
+                other = table.get(x ^ u)
+                if other is not None:
+                    return tuple(sorted(order[i] for i in combo + other))
 
 
 def greedy_reduction(m: Mat2) -> Optional[List[Tuple[int, int]]]:
@@ -205,8 +428,8 @@ def greedy_reduction(m: Mat2) -> Optional[List[Tuple[int, int]]]:
     indicest = find_minimal_sums(m)
     if indicest is None: return indicest
     indices = list(indicest)
-    rows = {i:m.data[i] for i in indices}
-    weights: Dict[int,int] = {i: sum(r) for i,r in rows.items()}
+    rows = dict(zip(indices, _pack(m.data[i] for i in indices)))
+    weights: Dict[int,int] = {i: _popcount(r) for i,r in rows.items()}
     result = []
     while len(indices)>1:
         best = (-1,-1)
@@ -214,7 +437,7 @@ def greedy_reduction(m: Mat2) -> Optional[List[Tuple[int, int]]]:
         for i in indices:
             for j in indices:
                 if j <= i: continue
-                w = sum(xor_rows(rows[i],rows[j]))
+                w = _popcount(rows[i] ^ rows[j])
                 if weights[i] - w > reduction:
                     best = (j,i) # "Add row j to i"
                     reduction = weights[i] - w
@@ -223,7 +446,7 @@ def greedy_reduction(m: Mat2) -> Optional[List[Tuple[int, int]]]:
                     reduction = weights[j] - w
         result.append(best)
         control, target = best
-        rows[target] = xor_rows(rows[control],rows[target])
+        rows[target] = rows[control] ^ rows[target]
         weights[target] = weights[target] - reduction
         indices.remove(control)
     return result
@@ -239,8 +462,8 @@ def flat_indices(m: Mat2, indices: List[int]) -> Tuple[List[Tuple[int, int]], in
     If the list of indices is empty, returns ([], -1)"""
     if len(indices) == 0:
         return [], -1
-    rows = {i: m.data[i] for i in indices}
-    weights: Dict[int,int] = {i: sum(r) for i, r in rows.items()}
+    rows = dict(zip(indices, _pack(m.data[i] for i in indices)))
+    weights: Dict[int,int] = {i: _popcount(r) for i, r in rows.items()}
     result = []
     next_indices = []
     while len(indices) > 1:
@@ -249,7 +472,7 @@ def flat_indices(m: Mat2, indices: List[int]) -> Tuple[List[Tuple[int, int]], in
         for i in indices:
             for j in indices:
                 if j <= i: continue
-                w = sum(xor_rows(rows[i], rows[j]))
+                w = _popcount(rows[i] ^ rows[j])
                 if weights[i] - w > reduction:
                     best = (j, i)  # "Add row j to i"
                     reduction = weights[i] - w
@@ -258,7 +481,7 @@ def flat_indices(m: Mat2, indices: List[int]) -> Tuple[List[Tuple[int, int]], in
                     reduction = weights[j] - w
         result.append(best)
         control, target = best
-        rows[target] = xor_rows(rows[control], rows[target])
+        rows[target] = rows[control] ^ rows[target]
         weights[target] = weights[target] - reduction
         indices.remove(control)
         indices.remove(target)
@@ -287,17 +510,17 @@ def find_2_minimal_sums(m: Mat2) -> Optional[Tuple[Tuple[int, ...], Tuple[int, .
     """Returns two lists of rows in m that can be added together to reduce two of the rows so that
     they only contains a single 1. Used in :func:`greedy_two_reduction`"""
     r = m.rows()
-    d = m.data
-    combs:  Dict[Tuple[int, ...], List[Z2]] = {(i,): d[i] for i in range(r)}
-    combs2: Dict[Tuple[int, ...], List[Z2]]
+    d = _pack(m.data)
+    combs:  Dict[Tuple[int, ...], int] = {(i,): d[i] for i in range(r)}
+    combs2: Dict[Tuple[int, ...], int]
     sum1: Optional[Tuple[int, ...]] = None
     iterations = 0
     while True:
         combs2 = {}
         for index, l in combs.items():
-            for k in range(max(index)+1, r):
-                row: List[Z2] = [0 if v1 == v2 else 1 for v1, v2 in zip(combs[index], d[k])]
-                if sum(row) == 1:
+            for k in range(index[-1]+1, r):
+                row = l ^ d[k]
+                if row and not row & (row - 1):  # A single 1
                     if sum1 is None:
                         sum1 = (*index, k)
                     else:
@@ -459,7 +682,8 @@ def apply_cnots(g: BaseGraph[VT, ET], c: Circuit, frontier: List[VT], qubit_map:
         for cnot in cnots2:
             m.row_add(cnot.target, cnot.control)
             cnots.append(CNOT(qubit_map[frontier[cnot.control]], qubit_map[frontier[cnot.target]]))
-        connectivity_from_biadj(g, m, neighbors, frontier)
+        # Only the rows that were added to have changed
+        connectivity_from_biadj(g, m, neighbors, frontier, rows=set(cnot.control for cnot in cnots2))
 
     good_verts = dict()
     for i, row in enumerate(m.data):
@@ -572,14 +796,18 @@ def neighbors_of_frontier(g: BaseGraph[VT, ET], frontier: List[VT]) -> Set[VT]:
 
 
 def remove_gadget(g: BaseGraph[VT, ET], frontier: List[VT], qubit_map: Dict[VT, int],
-                  neighbor_set: Set[VT], gadgets: Dict[VT, VT]) -> bool:
-    """Removes a gadget that is attached to a frontier vertex. Returns True if such gadget was found, False otherwise"""
+                  neighbor_set: Set[VT], gadgets: Dict[VT, VT], changed: Optional[Set[VT]] = None) -> bool:
+    """Removes a gadget that is attached to a frontier vertex. Returns True if such gadget was found, False otherwise.
+    If ``changed`` is given, the vertices whose neighbourhood is changed by the pivots are added to it."""
     removed_gadget = False
     outputs = g.outputs()
     for w in neighbor_set:
         if w not in gadgets: continue
         for v in g.neighbors(w):
             if v in frontier:
+                if changed is not None:
+                    changed.update(g.neighbors(v))
+                    changed.update(g.neighbors(w))
                 apply_rule(g, pivot, [((w, v), ([], [o for o in g.neighbors(v) if o in outputs]))])  # type: ignore
                 frontier.remove(v)
                 del gadgets[w]
@@ -590,12 +818,14 @@ def remove_gadget(g: BaseGraph[VT, ET], frontier: List[VT], qubit_map: Dict[VT,
     return removed_gadget
 
 
+@profiled('extract_circuit')
 def extract_circuit(
         g: BaseGraph[VT, ET],
         optimize_czs: bool = True,
         optimize_cnots: int = 2,
         up_to_perm: bool = False,
-        quiet: bool = True
+        quiet: bool = True,
+        stats: Optional[ExtractStats] = None
         ) -> Circuit:
     """Given a graph put into semi-normal form by :func:`~pyzx.simplify.full_reduce`, 
     it extracts its equivalent set of gates into an instance of :class:`~pyzx.circuit.Circuit`.
@@ -608,6 +838,8 @@ def extract_circuit(
         optimize_cnots: (0,1,2,3) Level of CNOT optimization to apply.
         up_to_perm: If true, returns a circuit that is equivalent to the given graph up to a permutation of the inputs.
         quiet: Whether to print detailed output of the extraction process.
+        stats: An optional :class:`ExtractStats` that counts how much of the
+            biadjacency matrix of the frontier was reused between iterations.
 
     Warning:
         Note that this function changes the graph `g` in place. 
@@ -638,28 +870,40 @@ def extract_circuit(
 
     czs_saved = 0
     q: Union[float, int]
+    fm: FrontierMatrix[VT, ET] = FrontierMatrix(stats)
+    prof = profiling.active
+    t = 0.0
     
     while True:
+        if prof is not None: t = prof.clock()
         # preprocessing
         czs_saved += clean_frontier(g, c, frontier, qubit_map, optimize_czs)
+        if prof is not None: t = prof.lap('clean_frontier', t)
         
         # Now we can proceed with the actual extraction
         # First make sure that frontier is connected in correct way to inputs
         neighbor_set = neighbors_of_frontier(g, frontier)
+        if prof is not None: t = prof.lap('neighbors_of_frontier', t)
         
         if not frontier:
             break  # No more vertices to be processed. We are done.
         
         # First we check if there is a phase gadget in the way
-        if remove_gadget(g, frontier, qubit_map, neighbor_set, gadgets):
+        changed: Set[VT] = set()
+        removed = remove_gadget(g, frontier, qubit_map, neighbor_set, gadgets, changed)
+        if prof is not None: t = prof.lap('remove_gadget', t)
+        if removed:
             # There was a gadget in the way. Go back to the top
+            fm.invalidate(changed)
             continue
             
-        neighbors = list(neighbor_set)
-        m = bi_adj(g, neighbors, frontier)
+        m, neighbors = fm.update(g, frontier, neighbor_set)
+        if prof is not None: t = prof.lap('frontier_matrix', t)
+        permuted = False
         if all(sum(row) != 1 for row in m.data):  # No easy vertex
             if optimize_cnots > 1:
                 greedy_operations = greedy_reduction(m)
+                if prof is not None: t = prof.lap('greedy_reduction', t)
             else:
                 greedy_operations = None
 
@@ -670,10 +914,11 @@ def extract_circuit(
                 cnots = greedy
 
             if greedy_operations is None or (optimize_cnots == 3 and len(greedy) > 1):
-                perm = column_optimal_swap(m)
+                perm = column_optimal_swap(m, weighted=True)
                 perm = {v: k for k, v in perm.items()}
                 neighbors2 = [neighbors[perm[i]] for i in range(len(neighbors))]
-                m2 = bi_adj(g, neighbors2, frontier)
+                m2 = Mat2([[row[perm[i]] for i in range(len(neighbors))] for row in m.data])
+                if prof is not None: t = prof.lap('column_optimal_swap', t)
                 if optimize_cnots > 0:
                     cnots = m2.to_cnots(optimize=True)
                 else:
@@ -692,14 +937,21 @@ def extract_circuit(
                     else:
                         neighbors = neighbors2
                         m = m2
+                        permuted = True
                         if not quiet: print("Gaussian elimination with", len(cnots), "CNOTs")
+                if prof is not None: t = prof.lap('gauss', t)
             # We now have a set of CNOTs that suffice to extract at least one vertex.
         else:
             if not quiet: print("Simple vertex")
             cnots = []
 
+        if permuted: # Keep the stored rows in sync with the row operations done on m
+            for cnot in cnots: fm.row_add(frontier, cnot.target, cnot.control)
         extracted = apply_cnots(g, c, frontier, qubit_map, cnots, m, neighbors)
         if not quiet: print("Vertices extracted:", extracted)
+        if prof is not None:
+            prof.lap('apply_cnots', t)
+            prof.sample_graph('extract_circuit', g)
             
     if optimize_czs:
         if not quiet: print("CZ gates saved:", czs_saved)
@@ -1100,12 +1352,34 @@ class LookaheadNode:
     def apply_cnots(self, cnots: List[CNOT], m: Mat2, neighbors: List[VT]):
         self.ext_count += apply_cnots(self.g, self.c, self.frontier, self.qubit_map, cnots, m, neighbors)
 
-    def expand(self, limit: int, max_depth: int, algorithms: List[int]):
+    def expand(self, limit: int, max_depth: int, algorithms: List[int],
+               bound: Optional[Any] = None, deadline: Optional[float] = None,
+               stats: Optional['LookaheadStats'] = None):
+        """
+        Extract vertices until ``limit`` vertices have been extracted, branching whenever the
+        algorithms give different sets of CNOTs, and then expand the children.
+
+        Args:
+            limit: the number of extracted vertices at which to stop
+            max_depth: the maximum depth of the tree below this node
+            algorithms: the algorithms used to produce the CNOTs, see :func:`lookahead_extract_base`
+            bound: a shared best-known value (anything with a ``value`` attribute, e.g. a
+            :class:`multiprocessing.Value`) used to tighten the hard limit while expanding
+            deadline: stop expanding when :func:`time.time` passes this value
+            stats: counts the expanded nodes; no more nodes are expanded once its node budget is used up
+        """
         if max_depth == 0:
             return
+        self.hard_limit = _tighten_limit(self.hard_limit, bound)
         if self.total_d >= self.hard_limit > -1:
             return
+        if stats is not None:
+            if stats.exhausted():
+                return
+            stats.nodes += 1
         while not self.expanded and self.ext_count < limit and len(self.frontier) != 0:
+            if deadline is not None and time.time() > deadline:
+                return
             self.d = -1
             clean_frontier(self.g, self.c, self.frontier, self.qubit_map)
 
@@ -1158,7 +1432,7 @@ class LookaheadNode:
             self.apply_cnots(cnots, m, neighbors)
 
         for child in self.children:
-            child.expand(limit, max_depth - 1, algorithms)
+            child.expand(limit, max_depth - 1, algorithms, bound, deadline, stats)
 
     def apply_operation(self, operation_id: int, m: Mat2, neighbors: List[VT]) -> Optional[List[CNOT]]:
         """
@@ -1167,7 +1441,7 @@ class LookaheadNode:
         cnots: List[CNOT]
 
         if operation_id == 0:
-            perm = column_optimal_swap(m)
+            perm = column_optimal_swap(m, weighted=True)
             perm = {v: k for k, v in perm.items()}
             neighbors2 = [neighbors[perm[i]] for i in range(len(neighbors))]
             m2 = bi_adj(self.g, neighbors2, self.frontier)
@@ -1273,6 +1547,80 @@ class RootPicker:
         return nodes
 
 
+class LookaheadStats(object):
+    """Progress of the lookahead searches, shared by the successive calls of :func:`lookahead_extract_base`
+    made by :func:`anytime_extract`. Pass an instance as the ``stats`` argument to count the explored nodes,
+    to stop after ``max_nodes`` nodes, or to be told about every improvement through ``callback``.
+
+    Args:
+        max_nodes: stop expanding after this many nodes have been explored; -1 for no limit
+        callback: called with this object whenever a better circuit is found
+
+    Attributes:
+        nodes: the number of nodes of the search trees explored so far
+        best: the two qubit count/depth of the best circuit found so far; -1 if there is none
+        start: the value of :func:`time.time` when this object was made
+    """
+    def __init__(self, max_nodes: int = -1, callback: Optional[Callable[['LookaheadStats'], None]] = None):
+        self.nodes: int = 0
+        self.best: int = -1
+        self.max_nodes: int = max_nodes
+        self.callback = callback
+        self.start: float = time.time()
+
+    def elapsed(self) -> float:
+        """The number of seconds since this object was made."""
+        return time.time() - self.start
+
+    def exhausted(self) -> bool:
+        """Whether the node budget has been used up."""
+        return -1 < self.max_nodes <= self.nodes
+
+    def improve(self, d: int):
+        """Records a circuit with two qubit count/depth ``d`` and calls the callback if it is the best so far."""
+        if d < 0 or -1 < self.best <= d:
+            return
+        self.best = d
+        if self.callback is not None:
+            self.callback(self)
+
+    def __str__(self) -> str:
+        return "best: {}, nodes explored: {}, time: {:.2f}s".format(self.best, self.nodes, self.elapsed())
+
+
+def _tighten_limit(hard_limit: int, bound: Optional[Any]) -> int:
+    """Returns the smaller of ``hard_limit`` and the value of the shared ``bound``, where -1 means no limit."""
+    if bound is None:
+        return hard_limit
+    b = bound.value
+    if b > -1 and (hard_limit == -1 or b < hard_limit):
+        return b
+    return hard_limit
+
+
+def _publish_limit(bound: Optional[Any], d: int):
+    """Lowers the shared ``bound`` to ``d`` if that is an improvement."""
+    if bound is None or d < 0:
+        return
+    with bound.get_lock():
+        if bound.value == -1 or d < bound.value:
+            bound.value = d
+
+
+_worker_bound: Optional[Any] = None
+
+
+def _set_bound_in_worker(bound: Any):
+    global _worker_bound
+    _worker_bound = bound
+
+
+def _expand_in_worker(node: LookaheadNode, limit: int, max_depth: int, algorithms: List[int],
+                      deadline: Optional[float]) -> LookaheadNode:
+    node.expand(limit, max_depth, algorithms, _worker_bound, deadline)
+    return node
+
+
 def lookahead_extract_base(
         g: BaseGraph[VT, ET],
         steps: int = -1,  # ideal number of steps to look ahead
@@ -1283,7 +1631,11 @@ def lookahead_extract_base(
         algorithms: Optional[List[int]] = None,  # always include 0, pick any from 1, 2, 3
         optimize_for_depth: bool = False,  # optimize for depth instead of two qubit gates
         compare_basic: bool = True,  # use the default extractions and pick the best
-        up_to_perm: bool = False  # return an equivalent circuit up to an input permutation
+        up_to_perm: bool = False,  # return an equivalent circuit up to an input permutation
+        executor: Optional[Executor] = None,  # expand the roots of each step in this process pool
+        bound: Optional[Any] = None,  # best value shared with other searches
+        deadline: Optional[float] = None,  # give up expanding after this time
+        stats: Optional[LookaheadStats] = None  # count nodes and report improvements
         ) -> Optional[Circuit]:
     """
     Main method for the lookahead extraction. Uses different methods to produce CNOTS and extract vertices,
@@ -1300,6 +1652,10 @@ def lookahead_extract_base(
         optimize_for_depth: if set to false (default), optimize for the number of two qubit gates; if set to true, optimize for depth
         compare_basic: perform the standard extractions and pick the best between the standard and the result of the lookahead extraction
         up_to_perm: if set to true, returns a circuit that corresponds to the graph up to a permutation of th inputs
+        executor: a process pool, such as the one made by :func:`lookahead_full`, in which the roots of each step are expanded concurrently; its workers should have the shared ``bound`` installed with ``_set_bound_in_worker``
+        bound: a :class:`multiprocessing.Value` holding the best two qubit count/depth found by any search (-1 if none); it is read to prune the tree and lowered when a better circuit is found
+        deadline: a value of :func:`time.time` after which no more nodes are expanded; the best circuit found so far is returned
+        stats: a :class:`LookaheadStats` that counts the explored nodes, enforces its node budget and is told about every better circuit found
 
     Returns:
         A circuit that corresponds to the given graph, with two qubit count / depth less than 'hard_limit'; None if no such circuit was found
@@ -1355,22 +1711,49 @@ def lookahead_extract_base(
     roots: List[Optional[LookaheadNode]] =\
         [LookaheadNode(g, Circuit(len(inputs)), frontier, qubit_map, gadgets, optimize_for_depth, hard_limit)]
 
+    _publish_limit(bound, hard_limit)
+
     while len(roots) > 0:
+        hard_limit = _tighten_limit(hard_limit, bound)
         rp = RootPicker(nodes_kept)
+        jobs: Dict[int, Tuple[int, 'Future[LookaheadNode]']] = {}
+        if executor is not None:
+            # The roots are disjoint subtrees, so they can be expanded at the same time
+            for i, root in enumerate(roots):
+                if root is None:
+                    continue
+                if root.hard_limit > hard_limit:
+                    root.update_hard_limit(hard_limit)
+                if root.can_expand():
+                    jobs[i] = (root.ext_count, executor.submit(_expand_in_worker, root, root.ext_count + steps,
+                                                               depth_limit, algorithms, deadline))
         for i in range(len(roots)):
             root = roots[i]
             if root is None:
                 continue  # Never happens, but creates problems with type checker
             if root.hard_limit > hard_limit:
                 root.update_hard_limit(hard_limit)
-            if root.can_expand():
+            if i in jobs:
+                prev_extracted, job = jobs[i]
+                root = job.result()
+                if stats is not None:
+                    stats.nodes += root.stats()[0]
+            elif executor is None and root.can_expand():
                 new_limit = root.ext_count + steps
                 prev_extracted = root.ext_count
-                root.expand(new_limit, depth_limit, algorithms)
-                best_c, best_d = root.get_finished(best_c, best_d, up_to_perm)
-                if best_d < hard_limit:
-                    hard_limit = best_d
-                    root.update_hard_limit(hard_limit)
+                root.expand(new_limit, depth_limit, algorithms, bound, deadline, stats)
+            else:
+                roots[i] = None
+                continue
+            best_c, best_d = root.get_finished(best_c, best_d, up_to_perm)
+            if best_d < hard_limit:
+                hard_limit = best_d
+                root.update_hard_limit(hard_limit)
+            _publish_limit(bound, best_d)
+            if stats is not None:
+                stats.improve(best_d)
+            # When out of budget the tree may be only partly expanded, so we only keep the finished circuits
+            if (deadline is None or time.time() <= deadline) and not (stats is not None and stats.exhausted()):
                 root.next_nodes(prev_extracted + min_extract, rp)
             # Allow unneeded nodes to be removed to free memory
             roots[i] = None
@@ -1440,32 +1823,121 @@ def lookahead_extract(g: BaseGraph[VT, ET], optimize_for_depth: bool = False, up
     return c
 
 
-def lookahead_full(g: BaseGraph[VT, ET], optimize_for_depth: bool = False, up_to_perm: bool = False) -> Circuit:
+def lookahead_full(g: BaseGraph[VT, ET], optimize_for_depth: bool = False, up_to_perm: bool = False,
+                   workers: int = 1, time_budget: Optional[float] = None) -> Circuit:
     """
         A lookahead extraction which compares a number of possible extractions and returns the best result.
         Can take a very long time for large circuits. For details see :func:`lookahead_extract_base`
+
+        Args:
+            g: the graph to transform into a circuit
+            optimize_for_depth: optimize for depth instead of two qubit gates
+            up_to_perm: return an equivalent circuit up to an input permutation
+            workers: if larger than 1, the searches are run at the same time and the subtrees of each step are
+            expanded in a pool of this many processes; all searches share the best value found so far, so that
+            branches that cannot improve on it are pruned early
+            time_budget: stop searching after this many seconds and return the best circuit found so far; the
+            standard extractions used as a baseline are always completed
     """
     qubits = len(g.inputs())
-    c = lookahead_extract_base(g.clone(), 3 * qubits, 7, qubits, 4, -1,
-                               [0, 1, 3], optimize_for_depth, True, up_to_perm)
+    deadline = None if time_budget is None else time.time() + time_budget
+    configs = [(3 * qubits, 7, qubits, 4, [0, 1, 3]),
+               (4 * qubits, 8, 0, 4, [0, 1]),
+               (4 * qubits, 8, 5, 4, [0, 2]),
+               (4 * qubits, 8, 5, 4, [0, 3])]
+    results: List[Optional[Circuit]] = []
+    if workers <= 1:
+        d = -1
+        for i, (steps, depth_limit, min_extract, nodes_kept, algorithms) in enumerate(configs):
+            c1 = lookahead_extract_base(g.clone(), steps, depth_limit, min_extract, nodes_kept, d, algorithms,
+                                        optimize_for_depth, i == 0, up_to_perm, deadline=deadline)
+            results.append(c1)
+            if c1 is not None:
+                d1 = get_optimize_value(c1, optimize_for_depth, True)
+                if d1 < d or d == -1:
+                    d = d1
+    else:
+        bound = multiprocessing.Value('i', -1)
+        with ProcessPoolExecutor(workers, initializer=_set_bound_in_worker, initargs=(bound,)) as executor, \
+                ThreadPoolExecutor(len(configs)) as drivers:
+            jobs = [drivers.submit(lookahead_extract_base, g.clone(), steps, depth_limit, min_extract, nodes_kept, -1,
+                                   algorithms, optimize_for_depth, i == 0, up_to_perm, executor, bound, deadline)
+                    for i, (steps, depth_limit, min_extract, nodes_kept, algorithms) in enumerate(configs)]
+            results = [job.result() for job in jobs]
+
+    c = results[0]
     if c is None:
         raise AssertionError("Lookahead extraction with no hard limit returned None")
     d = get_optimize_value(c, optimize_for_depth, True)
-    c1 = lookahead_extract_base(g.clone(), 4 * qubits, 8, 0, 4, d, [0, 1], optimize_for_depth, False, up_to_perm)
-    if c1 is not None:
-        d1 = get_optimize_value(c1, optimize_for_depth, True)
-        if d1 < d:
-            c = c1
-            d = d1
-    c1 = lookahead_extract_base(g.clone(), 4 * qubits, 8, 5, 4, d, [0, 2], optimize_for_depth, False, up_to_perm)
-    if c1 is not None:
-        d1 = get_optimize_value(c1, optimize_for_depth, True)
-        if d1 < d:
-            c = c1
-            d = d1
-    c1 = lookahead_extract_base(g, 4 * qubits, 8, 5, 4, d, [0, 3], optimize_for_depth, False, up_to_perm)
-    if c1 is not None:
-        d1 = get_optimize_value(c1, optimize_for_depth, True)
-        if d1 < d:
-            c = c1
+    for c1 in results[1:]:
+        if c1 is not None:
+            d1 = get_optimize_value(c1, optimize_for_depth, True)
+            if d1 < d:
+                c = c1
+                d = d1
     return c
+
+
+def anytime_extract(g: BaseGraph[VT, ET], time_budget: Optional[float] = None, node_budget: Optional[int] = None,
+                    optimize_for_depth: bool = False, up_to_perm: bool = False,
+                    callback: Optional[Callable[[LookaheadStats], None]] = None,
+                    stats: Optional[LookaheadStats] = None) -> Circuit:
+    """
+    Extracts a circuit within a budget of time or explored nodes, and returns the best circuit found.
+
+    First the standard extractions of :func:`extract_circuit` are done, which guarantees a result. Then the
+    searches of :func:`lookahead_fast`, :func:`lookahead_extract` and :func:`lookahead_full` are run, from the
+    cheapest to the most expensive, each with the best value so far as its hard limit, until the budget runs out.
+    Without a budget this does all the searches. ``g`` is not modified.
+
+    Args:
+        g: the graph to transform into a circuit
+        time_budget: the number of seconds after which no more nodes are explored; the standard extractions
+        are always completed
+        node_budget: the number of nodes of the search trees after which the search stops
+        optimize_for_depth: optimize for depth instead of two qubit gates
+        up_to_perm: return an equivalent circuit up to an input permutation
+        callback: called with a :class:`LookaheadStats` whenever a better circuit is found
+        stats: use this object to keep track of the progress instead of a new one
+
+    Returns:
+        The best circuit that was found
+    """
+    progress = stats if stats is not None else LookaheadStats()
+    if node_budget is not None:
+        progress.max_nodes = node_budget
+    if callback is not None:
+        progress.callback = callback
+    deadline = None if time_budget is None else time.time() + time_budget
+
+    def out_of_budget() -> bool:
+        return (deadline is not None and time.time() > deadline) or progress.exhausted()
+
+    best_c = extract_circuit(g.clone(), up_to_perm=up_to_perm)
+    best_d = get_optimize_value(best_c, optimize_for_depth, True)
+    progress.improve(best_d)
+    for optimize_cnots in (3, 1):
+        if out_of_budget():
+            return best_c
+        c = extract_circuit(g.clone(), optimize_cnots=optimize_cnots, up_to_perm=up_to_perm)
+        d = get_optimize_value(c, optimize_for_depth, True)
+        if d < best_d:
+            best_c, best_d = c, d
+            progress.improve(d)
+
+    qubits = len(g.inputs())
+    searches = [(4 * qubits, 8, 5, 4, [0, 1]),  # lookahead_fast
+                (4 * qubits, 8, 0, 4, [0, 1]),  # lookahead_extract
+                (4 * qubits, 8, 5, 4, [0, 3]),
+                (3 * qubits, 7, qubits, 4, [0, 1, 3]),  # lookahead_full
+                (4 * qubits, 8, 5, 4, [0, 2])]
+    for steps, depth_limit, min_extract, nodes_kept, algorithms in searches:
+        if out_of_budget():
+            break
+        c1 = lookahead_extract_base(g.clone(), steps, depth_limit, min_extract, nodes_kept, best_d, algorithms,
+                                    optimize_for_depth, False, up_to_perm, deadline=deadline, stats=progress)
+        if c1 is not None:
+            d = get_optimize_value(c1, optimize_for_depth, True)
+            if d < best_d:
+                best_c, best_d = c1, d
+    return best_c
@@ -18,6 +18,7 @@ from typing import Optional
 
 from .base import BaseGraph
 from .graph_s import GraphS
+from .graph_array import GraphArray
 from .multigraph import Multigraph
 
 try:
@@ -25,12 +26,13 @@ try:
 except ImportError:
 	quizx = None
 
-backends = { 'simple': True, 'multigraph': True, 'quizx-vec': False if quizx is None else True }
+backends = { 'simple': True, 'multigraph': True, 'array': True, 'quizx-vec': False if quizx is None else True }
 
 def Graph(backend:Optional[str]=None) -> BaseGraph:
 	"""Returns an instance of an implementation of :class:`~pyzx.graph.base.BaseGraph`. 
 	By default :class:`~pyzx.graph.graph_s.GraphS` is used. 
 	Currently ``backend`` is allowed to be `simple` (for the default),
+	'multigraph', 'array' (for the memory-efficient :class:`~pyzx.graph.graph_array.GraphArray`),
 	or 'graph_tool' and 'igraph'.
 	This method is the preferred way to instantiate a ZX-diagram in PyZX.
 
@@ -45,6 +47,7 @@ def Graph(backend:Optional[str]=None) -> BaseGraph:
 		raise KeyError("Unavailable backend '{}'".format(backend))
 	if backend == 'simple': return GraphS()
 	if backend == 'multigraph': return Multigraph()
+	if backend == 'array': return GraphArray()
 	if backend == 'graph_tool': 
 		return GraphGT()
 	if backend == 'igraph': return GraphIG()
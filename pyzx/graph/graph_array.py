@@ -0,0 +1,430 @@
+# PyZX - Python library for quantum circuit rewriting
+#       and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from array import array
+from collections.abc import Mapping, Set as AbstractSet
+from typing import Optional, Tuple, Dict, Set, List, Any, Callable, Iterator
+
+from .base import BaseGraph
+
+from ..utils import VertexType, EdgeType, FractionLike, FloatInt, vertex_is_zx_like, vertex_is_z_like, set_z_box_label, get_z_box_label
+
+_VTYPES: Dict[int, VertexType] = {int(t): t for t in VertexType}
+_ETYPES: Dict[int, EdgeType] = {int(t): t for t in EdgeType}
+_DEAD = -1 # The type of a vertex index that is not in use
+_UNSET = float('nan') # The qubit or row of a vertex that has not been set
+
+
+class _VertexView(AbstractSet):
+    """Live set-like view of the vertices of a :class:`GraphArray`."""
+    def __init__(self, g: 'GraphArray') -> None:
+        self._g = g
+    def __contains__(self, v: object) -> bool:
+        ty = self._g._ty
+        return isinstance(v, int) and 0 <= v < len(ty) and ty[v] != _DEAD
+    def __iter__(self) -> Iterator[int]:
+        return (v for v, t in enumerate(self._g._ty) if t != _DEAD)
+    def __len__(self) -> int:
+        return self._g._nvertices
+
+
+class _ColumnView(Mapping):
+    """Live read-only mapping from the vertices of a :class:`GraphArray` to one of its columns.
+    The ``get`` function should raise a KeyError for vertices that have no value."""
+    def __init__(self, vertices: _VertexView, get: Callable[[int], Any]) -> None:
+        self._vertices = vertices
+        self._get = get
+    def __getitem__(self, v: int) -> Any:
+        try: return self._get(v)
+        except IndexError: raise KeyError(v)
+    def __iter__(self) -> Iterator[int]:
+        for v in self._vertices:
+            try: self._get(v)
+            except KeyError: continue
+            yield v
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class GraphArray(BaseGraph[int,Tuple[int,int]]):
+    """Compact implementation of :class:`~graph.base.BaseGraph`.
+
+    Instead of a dictionary per vertex, the vertex types, qubits and rows are stored
+    in columns of type :class:`array.array` that are indexed by the vertex.
+    The adjacency of a vertex is a single growable ``array('i')`` holding pairs
+    of neighbour and edge type. This uses considerably less memory per vertex than
+    :class:`~pyzx.graph.graph_s.GraphS`, at the cost of neighbour lookups being
+    linear in the degree of a vertex, which is small in most diagrams.
+
+    Vertex indices are reused in the same way as in :class:`~pyzx.graph.graph_s.GraphS`:
+    removing the vertices with the highest indices makes these indices available again."""
+    backend = 'array'
+
+    #The documentation of what these methods do
+    #can be found in base.BaseGraph
+    def __init__(self) -> None:
+        BaseGraph.__init__(self)
+        self._ty: array                                 = array('b')
+        self._phase: List[FractionLike]                 = []
+        self._qindex: array                             = array('d')
+        self._maxq: FloatInt                            = -1
+        self._rindex: array                             = array('d')
+        self._maxr: FloatInt                            = -1
+        self._adj: List[Optional[array]]                = []
+        self._nvertices: int                            = 0
+        self.nedges: int                                = 0
+        self._grounds: Set[int] = set()
+
+        self._vdata: Dict[int,Any]                      = dict()
+        self._inputs: Tuple[int, ...]                   = tuple()
+        self._outputs: Tuple[int, ...]                  = tuple()
+        self._vertices = _VertexView(self)
+
+    def clone(self) -> 'GraphArray':
+        cpy = GraphArray()
+        cpy._ty.extend(self._ty)
+        cpy._phase = self._phase.copy()
+        cpy._qindex.extend(self._qindex)
+        cpy._maxq = self._maxq
+        cpy._rindex.extend(self._rindex)
+        cpy._maxr = self._maxr
+        cpy._adj = [None if a is None else array('i', a) for a in self._adj]
+        cpy._nvertices = self._nvertices
+        cpy.nedges = self.nedges
+        cpy._grounds = self._grounds.copy()
+        cpy._vdata = self._vdata.copy()
+        cpy.scalar = self.scalar.copy()
+        cpy._inputs = tuple(list(self._inputs))
+        cpy._outputs = tuple(list(self._outputs))
+        cpy.track_phases = self.track_phases
+        cpy.phase_index = self.phase_index.copy()
+        cpy.phase_master = self.phase_master
+        cpy.phase_mult = self.phase_mult.copy()
+        cpy.max_phase_index = self.max_phase_index
+        return cpy
+
+    def vindex(self): return len(self._ty)
+    def depth(self):
+        rs = [r for r in self._rindex if r == r]
+        self._maxr = _unpack(max(rs)) if rs else -1
+        return self._maxr
+    def qubit_count(self):
+        qs = [q for q in self._qindex if q == q]
+        self._maxq = _unpack(max(qs)) if qs else -1
+        return self._maxq + 1
+
+    def inputs(self):
+        return self._inputs
+
+    def num_inputs(self):
+        return len(self._inputs)
+
+    def set_inputs(self, inputs):
+        self._inputs = inputs
+
+    def outputs(self):
+        return self._outputs
+
+    def num_outputs(self):
+        return len(self._outputs)
+
+    def set_outputs(self, outputs):
+        self._outputs = outputs
+
+    def add_vertices(self, amount):
+        start = len(self._ty)
+        self._ty.extend([VertexType.BOUNDARY]*amount)
+        self._phase.extend([0]*amount)
+        self._qindex.extend([_UNSET]*amount)
+        self._rindex.extend([_UNSET]*amount)
+        self._adj.extend(array('i') for _ in range(amount))
+        self._nvertices += amount
+        return range(start, start + amount)
+    def add_vertex_indexed(self, v):
+        """Adds a vertex that is guaranteed to have the chosen index (i.e. 'name').
+        If the index isn't available, raises a ValueError.
+        This method is used in the editor to support undo, which requires vertices
+        to preserve their index."""
+        if v in self._vertices: raise ValueError("Vertex with this index already exists")
+        if v >= len(self._ty):
+            amount = v + 1 - len(self._ty)
+            self._ty.extend([_DEAD]*amount)
+            self._phase.extend([0]*amount)
+            self._qindex.extend([_UNSET]*amount)
+            self._rindex.extend([_UNSET]*amount)
+            self._adj.extend([None]*amount)
+        self._ty[v] = VertexType.BOUNDARY
+        self._adj[v] = array('i')
+        self._nvertices += 1
+
+    def _find(self, s: int, t: int) -> int:
+        """Returns the position of ``t`` in the adjacency array of ``s``, or -1."""
+        adj = self._adj[s]
+        if adj is None: raise KeyError(s)
+        try: return 2*adj[::2].index(t)
+        except ValueError: return -1
+
+    def add_edges(self, edge_pairs, edgetype=EdgeType.SIMPLE):
+        for s,t in edge_pairs:
+            if self._find(s,t) != -1:
+                self.set_edge_type((s,t), edgetype)
+                continue
+            self.nedges += 1
+            self._adj[s].extend((t, edgetype)) # type: ignore
+            if s != t: self._adj[t].extend((s, edgetype)) # type: ignore
+
+    def add_edge(self, edge_pair, edgetype=EdgeType.SIMPLE):
+        s,t = edge_pair
+        i = self._find(s,t)
+        if i == -1:
+            self.nedges += 1
+            self._adj[s].extend((t, edgetype)) # type: ignore
+            if s != t: self._adj[t].extend((s, edgetype)) # type: ignore
+        else:
+            t1 = self.type(s)
+            t2 = self.type(t)
+            if (vertex_is_zx_like(t1) and vertex_is_zx_like(t2)):
+                et1 = self._adj[s][i+1] # type: ignore
+
+                # set the roles of simple or hadamard edges, depending on whether the colours match
+                if vertex_is_z_like(t1) == vertex_is_z_like(t2): # same colour
+                    fuse, hopf = (EdgeType.SIMPLE, EdgeType.HADAMARD)
+                else:
+                    fuse, hopf = (EdgeType.HADAMARD, EdgeType.SIMPLE)
+
+                # handle parallel edges for all possible combinations of fuse/hopf type edges
+                if edgetype == fuse and et1 == fuse:
+                    pass # no-op
+                elif ((edgetype == fuse and et1 == hopf) or (edgetype == hopf and et1 == fuse)):
+                    # ensure the remaining edge is 'fuse' type
+                    self.set_edge_type((s,t), fuse)
+                    # add a pi phase to one of the neighbours
+                    if t1 == VertexType.Z_BOX:
+                        set_z_box_label(self, s, get_z_box_label(self, s) * -1)
+                    else:
+                        self.add_to_phase(s, 1)
+                    self.scalar.add_power(-1)
+                elif edgetype == hopf and et1 == hopf:
+                    # remove the edge (reducing mod 2)
+                    self.remove_edge((s,t))
+                    self.scalar.add_power(-2)
+                else:
+                    raise ValueError(f'Got unexpected edge types: {t1}, {t2}')
+            else:
+                raise ValueError(f'Attempted to add unreducible parallel edge {edge_pair}, types: {t1}, {t2}')
+
+        return edge_pair
+
+    def remove_vertices(self, vertices):
+        for v in vertices:
+            adj = self._adj[v]
+            if adj is None: raise KeyError(v)
+            # remove all edges
+            for v1 in set(adj[::2]):
+                self.nedges -= 1
+                if v1 != v:
+                    i = self._find(v1, v)
+                    del self._adj[v1][i:i+2] # type: ignore
+            # remove the vertex
+            self._adj[v] = None
+            self._ty[v] = _DEAD
+            self._phase[v] = 0
+            self._qindex[v] = _UNSET
+            self._rindex[v] = _UNSET
+            self._nvertices -= 1
+            if v in self._inputs:
+                self._inputs = tuple(u for u in self._inputs if u != v)
+            if v in self._outputs:
+                self._outputs = tuple(u for u in self._outputs if u != v)
+            try: del self.phase_index[v]
+            except: pass
+            self._grounds.discard(v)
+            self._vdata.pop(v,None)
+        # make the indices at the end available again
+        while self._ty and self._ty[-1] == _DEAD:
+            self._ty.pop()
+            self._phase.pop()
+            self._qindex.pop()
+            self._rindex.pop()
+            self._adj.pop()
+
+    def remove_vertex(self, vertex):
+        self.remove_vertices([vertex])
+
+    def remove_edges(self, edges):
+        for s,t in edges:
+            i = self._find(s,t)
+            if i == -1: raise KeyError((s,t))
+            self.nedges -= 1
+            del self._adj[s][i:i+2] # type: ignore
+            if s != t:
+                i = self._find(t,s)
+                del self._adj[t][i:i+2] # type: ignore
+
+    def remove_edge(self, edge):
+        self.remove_edges([edge])
+
+    def num_vertices(self):
+        return self._nvertices
+
+    def num_edges(self, s=None, t=None):
+        if s is not None and t is not None:
+            if self.connected(s, t):
+                return 1
+            else:
+                return 0
+        elif s is not None:
+            return self.vertex_degree(s)
+        else:
+            return len(list(self.edges()))
+
+    def vertices(self):
+        return self._vertices
+
+    def vertex_set(self):
+        return set(self._vertices)
+
+    def edges(self, s=None, t=None):
+        if s is not None and t is not None:
+            if self.connected(s, t):
+                yield (s,t) if s < t else (t,s)
+        elif s is not None:
+            for t in self.neighbors(s):
+                yield (s,t) if s < t else (t,s)
+        else:
+            for v0,adj in enumerate(self._adj):
+                if adj is None: continue
+                for v1 in adj[::2]:
+                    if v1 > v0: yield (v0,v1)
+
+    def edge(self, s, t):
+        return (s,t) if s < t else (t,s)
+    def edge_set(self):
+        return set(self.edges())
+    def edge_st(self, edge):
+        return edge
+
+    def neighbors(self, vertex):
+        adj = self._adj[vertex]
+        if adj is None: raise KeyError(vertex)
+        return adj[::2]
+
+    def vertex_degree(self, vertex):
+        adj = self._adj[vertex]
+        if adj is None: raise KeyError(vertex)
+        return len(adj) // 2
+
+    def incident_edges(self, vertex):
+        return [(vertex, v1) if v1 > vertex else (v1, vertex) for v1 in self.neighbors(vertex)]
+
+    def connected(self,v1,v2):
+        return v2 in self.neighbors(v1)
+
+    def edge_type(self, e):
+        v1,v2 = e
+        i = self._find(v1,v2)
+        if i == -1: return 0
+        return _ETYPES[self._adj[v1][i+1]] # type: ignore
+
+    def set_edge_type(self, e, t):
+        v1,v2 = e
+        i = self._find(v1,v2)
+        if i == -1: raise KeyError(e)
+        self._adj[v1][i+1] = t # type: ignore
+        if v1 != v2:
+            self._adj[v2][self._find(v2,v1)+1] = t # type: ignore
+
+    def type(self, vertex):
+        t = self._ty[vertex]
+        if t == _DEAD: raise KeyError(vertex)
+        return _VTYPES[t]
+    def types(self):
+        return _ColumnView(self._vertices, self.type)
+    def set_type(self, vertex, t):
+        self._ty[vertex] = t
+
+    def phase(self, vertex):
+        if self._ty[vertex] == _DEAD: raise KeyError(vertex)
+        return self._phase[vertex]
+    def phases(self):
+        return _ColumnView(self._vertices, self.phase)
+    def set_phase(self, vertex, phase):
+        try:
+            self._phase[vertex] = phase % 2
+        except Exception:
+            self._phase[vertex] = phase
+    def add_to_phase(self, vertex, phase):
+        old_phase = self._phase[vertex]
+        try:
+            self._phase[vertex] = (old_phase + phase) % 2
+        except Exception:
+            self._phase[vertex] = old_phase + phase
+    def qubit(self, vertex):
+        q = self._qindex[vertex]
+        return -1 if q != q else _unpack(q)
+    def _get_qubit(self, vertex):
+        q = self._qindex[vertex]
+        if q != q: raise KeyError(vertex)
+        return _unpack(q)
+    def qubits(self):
+        return _ColumnView(self._vertices, self._get_qubit)
+    def set_qubit(self, vertex, q):
+        if q > self._maxq: self._maxq = q
+        self._qindex[vertex] = q
+
+    def row(self, vertex):
+        r = self._rindex[vertex]
+        return -1 if r != r else _unpack(r)
+    def _get_row(self, vertex):
+        r = self._rindex[vertex]
+        if r != r: raise KeyError(vertex)
+        return _unpack(r)
+    def rows(self):
+        return _ColumnView(self._vertices, self._get_row)
+    def set_row(self, vertex, r):
+        if r > self._maxr: self._maxr = r
+        self._rindex[vertex] = r
+
+    def is_ground(self, vertex):
+        return vertex in self._grounds
+    def grounds(self):
+        return self._grounds
+    def set_ground(self, vertex, flag=True):
+        if flag:
+            self._grounds.add(vertex)
+        else:
+            self._grounds.discard(vertex)
+
+    def clear_vdata(self, vertex):
+        if vertex in self._vdata:
+            del self._vdata[vertex]
+    def vdata_keys(self, vertex):
+        return self._vdata.get(vertex, {}).keys()
+    def vdata(self, vertex, key, default=0):
+        if vertex in self._vdata:
+            return self._vdata[vertex].get(key,default)
+        else:
+            return default
+    def set_vdata(self, vertex, key, val):
+        if vertex in self._vdata:
+            self._vdata[vertex][key] = val
+        else:
+            self._vdata[vertex] = {key:val}
+
+
+def _unpack(x: float) -> FloatInt:
+    """Qubits and rows are stored as floats, but most of them are integers."""
+    return int(x) if x.is_integer() else x
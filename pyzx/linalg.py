@@ -21,16 +21,61 @@ from typing_extensions import Literal
 from .circuit.gates import CNOT
 
 try:
+    from . import linalg_c # type: ignore
     from .linalg_c import do_gauss as gauss_fast # type: ignore
 except ImportError:
-   gauss_fast = None
+    linalg_c = None
+    gauss_fast = None
 
 Z2 = Literal[0,1]
 MatLike = List[List[Z2]]
 
+def _pack(rows: Any) -> List[int]:
+    """Packs each 0/1 row into an int whose bit j is the entry in column j."""
+    return [int(''.join('1' if b else '0' for b in reversed(row)) or '0', 2) for row in rows]
+
+def _unpack(v: int, n: int) -> List[Z2]:
+    """Inverse of :func:`_pack` for a single row of length n."""
+    return [1 if c == '1' else 0 for c in reversed(format(v, '0{}b'.format(n)))] if n else []
+
+class _BitRows(object):
+    """Rows (or columns) of a matrix packed into ints, so adding one row to
+    another is a single XOR. Used by :meth:`Mat2.gauss` as scratch space for
+    the x and y parameters when they are themselves instances of Mat2, and by
+    the Steiner tree eliminations in :mod:`pyzx.routing.steiner`."""
+    def __init__(self, rows: Any) -> None:
+        self.rows = _pack(rows)
+        self.orig = list(self.rows)
+    def row_add(self, r0: int, r1: int) -> None:
+        self.rows[r1] ^= self.rows[r0]
+    def col_add(self, c0: int, c1: int) -> None:
+        self.rows[c1] ^= self.rows[c0]
+    def write_rows(self, data: MatLike, n: int) -> None:
+        """Writes changed rows back into data in place."""
+        for i, (v, v0) in enumerate(zip(self.rows, self.orig)):
+            if v != v0: data[i][:] = _unpack(v, n)
+    def write_cols(self, data: MatLike) -> None:
+        """Writes the rows back into data as columns."""
+        if self.rows == self.orig: return
+        cols = [_unpack(v, len(data)) for v in self.rows]
+        for i, row in enumerate(data):
+            row[:] = [c[i] for c in cols]
+
+
 class Mat2(object):
     """A matrix over Z2, with methods for multiplication, primitive row and column
-    operations, Gaussian elimination, rank, and epi-mono factorisation."""
+    operations, Gaussian elimination, rank, and epi-mono factorisation.
+
+    The entries are stored in ``data`` as a list of rows of 0/1 values. When ``packed``
+    is True (the default), :meth:`gauss` and multiplication pack the rows into Python ints
+    and work on those, so that a row addition is a single XOR. Set ``Mat2.packed = False``
+    (or ``packed`` on a single matrix) to use the reference list-based implementation.
+
+    If the optional compiled extension :mod:`pyzx.linalg_c` is built, :meth:`gauss` runs
+    on its compiled Mat2 instead, unless ``compiled`` is set to False."""
+
+    packed: bool = True
+    compiled: bool = linalg_c is not None
     
     @staticmethod
     def id(n: int) -> 'Mat2':
@@ -49,6 +94,16 @@ class Mat2(object):
     def __init__(self, data: MatLike):
         self.data: MatLike = data
     def __mul__(self, m: 'Mat2') -> 'Mat2':
+        if self.packed and m.data and m.data[0]:
+            mrows = _pack(m.data)
+            n = len(m.data[0])
+            res = []
+            for row in self.data:
+                v = 0
+                for k, b in enumerate(row):
+                    if b: v ^= mrows[k]
+                res.append(_unpack(v, n))
+            return Mat2(res)
         return Mat2([[cast(Z2, sum(self.data[i][k] * m.data[k][j] for k in range(len(m.data))) % 2)
                       for j in range(len(m.data[0]))] for i in range(len(self.data))])
     def __eq__(self, other: object) -> bool:
@@ -113,11 +168,8 @@ class Mat2(object):
         return len(self.data[0]) if (len(self.data) != 0) else 0
     def row_add(self, r0: int, r1: int) -> None:
         """Add r0 to r1"""
-        row1 = self.data[r0]
         row2 = self.data[r1]
-        for i, v in enumerate(row1):
-            if v:
-                row2[i] = 0 if row2[i] else 1
+        row2[:] = [1 if a != b else 0 for a, b in zip(self.data[r0], row2)]
     def col_add(self, c0: int, c1: int) -> None:
         """Add r0 to r1"""
         for i in range(self.rows()):
@@ -171,6 +223,34 @@ class Mat2(object):
         row_add(), and y any object that implements col_add().
         """
 
+        if not self.packed:
+            return self._gauss_lists(full_reduce, x, y, blocksize, pivot_cols)
+        if self.compiled and linalg_c is not None and self.cols():
+            return self._gauss_compiled(full_reduce, x, y, blocksize, pivot_cols)
+        cols = self.cols()
+        m = _BitRows(self.data)
+        bx = _BitRows(x.data) if isinstance(x, Mat2) and x.packed else None
+        by = _BitRows(y.transpose().data) if isinstance(y, Mat2) and y.packed else None
+        rank = _gauss_packed(m.rows, cols, full_reduce, bx or x, by or y, blocksize, pivot_cols)
+        m.write_rows(self.data, cols)
+        if bx is not None: bx.write_rows(x.data, x.cols())
+        if by is not None: by.write_cols(y.data)
+        return rank
+
+    def _gauss_compiled(self, full_reduce:bool, x:Any, y:Any, blocksize:int, pivot_cols:List[int]) -> int:
+        """Runs :meth:`gauss` on the compiled Mat2 from :mod:`pyzx.linalg_c` and writes the result back."""
+        m = linalg_c.Mat2(self.data)
+        cx = linalg_c.Mat2(x.data) if isinstance(x, Mat2) and x.cols() else None
+        cy = linalg_c.Mat2(y.data) if isinstance(y, Mat2) and y.cols() else None
+        rank = m.gauss(full_reduce, x if cx is None else cx, y if cy is None else cy, blocksize, pivot_cols)
+        for mat, c in ((self, m), (x, cx), (y, cy)):
+            if c is None: continue
+            for row, new in zip(mat.data, c.tolist()):
+                if row != new: row[:] = new
+        return rank
+
+    def _gauss_lists(self, full_reduce:bool=False, x:Any=None, y:Any=None, blocksize:int=6, pivot_cols:List[int]=[]) -> int:
+        """Reference implementation of :meth:`gauss` working directly on the lists in ``data``."""
         rows = self.rows()
         cols = self.cols()
         #pivot_cols = []
@@ -367,6 +447,82 @@ class Mat2(object):
         return cn.cnots # list(reversed(cn.cnots)) 
 
 
+def _gauss_packed(m: List[int], cols: int, full_reduce: bool, x: Any, y: Any, blocksize: int, pivot_cols: List[int]) -> int:
+    """Version of :meth:`Mat2.gauss` on rows packed by :func:`_pack`. It performs exactly
+    the same sequence of row operations as the list-based version."""
+    rows = len(m)
+    pivot_row = 0
+    for sec in range(math.ceil(cols / blocksize)):
+        i0 = sec * blocksize
+        i1 = min(cols, (sec+1) * blocksize)
+        mask = (1 << (i1 - i0)) - 1
+
+        # search for duplicate chunks of 'blocksize' bits and eliminate them
+        chunks: Dict[int,int] = dict()
+        for r in range(pivot_row, rows):
+            t = (m[r] >> i0) & mask
+            if not t: continue
+            if t in chunks:
+                m[r] ^= m[chunks[t]]
+                if x is not None: x.row_add(chunks[t], r)
+                if y is not None: y.col_add(r, chunks[t])
+            else:
+                chunks[t] = r
+
+        for p in range(i0, i1):
+            bit = 1 << p
+            for r0 in range(pivot_row, rows):
+                if m[r0] & bit:
+                    if r0 != pivot_row:
+                        m[pivot_row] ^= m[r0]
+                        if x is not None: x.row_add(r0, pivot_row)
+                        if y is not None: y.col_add(pivot_row, r0)
+                    prow = m[pivot_row]
+                    for r1 in range(pivot_row+1, rows):
+                        if m[r1] & bit:
+                            m[r1] ^= prow
+                            if x is not None: x.row_add(pivot_row, r1)
+                            if y is not None: y.col_add(r1, pivot_row)
+                    pivot_cols.append(p)
+                    pivot_row += 1
+                    break
+
+    rank = pivot_row
+
+    if full_reduce:
+        pivot_row -= 1
+        pivot_cols1 = pivot_cols.copy()
+
+        for sec in range(math.ceil(cols / blocksize) - 1, -1, -1):
+            i0 = sec * blocksize
+            i1 = min(cols, (sec+1) * blocksize)
+            mask = (1 << (i1 - i0)) - 1
+
+            chunks = dict()
+            for r in range(pivot_row, -1, -1):
+                t = (m[r] >> i0) & mask
+                if not t: continue
+                if t in chunks:
+                    m[r] ^= m[chunks[t]]
+                    if x is not None: x.row_add(chunks[t], r)
+                    if y is not None: y.col_add(r, chunks[t])
+                else:
+                    chunks[t] = r
+
+            while len(pivot_cols1) != 0 and i0 <= pivot_cols1[-1] < i1:
+                bit = 1 << pivot_cols1.pop()
+                if pivot_row > 0:
+                    prow = m[pivot_row]
+                    for r in range(0, pivot_row):
+                        if m[r] & bit:
+                            m[r] ^= prow
+                            if x is not None: x.row_add(pivot_row, r)
+                            if y is not None: y.col_add(r, pivot_row)
+                pivot_row -= 1
+
+    return rank
+
+
 class CNOTMaker(object):
     def __init__(self) -> None:
         self.cnots: List[CNOT] = []
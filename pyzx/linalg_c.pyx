@@ -1,166 +1,302 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# cython: language_level=3
+
+"""Compiled version of :class:`pyzx.linalg.Mat2`. This is built as an optional
+extension by setup.py when Cython is available. :mod:`pyzx.linalg` uses it
+for Gaussian elimination when it can be imported, and otherwise falls back
+to the pure-Python implementation."""
+
 cimport cython
 
 import math
 
 import numpy as np
 cimport numpy as np
-from cpython cimport array
-import array
+
+np.import_array()
 
 TYPE = np.uint8
 ctypedef np.uint8_t TYPE_t
 
 cdef class Mat2:
-    cpdef np.uint8_t[:,:] data
-    def __init__(self, np.ndarray[TYPE_t, ndim=2] data):
-        self.data = data
-    
+    """A matrix over Z2 stored as a 2D uint8 array. It has the same methods as
+    :class:`pyzx.linalg.Mat2` and performs the same sequence of primitive row
+    operations in :meth:`gauss`."""
+    cdef public np.uint8_t[:,:] data
+
+    @staticmethod
+    def id(int n):
+        return Mat2(np.identity(n, dtype=TYPE))
+    @staticmethod
+    def zeros(int m, int n):
+        return Mat2(np.zeros((m, n), dtype=TYPE))
+    @staticmethod
+    def unit_vector(int d, int i):
+        v = np.zeros((d, 1), dtype=TYPE)
+        v[i, 0] = 1
+        return Mat2(v)
+
+    def __init__(self, data):
+        a = np.array(data, dtype=TYPE)
+        if a.ndim != 2:
+            a = a.reshape((len(data), 0))
+        self.data = a
+
     cpdef get_data(self):
         return self.data
-    
+
+    cpdef list tolist(self):
+        """Returns the entries as a list of lists of ints, like ``pyzx.linalg.Mat2.data``."""
+        return np.asarray(self.data).tolist()
+
+    def __mul__(self, Mat2 m):
+        a = np.asarray(self.data, dtype=np.int64)
+        b = np.asarray(m.data, dtype=np.int64)
+        return Mat2(((a @ b) % 2).astype(TYPE))
+
+    def __eq__(self, other):
+        if not isinstance(other, Mat2): return False
+        return np.array_equal(np.asarray(self.data), np.asarray((<Mat2>other).data))
+
     def __str__(self):
-        return "\n".join(str(list(r)) for r in self.data)
-    
+        return "\n".join("[ " + "  ".join(str(v) for v in row) + " ]" for row in self.tolist())
+    def __repr__(self):
+        return str(self)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            raise IndexError("Expected a pair of indices/slices.")
+        rs, cs = key
+        if isinstance(rs, slice) or isinstance(cs, slice):
+            if not isinstance(rs, slice): rs = slice(rs, rs+1)
+            if not isinstance(cs, slice): cs = slice(cs, cs+1)
+            return Mat2(np.asarray(self.data)[rs, cs])
+        return int(self.data[rs, cs])
+
+    def __setitem__(self, key, val):
+        if not isinstance(key, tuple):
+            raise IndexError("Expected a pair of indices/slices.")
+        rs, cs = key
+        if not isinstance(rs, slice): rs = slice(rs, rs+1)
+        if not isinstance(cs, slice): cs = slice(cs, cs+1)
+        if isinstance(val, Mat2): val = np.asarray((<Mat2>val).data)
+        elif hasattr(val, 'data'): val = np.array(val.data, dtype=TYPE)
+        np.asarray(self.data)[rs, cs] = val
+
     cpdef Mat2 copy(self):
-        return Mat2(np.asarray(self.data.copy()))
-    
+        return Mat2(np.asarray(self.data).copy())
+
     cpdef Mat2 transpose(self):
         return Mat2(np.asarray(self.data).transpose().copy())
-    
+
     cpdef int rows(self):
         return self.data.shape[0]
-    
+
     cpdef int cols(self):
         return self.data.shape[1]
-    
-    @cython.boundscheck(False)
+
     @cython.wraparound(False)
-    cdef row_add(self, int r0, int r1):
-        cdef int i
-        cdef np.uint8_t[:] a, b
-        a = self.data[r0]
-        b = self.data[r1]
-        for i in range(self.cols()):
-            if a[i]:
-                b[i] = 0 if b[i] else 1
-    
+    cpdef void row_add(self, int r0, int r1):
+        """Add r0 to r1"""
+        cdef Py_ssize_t i
+        cdef np.uint8_t[:] a = self.data[r0]
+        cdef np.uint8_t[:] b = self.data[r1]
+        for i in range(a.shape[0]):
+            b[i] ^= a[i]
+
+    @cython.wraparound(False)
+    cpdef void col_add(self, int c0, int c1):
+        """Add c0 to c1"""
+        cdef Py_ssize_t i
+        for i in range(self.data.shape[0]):
+            self.data[i, c1] ^= self.data[i, c0]
+
+    cpdef void row_swap(self, int r0, int r1):
+        """Swap the rows r0 and r1"""
+        a = np.asarray(self.data)
+        a[[r0, r1]] = a[[r1, r0]]
+
+    cpdef void col_swap(self, int c0, int c1):
+        """Swap the columns c0 and c1"""
+        a = np.asarray(self.data)
+        a[:, [c0, c1]] = a[:, [c1, c0]]
+
+    def permute_rows(self, p):
+        """Permute the rows of the matrix according to the permutation p."""
+        self.data = np.asarray(self.data)[list(p)].copy()
+    def permute_cols(self, p):
+        """Permute the columns of the matrix according to the permutation p."""
+        self.data = np.asarray(self.data)[:, list(p)].copy()
+
     @cython.boundscheck(False)
     @cython.wraparound(False)
-    cdef col_add(self, int c0, int c1):
-        cdef int i
-        cdef np.uint8_t[:] d
-        for i in range(self.rows()):
-            d = self.data[i]
-            if d[c0]:
-                d[c1] = 0 if d[c1] else 1
-    
+    cdef object _chunk(self, Py_ssize_t r, Py_ssize_t i0, Py_ssize_t i1):
+        # A hashable key for the entries i0..i1 of row r, which is 0 if they are all zero.
+        cdef unsigned long long key = 0
+        cdef Py_ssize_t k
+        if i1 - i0 > 63:
+            return int.from_bytes(bytes(np.asarray(self.data[r, i0:i1])), 'little')
+        for k in range(i0, i1):
+            key = (key << 1) | self.data[r, k]
+        return key
+
     @cython.boundscheck(False)
     @cython.wraparound(False)
-    cpdef int gauss(self, int full_reduce=0, int blocksize=6):
-        cdef int pivot_row, sec, i0, i1, r, p, r0, r1, rank, pcol, rows, cols
-        cdef array.array pcols = array.array('i',[])
+    cpdef int gauss(self, bint full_reduce=False, object x=None, object y=None, int blocksize=6, list pivot_cols=None):
+        """Compute the echelon form. Returns the number of non-zero rows in the result, i.e.
+        the rank of the matrix. See :meth:`pyzx.linalg.Mat2.gauss` for the meaning of the parameters."""
+        cdef Py_ssize_t rows = self.data.shape[0]
+        cdef Py_ssize_t cols = self.data.shape[1]
+        cdef Py_ssize_t pivot_row = 0, sec, i0, i1, r, p, r0, r1, rank, pcol
         cdef dict chunks
-        cdef tuple t
-        
-        rows = self.rows()
-        cols = self.cols()
-        #pcols = array.array('i',[])
-        pivot_row = 0
-        for sec in range(math.ceil(float(cols) / blocksize)):
+        cdef list pivot_cols1
+        if pivot_cols is None: pivot_cols = []
+
+        for sec in range(<Py_ssize_t>math.ceil(float(cols) / blocksize)):
             i0 = sec * blocksize
             i1 = min(cols, (sec+1) * blocksize)
             # search for duplicate chunks of 'blocksize' bits and eliminate them
             chunks = dict()
             for r in range(pivot_row, rows):
-                t = tuple(self.data[r][i0:i1])
-                if not any(t): continue
+                t = self._chunk(r, i0, i1)
+                if not t: continue
                 if t in chunks:
-                    #print('hit (down)', r, chunks[t], t, i0, i1)
                     self.row_add(chunks[t], r)
-                    #if x != None: x.row_add(chunks[t], r)
-                    #if y != None: y.col_add(r, chunks[t])
+                    if x is not None: x.row_add(chunks[t], r)
+                    if y is not None: y.col_add(r, chunks[t])
                 else:
                     chunks[t] = r
-            p = i0
-            while p < i1:
+            for p in range(i0, i1):
                 for r0 in range(pivot_row, rows):
-                    if self.data[r0][p] != 0:
+                    if self.data[r0, p]:
                         if r0 != pivot_row:
                             self.row_add(r0, pivot_row)
-                            #if x != None: x.row_add(r0, pivot_row)
-                            #if y != None: y.col_add(pivot_row, r0)
-
+                            if x is not None: x.row_add(r0, pivot_row)
+                            if y is not None: y.col_add(pivot_row, r0)
                         for r1 in range(pivot_row+1, rows):
-                            if pivot_row != r1 and self.data[r1][p] != 0:
+                            if self.data[r1, p]:
                                 self.row_add(pivot_row, r1)
-                                #if x != None: x.row_add(pivot_row, r1)
-                                #if y != None: y.col_add(r1, pivot_row)
-                        if full_reduce: pcols.append(p)
+                                if x is not None: x.row_add(pivot_row, r1)
+                                if y is not None: y.col_add(r1, pivot_row)
+                        pivot_cols.append(p)
                         pivot_row += 1
                         break
-                p += 1
         rank = pivot_row
+
         if full_reduce:
             pivot_row -= 1
-            for sec in range(math.ceil(float(cols) / blocksize) - 1, -1, -1):
+            pivot_cols1 = list(pivot_cols)
+            for sec in range(<Py_ssize_t>math.ceil(float(cols) / blocksize) - 1, -1, -1):
                 i0 = sec * blocksize
-                i1 = min(self.cols(), (sec+1) * blocksize)
-                # search for duplicate chunks of 'blocksize' bits and eliminate them
+                i1 = min(cols, (sec+1) * blocksize)
                 chunks = dict()
                 for r in range(pivot_row, -1, -1):
-                    t = tuple(self.data[r][i0:i1])
-                    if not any(t): continue
+                    t = self._chunk(r, i0, i1)
+                    if not t: continue
                     if t in chunks:
-                        #print('hit (up)', r, chunks[t], t, i0, i1)
                         self.row_add(chunks[t], r)
-                        #if x != None: x.row_add(chunks[t], r)
-                        #if y != None: y.col_add(r, chunks[t])
+                        if x is not None: x.row_add(chunks[t], r)
+                        if y is not None: y.col_add(r, chunks[t])
                     else:
                         chunks[t] = r
-                while len(pcols) and (i0 <= pcols[len(pcols)-1] < i1):
-                    pcol = pcols.pop()
+                while len(pivot_cols1) != 0 and i0 <= pivot_cols1[len(pivot_cols1)-1] < i1:
+                    pcol = pivot_cols1.pop()
                     for r in range(0, pivot_row):
-                        if self.data[r][pcol]:
+                        if self.data[r, pcol]:
                             self.row_add(pivot_row, r)
-                            #if x != None: x.row_add(pivot_row, r)
-                            #if y != None: y.col_add(r, pivot_row)
+                            if x is not None: x.row_add(pivot_row, r)
+                            if y is not None: y.col_add(r, pivot_row)
                     pivot_row -= 1
         return rank
-    
-    @cython.boundscheck(False)
-    @cython.wraparound(False)
-    cpdef np.ndarray[TYPE_t,ndim=2] nullspace(self, int should_copy=1):
+
+    cpdef int rank(self):
+        """Returns the rank of the matrix."""
+        return self.copy().gauss()
+
+    def factor(self):
+        """Produce a factorisation m = m0 * m1, where
+
+        m0.cols() = m1.rows() = m.rank()
+        """
+        m0 = Mat2.id(self.rows())
+        m1 = self.copy()
+        rank = m1.gauss(y = m0)
+        return (Mat2(np.asarray(m0.data)[:, :rank]), Mat2(np.asarray(m1.data)[:rank]))
+
+    def inverse(self):
+        """Returns the inverse of m is invertible and None otherwise."""
+        if self.rows() != self.cols(): return None
+        m = self.copy()
+        inv = Mat2.id(self.rows())
+        rank = m.gauss(x=inv, full_reduce=True)
+        if rank < self.rows(): return None
+        return inv
+
+    def solve(self, Mat2 b):
+        """Return a vector x such that M * x = b, or None if there is no solution."""
+        m = self.copy()
+        b1 = b.copy()
+        m.gauss(x=b1, full_reduce=True)
+        x = Mat2.zeros(m.cols(), 1)
+        for i, row in enumerate(m.tolist()):
+            if any(row):
+                x.data[row.index(1), 0] = b1.data[i, 0]
+            elif b1.data[i, 0]:
+                return None
+        return x
+
+    def nullspace(self, bint should_copy=True):
         """Returns a list of non-zero vectors that span the nullspace
         of the matrix. If the matrix has trivial kernel it returns the empty list."""
-        cdef int cols, i, j
-        cdef list nonpivots, pivots
-        cdef Mat2 m
-        cdef np.uint8_t[:] r
-        cdef np.ndarray[TYPE_t,ndim=1] v
-        cdef np.ndarray[TYPE_t,ndim=2] vectors
-        if should_copy:
-            m = self.copy()
-        else:
-            m = self
+        m = self.copy() if should_copy else self
         m.gauss(full_reduce=True)
         cols = self.cols()
-        nonpivots = list(range(cols))
-        pivots = []
-        for i, r in enumerate(m.data):
-            for j in range(cols):
-                if r[j]:
-                    nonpivots.remove(j)
-                    pivots.append(j)
-                    break
-        vectors = np.ndarray([0,cols], dtype=TYPE)
-        for i in nonpivots:
-            v = np.zeros(cols,dtype=TYPE)
-            v[i] = 1
-            for r, j in zip(m.data, pivots):
-                if r[i]: v[j] = 1
-            vectors = np.insert(vectors, vectors.shape[0], v, 0)
+        data = m.tolist()
+        pivots = [row.index(1) for row in data if any(row)]
+        ps = set(pivots)
+        vectors = []
+        for n in range(cols):
+            if n in ps: continue
+            v = [0]*cols
+            v[n] = 1
+            for r, p in zip(data, pivots):
+                if r[n]: v[p] = 1
+            vectors.append(v)
         return vectors
 
+    def to_cnots(self, bint optimize=False, bint use_log_blocksize=False):
+        """Returns a list of CNOTs that implements the matrix as a reversible circuit of qubits."""
+        from .linalg import CNOTMaker
+        if not optimize:
+            cn = CNOTMaker()
+            blocksize = 5
+            if use_log_blocksize:
+                blocksize = int(math.log2(self.rows()))
+            self.copy().gauss(full_reduce=True, x=cn, blocksize=blocksize)
+            return cn.cnots
+        best_cn = None
+        for size in range(1, self.rows() + 1):
+            cn = CNOTMaker()
+            self.copy().gauss(full_reduce=True, x=cn, blocksize=size)
+            if best_cn is None or len(cn.cnots) < len(best_cn.cnots):
+                best_cn = cn
+        return best_cn.cnots
+
 # cpdef ident(n):
 #     i = np.identity(n, TYPE)
 #     return Mat2(i)
@@ -344,7 +480,6 @@ cdef class Mat2:
 #     a.gauss(full_reduce=True)
 
 def do_gauss(m, full_reduce=0, blocksize=6):
-    m = np.asarray(m,dtype=TYPE)
     a = Mat2(m)
-    a.gauss(full_reduce,blocksize)
-    return np.asarray(a.get_data()).tolist()
\ No newline at end of file
+    a.gauss(full_reduce, blocksize=blocksize)
+    return a.tolist()
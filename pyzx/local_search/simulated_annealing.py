@@ -18,6 +18,7 @@
 from tqdm import tqdm
 import random
 import math
+import time
 import numpy as np
 
 from .congruences import uniform_weights, apply_rand_lc, apply_rand_pivot
@@ -45,11 +46,19 @@ def anneal(g, iters=1000,
            pivot_select=uniform_weights,
            full_reduce_prob=0.1,
            reset_prob=0.0,
-           quiet=False
+           quiet=False,
+           time_budget=None,
+           callback=None
 ):
     """Simulated annealing over a ZX-diagram generated by the congruences defined in
-    congruences.py to minimize the supplied energy function"""
+    congruences.py to minimize the supplied energy function
 
+    If ``time_budget`` is given, the annealing stops after that many seconds even if
+    fewer than ``iters`` iterations were done, and the best diagram so far is returned.
+    ``callback`` is called as ``callback(i, score)`` whenever iteration ``i`` finds a
+    diagram with a better score."""
+
+    deadline = None if time_budget is None else time.time() + time_budget
     g_best = g.copy()
     sz = score(g_best)
     sz_best = sz
@@ -57,6 +66,8 @@ def anneal(g, iters=1000,
     best_scores = list()
 
     for i in tqdm(range(iters), desc="annealing...", disable=quiet):
+        if deadline is not None and time.time() > deadline:
+            break
 
         g1 = g.copy()
 
@@ -85,6 +96,8 @@ def anneal(g, iters=1000,
             if sz < sz_best:
                 g_best = g.copy()
                 sz_best = sz
+                if callback is not None:
+                    callback(i, sz_best)
         elif random.uniform(0, 1) < reset_prob:
             g = g_best.copy()
 
@@ -26,6 +26,8 @@ from .circuit import Circuit
 from .circuit.gates import Gate, ZPhase, XPhase, CNOT, CZ, ParityPhase, NOT, HAD, SWAP, S, Z
 from .extract import permutation_as_swaps
 from .todd import todd_simp
+from . import profiling
+from .profiling import profiled
 
 __all__ = ['full_optimize', 'basic_optimization', 'phase_block_optimize']
 
@@ -40,6 +42,7 @@ def full_optimize(circuit: Circuit, quiet:bool=True) -> Circuit:
     c = phase_block_optimize(c, quiet=quiet)
     return basic_optimization(c.to_basic_gates())
 
+@profiled('basic_optimization')
 def basic_optimization(circuit: Circuit, do_swaps:bool=True, quiet:bool=True) -> Circuit:
     """Optimizes the circuit using a strategy that involves delayed placement of gates
     so that more matches for gate cancellations are found. Specifically tries to minimize
@@ -137,6 +140,8 @@ class Optimizer(object):
             self.circuit, correction = self.parse_forward()
             i += 1
             s = stats(self.circuit)
+            prof = profiling.active
+            if prof is not None: prof.sample('basic_optimization', gates=len(self.circuit.gates), two_qubit=s[1])
             if self.minimize_czs and (all(s1<=s2 for s1,s2 in zip(count,s)) or i>=max_iterations): break
             for g in correction: self.circuit.gates.extend(g.to_basic_gates())
             if not quiet:
@@ -150,6 +155,7 @@ class Optimizer(object):
         else:
             return self.circuit, correction
     
+    @profiled('forward_pass')
     def parse_forward(self) -> Tuple[Circuit, List[Gate]]:
         """Does a single forward pass trough self.circuit.gates."""
         self.gates: Dict[int,List[Gate]] = {i:list() for i in range(self.qubits)}
@@ -0,0 +1,204 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements an opt-in profiler for the hot paths of PyZX: the rewrite
+loop :func:`~pyzx.simplify.simp` behind all the simplifications, :func:`~pyzx.extract.extract_circuit`,
+:func:`~pyzx.optimize.basic_optimization` and :func:`~pyzx.tensor.tensorfy`.
+
+While a :class:`Profiler` is active, these record the wall time spent in each rule and in
+each phase of the work (for instance matching versus rewriting versus updating the graph),
+the number of matches found in each iteration of a rule, and the size of the graph or
+circuit over time::
+
+    with profiling.profile() as prof:
+        zx.full_reduce(g)
+        c = zx.extract_circuit(g)
+    print(prof)
+    prof.write_json('profile.json')
+    prof.write_collapsed('profile.folded')  # Input for flamegraph.pl or speedscope
+
+When no profiler is active, the instrumented functions only check whether
+:data:`active` is ``None``, so the instrumentation can be left in production code.
+"""
+
+import json
+import time
+import functools
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
+
+__all__ = ['Profiler', 'profile', 'profiled', 'active']
+
+active: Optional['Profiler'] = None
+"""The profiler that is currently recording, or ``None``."""
+
+
+class Profiler(object):
+    """Collects the timings and counts of the instrumented functions.
+
+    Sections are nested, and every timing is recorded under the stack of sections
+    that were open at the time, e.g. ``('full_reduce', 'spider_simp', 'match')``.
+
+    Attributes:
+        times: The total wall time in seconds spent in each stack of sections.
+        calls: The number of times each stack of sections was entered.
+        matches: For every rule, the number of matches found in each of its iterations.
+        samples: Sizes recorded over time, as dictionaries with the keys ``time``,
+            ``label`` and the recorded counts such as ``vertices`` and ``edges``.
+    """
+    def __init__(self) -> None:
+        self.times: Dict[Tuple[str, ...], float] = {}
+        self.calls: Dict[Tuple[str, ...], int] = {}
+        self.matches: Dict[str, List[int]] = {}
+        self.samples: List[Dict[str, Any]] = []
+        self.stack: List[str] = []
+        self._starts: List[float] = []
+        self.start = time.perf_counter()
+
+    clock = staticmethod(time.perf_counter)
+
+    def _add(self, path: Tuple[str, ...], t: float) -> None:
+        self.times[path] = self.times.get(path, 0.0) + t
+        self.calls[path] = self.calls.get(path, 0) + 1
+
+    def enter(self, name: str) -> None:
+        """Opens a section. Every :meth:`enter` should be followed by an :meth:`exit`."""
+        self.stack.append(name)
+        self._starts.append(time.perf_counter())
+
+    def exit(self) -> None:
+        """Closes the innermost section and records its time."""
+        t = time.perf_counter() - self._starts.pop()
+        self._add(tuple(self.stack), t)
+        self.stack.pop()
+
+    def lap(self, phase: str, t0: float) -> float:
+        """Records the time since ``t0`` as a phase of the current section, and returns the
+        current time, to be used as the start of the next phase. For instance::
+
+            t = prof.clock()
+            m = match(g)
+            t = prof.lap('match', t)
+            rewrite(g, m)
+            t = prof.lap('rewrite', t)
+        """
+        t = time.perf_counter()
+        self._add((*self.stack, phase), t - t0)
+        return t
+
+    def count_matches(self, rule: str, n: int) -> None:
+        """Records that an iteration of ``rule`` found ``n`` matches."""
+        self.matches.setdefault(rule, []).append(n)
+
+    def sample(self, label: str, **counts: int) -> None:
+        """Records sizes, such as ``vertices=g.num_vertices()``, at the current time."""
+        self.samples.append(dict(time=time.perf_counter() - self.start, label=label, **counts))
+
+    def sample_graph(self, label: str, g: Any) -> None:
+        """Records the number of vertices and edges of a graph at the current time."""
+        self.sample(label, vertices=g.num_vertices(), edges=g.num_edges())
+
+    def self_times(self) -> Dict[Tuple[str, ...], float]:
+        """The time spent in each stack of sections, excluding the time of its subsections."""
+        result = dict(self.times)
+        for path, t in self.times.items():
+            if len(path) > 1 and path[:-1] in result:
+                result[path[:-1]] -= t
+        return result
+
+    def totals(self) -> Dict[str, float]:
+        """The total time per section or phase name, regardless of where it was entered.
+        Time spent in nested sections with the same name is counted once."""
+        result: Dict[str, float] = {}
+        for path, t in self.times.items():
+            if path[-1] not in path[:-1]:
+                result[path[-1]] = result.get(path[-1], 0.0) + t
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sections': [{'stack': list(path), 'time': t, 'calls': self.calls[path]}
+                         for path, t in self.times.items()],
+            'matches': self.matches,
+            'samples': self.samples,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+
+    def collapsed(self) -> str:
+        """Returns the timings in the collapsed stack format used by ``flamegraph.pl``,
+        speedscope and similar tools: one line per stack with its self time in microseconds."""
+        lines = []
+        for path, t in sorted(self.self_times().items()):
+            us = int(round(t * 1e6))
+            if us > 0:
+                lines.append("{} {}".format(';'.join(path), us))
+        return '\n'.join(lines) + '\n'
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+
+    def __str__(self) -> str:
+        s = "PROFILE\n"
+        for path, t in sorted(self.times.items()):
+            s += "%s %s %s\n" % ("{:.4f}s".format(t).rjust(10), str(self.calls[path]).rjust(7),
+                                 '  ' * (len(path) - 1) + path[-1])
+        for rule, ms in self.matches.items():
+            s += "%s matches in %d iterations of %s\n" % (str(sum(ms)).rjust(10), len(ms), rule)
+        return s
+
+
+class profile(object):
+    """Context manager that makes a :class:`Profiler` active for the duration of
+    the ``with`` block, and returns it."""
+    def __init__(self, profiler: Optional[Profiler] = None) -> None:
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.previous: Optional[Profiler] = None
+
+    def __enter__(self) -> Profiler:
+        global active
+        self.previous = active
+        active = self.profiler
+        return self.profiler
+
+    def __exit__(self, *args: Any) -> None:
+        global active
+        active = self.previous
+
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+def profiled(name: str) -> Callable[[F], F]:
+    """Decorator that records every call of the function as a section called ``name``
+    of the active profiler."""
+    def decorator(f: F) -> F:
+        @functools.wraps(f)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            prof = active
+            if prof is None:
+                return f(*args, **kwargs)
+            prof.enter(name)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                prof.exit()
+        return cast(F, wrapper)
+    return decorator
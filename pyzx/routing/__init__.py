@@ -23,6 +23,7 @@ __all__ = [
     "architectures",
     "create_architecture",
     "Architecture",
+    "ArchitectureCache",
 
     # Qubit parity map trackers
     "Parity",
@@ -45,7 +46,7 @@ __all__ = [
     "route_phase_poly",
 ]
 
-from .architecture import Architecture, architectures, create_architecture
+from .architecture import Architecture, ArchitectureCache, architectures, create_architecture
 from .cnot_mapper import ElimMode, CostMetric, FitnessFunction, gauss, permuted_gauss, sequential_gauss
 from .parity_maps import Parity, CNOT_tracker
 from .steiner import steiner_gauss, rec_steiner_gauss
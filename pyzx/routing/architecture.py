@@ -18,13 +18,19 @@
 import math
 import itertools
 import sys
-from typing import Any, Dict, Iterator, List, Set, Tuple, Optional, Union
+import os
+import json
+import hashlib
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Set, Tuple, Optional, Union
 from typing_extensions import Literal
 
 from pyzx.graph.base import BaseGraph
 if __name__ == '__main__':
     sys.path.append('..')
 from ..graph.graph import Graph
+from ..cache import ResultCache
 #from pyzx.graph.base import BaseGraph # TODO fix the right graph import - one of many - right backend etc
 
 import numpy as np
@@ -59,12 +65,180 @@ hamiltonian_path_architectures = [FULLY_CONNECTED, LINE, CIRCLE, SQUARE, IBM_QX4
                 IBM_QX5, IBM_Q20_TOKYO, RIGETTI_8Q_AGAVE, RIGETTI_16Q_ASPEN, 
                 IBMQ_POUGHKEEPSIE]
 
+def _floyd_warshall_steps(in_neighbors: List[List[int]], order: Iterable[int]) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Vectorized Floyd-Warshall on an unweighted directed graph, adding the intermediate vertices one at a time.
+
+    After the step that yields vertex w, the entries of the distance matrix between the vertices processed so far
+    are the distances in the subgraph induced by those vertices. Hence a single pass gives all prefix (or suffix) subgraphs.
+
+    :param in_neighbors: For each vertex index, the indices of the vertices with an edge towards it
+    :param order: The order in which to add the vertices as intermediates
+    :yields: Pairs (w, dist) of the vertex just added and the current distance matrix, which is updated in place.
+        Unreachable pairs have distance len(in_neighbors).
+    """
+    n = len(in_neighbors)
+    # Any finite distance is smaller than n and the sum of two distances must not overflow
+    dist = np.full((n, n), n, dtype=np.int16 if n < 2**14 else np.int32)
+    for b, ins in enumerate(in_neighbors):
+        dist[ins, b] = 1
+    np.fill_diagonal(dist, 0)
+    for w in order:
+        np.minimum(dist, dist[:, w, None] + dist[None, w, :], out=dist)
+        yield w, dist
+
+class ShortestPaths(Mapping[Tuple[int,int], Tuple[int,List[Tuple[int,int]]]]):
+    """
+    All-pairs shortest paths in a subgraph of an architecture, stored as a distance matrix.
+
+    Behaves as a read-only dict such that paths[(v1,v2)] is the distance between the vertices v1 and v2
+    together with the shortest path as a list of edges. Only the distances are stored, the paths are rebuilt when requested.
+    Pairs of vertices that are not connected in the subgraph are not in the mapping.
+    """
+
+    def __init__(self, vertices: List[int], dist: np.ndarray, in_neighbors: List[List[int]], offset: int=0):
+        """
+        :param vertices: The vertices of the subgraph, in the order of the rows of `dist`
+        :param dist: Matrix with the distances between the vertices, where values >= len(in_neighbors) mean unreachable
+        :param in_neighbors: For each vertex index of the full graph, the indices of the vertices with an edge towards it
+        :param offset: The index in the full graph of the first vertex of the subgraph
+        """
+        self.vertices = vertices
+        self._index = {v: i for i, v in enumerate(vertices)}
+        self._dist = dist
+        self._in_neighbors = in_neighbors
+        self._offset = offset
+        self._unreachable = len(in_neighbors)
+
+    def distance(self, v1: int, v2: int) -> Optional[int]:
+        """Returns the length of the shortest path from v1 to v2, or None if there is no path in the subgraph."""
+        i, j = self._index.get(v1), self._index.get(v2)
+        if i is None or j is None:
+            return None
+        d = int(self._dist[i, j])
+        return d if d < self._unreachable else None
+
+    def closest(self, sources: Iterable[int], targets: Iterable[int]) -> Optional[Tuple[int,int,int]]:
+        """
+        Returns the closest pair of a source and a target as a tuple (target, source, distance), or None if there is no path from any source to any target.
+        Ties are broken by the order of the targets and then by the order of the sources, as in a loop over both.
+        """
+        sources = [v for v in sources if v in self._index]
+        targets = [v for v in targets if v in self._index]
+        if not sources or not targets:
+            return None
+        # Transposed, so that the first minimum in row-major order is the first one in the loop order
+        dist = self._dist[np.ix_([self._index[v] for v in sources], [self._index[v] for v in targets])].T
+        t, s = divmod(int(np.argmin(dist)), len(sources))
+        d = int(dist[t, s])
+        return (targets[t], sources[s], d) if d < self._unreachable else None
+
+    def path(self, v1: int, v2: int) -> List[Tuple[int,int]]:
+        """Returns a shortest path from v1 to v2 as a list of edges."""
+        if self.distance(v1, v2) is None:
+            raise KeyError((v1, v2))
+        i, j = self._index[v1], self._index[v2]
+        lo, hi = self._offset, self._offset + len(self.vertices)
+        path = []
+        # Walk backwards from v2, each time picking a neighbour that is one step closer to v1
+        while j != i:
+            d = self._dist[i, j] - 1
+            k = next(k - lo for k in self._in_neighbors[j + lo] if lo <= k < hi and self._dist[i, k - lo] == d)
+            path.append((self.vertices[k], self.vertices[j]))
+            j = k
+        path.reverse()
+        return path
+
+    def __getitem__(self, key: Tuple[int,int]) -> Tuple[int,List[Tuple[int,int]]]:
+        d = self.distance(*key)
+        if d is None:
+            raise KeyError(key)
+        return d, self.path(*key)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, tuple) and len(key) == 2 and self.distance(*key) is not None
+
+    def __iter__(self) -> Iterator[Tuple[int,int]]:
+        for i, j in zip(*np.nonzero(self._dist < self._unreachable)):
+            yield self.vertices[i], self.vertices[j]
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._dist < self._unreachable))
+
+class SteinerTreeCache():
+    """
+    A bounded cache of the Steiner trees of an architecture, which discards the least recently used tree when it is full.
+
+    Each architecture has one in :attr:`Architecture.steiner_trees`, shared by all eliminations on that architecture.
+    The terminals of a tree are part of its key as a bitset, an int with bit q set for each terminal qubit q,
+    so the same terminal set in any order finds the same tree.
+    The attributes `hits` and `misses` count the lookups that found a tree and that had to build one.
+    The cache is cleared when the `qubit_map` of the architecture is changed, and it is empty when pickled.
+
+    :param max_size: The maximal number of trees kept, 0 disables the cache.
+    """
+
+    def __init__(self, max_size: int=4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._trees: 'OrderedDict[Tuple[Any, ...], Any]' = OrderedDict()
+
+    @staticmethod
+    def bitset(qubits: Iterable[int]) -> int:
+        """Returns the set of qubits as an int with bit q set for each qubit q."""
+        b = 0
+        for q in qubits:
+            b |= 1 << q
+        return b
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Any]:
+        """Returns the tree with the given key, or None if it is not in the cache."""
+        tree = self._trees.get(key)
+        if tree is None:
+            self.misses += 1
+        else:
+            self._trees.move_to_end(key)
+            self.hits += 1
+        return tree
+
+    def put(self, key: Tuple[Any, ...], tree: Any) -> None:
+        """Stores a tree, discarding the least recently used one if the cache is full."""
+        if self.max_size <= 0:
+            return
+        self._trees[key] = tree
+        while len(self._trees) > self.max_size:
+            self._trees.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of the lookups that found a tree."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        """Removes all trees. The counters are kept."""
+        self._trees.clear()
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # An architecture is pickled with every GA fitness function sent to a worker process, so the trees are left out
+        return {"max_size": self.max_size}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.max_size = state["max_size"]
+        self.hits = 0
+        self.misses = 0
+        self._trees = OrderedDict()
+
 class Architecture():
     """
     Class that represents the architecture of the qubits to be taken into account when routing.
     """
 
-    def __init__(self, name: str, coupling_graph: Optional[BaseGraph]=None, coupling_matrix=None, backend: Optional[str]=None, qubit_map: Optional[List[int]] = None, reduce_order: Optional[List[int]]=None, **kwargs):
+    def __init__(self, name: str, coupling_graph: Optional[BaseGraph]=None, coupling_matrix=None, backend: Optional[str]=None, qubit_map: Optional[List[int]] = None, reduce_order: Optional[List[int]]=None, cache: Optional['ArchitectureCache']=None, steiner_cache_size: int=4096, **kwargs):
         """
         Class that represents the architecture of the qubits to be taken into account when routing.
 
@@ -72,7 +246,11 @@ class Architecture():
         :param coupling_matrix: a 2D numpy array representing the adjacency of the qubits, from which the Graph is created, optional
         :param backend: The PyZX Graph backend to be used when creating it from the adjacency matrix, optional
         :param reduce_order: A list of integers representing the order in which the qubits should be scanned for some operations (e.g. steiner tree reduction), optional
-        :param qubit_map: A qubit placement mapping list such that qubit_map[logical_qubit] = graph_node
+        :param qubit_map: A qubit placement mapping list such that qubit_map[logical_qubit] = graph_node.
+            Assigning a new list to `qubit_map` later relabels the graph and invalidates the distances and Steiner trees.
+        :param cache: An :class:`ArchitectureCache` to load the qubit placement, reduce order and distances from, optional.
+            If the coupling graph is not in the cache yet, they are computed and stored.
+        :param steiner_cache_size: The number of Steiner trees kept in :attr:`steiner_trees`, optional
         """
         self.name = name
         if coupling_graph is None:
@@ -89,29 +267,65 @@ class Architecture():
             self.graph.add_edges(edges)
         self.vertices = list(self.graph.vertices())
 
-        if qubit_map is not None:
-            self.qubit_map = qubit_map
-        elif reduce_order is not None:
+        # The key of this architecture in `cache`, see :class:`ArchitectureCache`
+        self.cache_key: Optional[str] = None
+        cached: Optional[Dict[str, Any]] = None
+        if cache is not None:
+            self.cache_key = cache.architecture_key(self.graph, qubit_map, reduce_order)
+            cached = cache.load(self.cache_key)
+            if cached is not None:
+                qubit_map, reduce_order = cached["qubit_map"], cached["reduce_order"]
+
+        if qubit_map is None and reduce_order is not None:
             # No qubit map given, but there is a reduce order, so assuming a default i-i mapping.
-            self.qubit_map = list(range(len(reduce_order)))
-        else:
-            self.qubit_map = self._place_qubits()
-        for q,v in enumerate(self.qubit_map):
-            self.graph.set_qubit(v, q)
-            
-        # Set qubit indices to each element of the graph
-        for i, v in enumerate(self.graph.vertices()):
-            if self.graph.qubit(v) < 0: # Defaults to -1
-                self.graph.set_qubit(v, i)
+            qubit_map = list(range(len(reduce_order)))
+        elif qubit_map is None:
+            qubit_map = self._place_qubits()
+        self._set_qubit_map(qubit_map)
 
         # Pre-calculated distances between all pairs of qubits in the architecture
         # See :func:`pre_calc_distances` for more details
-        self.distances: Optional[Dict[Literal["upper", "full"], List[Dict[Tuple[int,int], Tuple[int,List[Tuple[int,int]]]]]]] = None
+        self.distances: Optional[Dict[Literal["upper", "full"], List[ShortestPaths]]] = None
+        # Memoized Steiner trees, see :func:`steiner_tree_edges` and :func:`rec_steiner_tree`
+        self.steiner_trees = SteinerTreeCache(steiner_cache_size)
+        # Memoized distances in the subgraphs used by :func:`rec_steiner_tree`
+        self._subgraph_distances: Dict[Tuple[Any, ...], ShortestPaths] = {}
 
         self.n_qubits = len(self.vertices)
         self.reduce_order = self._get_reduce_order() if reduce_order is None else reduce_order
         self._non_cutting_vertices: Dict[Tuple[int, ...], List[int]] = {}
 
+        if cached is not None:
+            self.distances = cached["distances"]
+            self._non_cutting_vertices.update(cached["non_cutting_vertices"])
+        elif cache is not None:
+            self.distances = self.pre_calc_distances()
+            cache.store(self)
+
+    @property
+    def qubit_map(self) -> List[int]:
+        """A qubit placement mapping list such that qubit_map[logical_qubit] = graph_node"""
+        return self._qubit_map
+
+    @qubit_map.setter
+    def qubit_map(self, qubit_map: List[int]) -> None:
+        self._set_qubit_map(qubit_map)
+        # Everything computed for the old placement is invalid now
+        self.distances = None
+        self._subgraph_distances.clear()
+        self.steiner_trees.clear()
+        self.cache_key = None
+
+    def _set_qubit_map(self, qubit_map: List[int]) -> None:
+        self._qubit_map = qubit_map
+        for q,v in enumerate(qubit_map):
+            self.graph.set_qubit(v, q)
+            
+        # Set qubit indices to each element of the graph
+        for i, v in enumerate(self.graph.vertices()):
+            if self.graph.qubit(v) < 0: # Defaults to -1
+                self.graph.set_qubit(v, i)
+
     def qubit2vertex(self, qubit: int) -> int:
         """Get the internal graph vertex index for a logical architecture qubit."""
         return self.qubit_map[qubit]
@@ -120,17 +334,47 @@ class Architecture():
         """Get the logical architecture qubit for an internal graph vertex index."""
         return int(self.graph.qubit(vertex))
 
-    def pre_calc_distances(self) -> Dict[Literal["upper", "full"], List[Dict[Tuple[int,int], Tuple[int,List[Tuple[int,int]]]]]]:
+    def pre_calc_distances(self) -> Dict[Literal["upper", "full"], List[ShortestPaths]]:
         """
         Pre-calculates the distances between all pairs of qubits in the architecture.
 
+        Each kind of subgraph is computed with a single pass of Floyd-Warshall, adding the vertices in order (for "full") or
+        in reverse order (for "upper"), such that every prefix or suffix of the vertices is a snapshot of that pass.
+
         :return: The computed distances. distances["upper"|"full"][until][(v1,v2)] contains the distance between v1 and v2, and the shortest path, where
             upper|full indicates whether to consider bidirectional edges or not (respectively),
             until indicates the number of qubits to consider, for "full" the distance is calculated only between qubits with index <= until),
             and for "upper" the distance is calculated only between qubits with index >= until)
         """
-        return {"upper": [self.floyd_warshall(self.vertices[until:], upper=True) for until, v in enumerate(self.vertices)],
-                "full": [self.floyd_warshall(self.vertices[:until+1], upper=False) for until, v in enumerate(self.vertices)]}
+        n = len(self.vertices)
+        in_neighbors = self._in_neighbors(self.vertices, upper=True)
+        upper = [ShortestPaths(self.vertices[until:], dist[until:, until:].copy(), in_neighbors, until)
+                 for until, dist in _floyd_warshall_steps(in_neighbors, reversed(range(n)))]
+        in_neighbors = self._in_neighbors(self.vertices, upper=False)
+        full = [ShortestPaths(self.vertices[:until+1], dist[:until+1, :until+1].copy(), in_neighbors)
+                for until, dist in _floyd_warshall_steps(in_neighbors, range(n))]
+        return {"upper": upper[::-1], "full": full}
+
+    def _in_neighbors(self, vertices: List[int], upper: bool=True, rec_vertices: List[int]=[]) -> List[List[int]]:
+        """
+        Computes the adjacency of the subgraph on the given vertices, see :func:`floyd_warshall` for the meaning of the arguments.
+
+        :return: For each index in `vertices`, the indices of the vertices with an edge towards it
+        """
+        index = {v: i for i, v in enumerate(vertices)}
+        rec = set(rec_vertices)
+        in_neighbors: List[List[int]] = [[] for _ in vertices]
+        for edge in self.graph.edges():
+            src, tgt = self.graph.edge_st(edge)
+            if src in index and tgt in index:
+                if upper or (src in rec and tgt in rec):
+                    in_neighbors[index[tgt]].append(index[src])
+                    in_neighbors[index[src]].append(index[tgt])
+                elif self.vertex2qubit(src) > self.vertex2qubit(tgt):
+                    in_neighbors[index[tgt]].append(index[src])
+                else:
+                    in_neighbors[index[src]].append(index[tgt])
+        return in_neighbors
 
     def _get_reduce_order(self) -> List[int]:
         vertices = list(sorted(self.vertices, reverse=True, key=self.vertex2qubit)) # sort qubits from large to small
@@ -279,7 +523,7 @@ class Architecture():
             filename = self.name + ".png"
         plt.savefig(filename)
 
-    def floyd_warshall(self, subgraph_vertices: List[int], upper: bool=True, rec_vertices: List[int]=[]) -> Dict[Tuple[int,int], Tuple[int,List[Tuple[int,int]]]]:
+    def floyd_warshall(self, subgraph_vertices: List[int], upper: bool=True, rec_vertices: List[int]=[]) -> ShortestPaths:
         """
         Implementation of the Floyd-Warshall algorithm to calculate the all-pair distances in a given graph
 
@@ -289,33 +533,12 @@ class Architecture():
         :return: A dict with for each pair of qubits in the graph, a tuple with their distance and the corresponding shortest path
         """
         # https://en.wikipedia.org/wiki/Floyd%E2%80%93Warshall_algorithm
-        distances = {}
-        vertices = subgraph_vertices if subgraph_vertices is not None else self.vertices
-        for edge in self.graph.edges():
-            src, tgt = self.graph.edge_st(edge)
-            if src in vertices and tgt in vertices:
-                if upper or (src in rec_vertices and tgt in rec_vertices):
-                    distances[(src, tgt)] = (1, [(src, tgt)])
-                    distances[(tgt, src)] = (1, [(tgt, src)])
-                elif self.vertex2qubit(src) > self.vertex2qubit(tgt):
-                    distances[(src, tgt)] = (1, [(src, tgt)])
-                else:
-                    distances[(tgt, src)] = (1, [(tgt, src)])
-        for v in vertices:
-            distances[(v, v)] = (0, [])
-        for v0 in vertices+vertices:
-            for v1 in vertices:
-                for v2 in vertices:
-                    # Consider the path v0 -> v1 -> v2 as a shortest path candidate for v0 -> v2
-                    if (v0, v1) in distances.keys() and (v1, v2) in distances.keys():
-                        if (v0, v2) not in distances.keys() or distances[(v0, v2)][0] > distances[(v0, v1)][0] + distances[(v1, v2)][0]:
-                            # There is a path v0 -> v1 -> v2 that is either the first one we see, or the shortest one yet
-                            distances[(v0, v2)] = (distances[(v0, v1)][0] + distances[(v1, v2)][0],
-                                                distances[(v0, v1)][1] + distances[(v1, v2)][1])
-                            if upper:
-                                distances[(v2, v0)] = (distances[(v0, v1)][0] + distances[(v1, v2)][0],
-                                                distances[(v2, v1)][1] + distances[(v1, v0)][1])
-        return distances
+        vertices = list(subgraph_vertices) if subgraph_vertices is not None else self.vertices
+        in_neighbors = self._in_neighbors(vertices, upper, rec_vertices)
+        dist = np.zeros((0, 0))
+        for _, dist in _floyd_warshall_steps(in_neighbors, range(len(vertices))):
+            pass
+        return ShortestPaths(vertices, dist, in_neighbors)
 
     def shortest_path(self, start_qubit: int, end_qubit: int, qubits_to_use: Optional[List[int]]=None) -> Optional[List[int]]:
         if qubits_to_use is None:
@@ -351,47 +574,64 @@ class Architecture():
             the steiner tree is used for creating an upper triangular matrix or a full reduction.
         :yields: First yields all edges from the tree top-to-bottom, finished with None, then yields all edges from the tree bottom-up, finished with None.
         """
+        assert len(qubits_to_use) == len(set(qubits_to_use))
+        edges = self.steiner_tree_edges(start_qubit, qubits_to_use, upper)
+        yield from edges
+        yield None
+        # Now go through the tree in reverse order
+        yield from reversed(edges)
+        yield None
+
+    def steiner_tree_edges(self, start_qubit: int, qubits_to_use: Iterable[int], upper: bool=True) -> Tuple[Tuple[int,int], ...]:
+        """
+        Returns the edges of the steiner tree of :func:`steiner_tree` top-to-bottom, in BFS order from the root.
+        The trees are kept in :attr:`steiner_trees`, so each tree is usually only built once per architecture.
+
+        :param start_qubit: The index of the root qubit to be used
+        :param qubits_to_use: The indices of the other qubits that should be present in the steiner tree
+        :param upper: Whether the steiner tree is used for creating an upper triangular matrix or a full reduction.
+        :return: The edges of the tree as pairs of qubits
+        """
+        terminals = SteinerTreeCache.bitset(qubits_to_use)
+        key = ("upper" if upper else "full", start_qubit, terminals)
+        edges = self.steiner_trees.get(key)
+        if edges is None:
+            edges = tuple(self._build_steiner_tree(start_qubit, sorted(set(qubits_to_use)), upper))
+            self.steiner_trees.put(key, edges)
+        return edges
+
+    def _build_steiner_tree(self, start_qubit: int, qubits_to_use: Iterable[int], upper: bool) -> List[Tuple[int,int]]:
         # Approximated by calculating the all-pairs shortest paths and then solving the minimum spanning tree over the subset of vertices and their respective shortest paths.
         # https://en.wikipedia.org/wiki/Steiner_tree_problem#Approximating_the_Steiner_tree
 
         # The all-pairs shortest paths are pre-calculated and the minimum spanning tree is solved with Prim's algorithm
         # https://en.wikipedia.org/wiki/Prim%27s_algorithm
-
-        # returns an iterator that walks the steiner tree, yielding (adj_node, leaf) pairs. If the walk is finished, it yields None
         if self.distances is None:
             self.distances = self.pre_calc_distances()
         root = self.qubit2vertex(start_qubit)
         target_nodes = set(self.qubit2vertex(q) for q in qubits_to_use)
 
-        # Check that all nodes are valid and that there are no duplicates
+        # Check that all nodes are valid
         assert all(n >= root if upper else n <= root for n in target_nodes)
-        assert len(qubits_to_use) == len(set(qubits_to_use))
         
         # The vertices and edges of the generated tree
         tree_vertices: Set[int] = {root}
         edges: Set[Tuple[int,int]] = set()
         # Map with all distances between nodes with index <= root (if not upper) or index >= root (if upper), and the corresponding shortest paths
-        distances: Dict[Tuple[int,int], Tuple[int,List[Tuple[int,int]]]] = self.distances["upper"][root] if upper else self.distances["full"][root]
+        distances = self.distances["upper"][root] if upper else self.distances["full"][root]
         # Nodes that are not yet in the tree
         remaining_nodes = set(n for n in target_nodes if n != root)
         # Non-target nodes added to the tree
         steiner_pnts: Set[int] = set()
 
         while remaining_nodes:
-            # Each candidate is a tuple of (tree node, candidate, distance, path)
-            candidates = []
-            for node in remaining_nodes:
-                for v in tree_vertices.union(steiner_pnts):
-                    if (v, node) not in distances.keys():
-                        # The nodes are not connected in the considered subgraph
-                        continue
-                    dist, path = distances[(v, node)]
-                    candidates.append((node, v, dist, path))
-            if not candidates:
+            # The best option is a tuple of (candidate, tree node, distance)
+            best_option = distances.closest(tree_vertices.union(steiner_pnts), remaining_nodes)
+            if best_option is None:
                 raise ValueError("The considered subgraph is not connected")
-            best_option = min(candidates, key=lambda x: x[2])
             new_node = best_option[0]
-            new_path = best_option[3]
+            # Only the path of the chosen candidate is needed
+            new_path = distances.path(best_option[1], new_node)
 
             # Add the target node and all intermediary vertices to the three
             tree_vertices.add(new_node)
@@ -401,7 +641,6 @@ class Architecture():
                     tree_vertices.add(v)
                     steiner_pnts.add(v)
             remaining_nodes.remove(new_node)
-        edges = set(edges)  # remove duplicates
             
         # Compute all the edges of the steiner tree in BFS order, starting from the root
         visited = {root}
@@ -415,43 +654,55 @@ class Architecture():
             for v in neighbors:
                 queue.append(v)
                 visited.add(v)
-                edge = (self.vertex2qubit(node), self.vertex2qubit(v))
-                generated_edges.append(edge)
-                yield edge
-        yield None
-        
-        # Now go through the tree in reverse order
-        for edge in generated_edges[::-1]:
-            yield edge
-        yield None
+                generated_edges.append((self.vertex2qubit(node), self.vertex2qubit(v)))
+        return generated_edges
 
     def rec_steiner_tree(self, start_qubit, terminal_qubits, usable_qubits, rec_qubits, upper=True):
         if not all([q in usable_qubits for q in terminal_qubits]):
             raise Exception("Terminals not in the subgraph")
+        # The trees only depend on the arguments, so they are kept in steiner_trees like those of steiner_tree
+        terminals = SteinerTreeCache.bitset(terminal_qubits)
+        key = ("rec", start_qubit, terminals, tuple(usable_qubits), tuple(rec_qubits), upper)
+        tree = self.steiner_trees.get(key)
+        if tree is None:
+            # The terminals are taken in the order of the usable qubits, so that their order in the arguments does not matter
+            terminal_qubits = [q for q in usable_qubits if terminals >> q & 1]
+            tree = self._build_rec_steiner_tree(start_qubit, terminal_qubits, usable_qubits, rec_qubits, upper)
+            self.steiner_trees.put(key, tree)
+        top_down, bottom_up = tree
+        yield from top_down
+        yield None # Signal next phase
+        yield from bottom_up
+        yield None # Signal done
+
+    def _build_rec_steiner_tree(self, start_qubit, terminal_qubits, usable_qubits, rec_qubits, upper):
         # Builds the steiner tree with start as root, contains at least nodes and at most useable_nodes
         start = self.qubit2vertex(start_qubit)
         usable_nodes = [self.qubit2vertex(i) for i in usable_qubits]
         nodes = [self.qubit2vertex(i) for i in terminal_qubits]
         rec_nodes = [self.qubit2vertex(i) for i in rec_qubits]
-        # Calculate all-pairs shortest path
-        distances = self.floyd_warshall(usable_nodes, upper=upper, rec_vertices=rec_nodes)
+        # Calculate all-pairs shortest path, the same subgraphs are used over and over by rec_steiner_gauss
+        key = (tuple(usable_nodes), tuple(rec_nodes), upper)
+        distances = self._subgraph_distances.get(key)
+        if distances is None:
+            distances = self._subgraph_distances[key] = self.floyd_warshall(usable_nodes, upper=upper, rec_vertices=rec_nodes)
         # Build the spanning tree of shortest paths with root start, containing at least nodes
         vertices = [start]
         edges = []
         steiner_pnts = []
         while nodes != []:
-            options = [(node, v, *distances[(v, node)]) for node in nodes for v in (vertices + steiner_pnts) if
-                        (v, node) in distances.keys()]
-            if options == []:
+            best_option = distances.closest(vertices + steiner_pnts, nodes)
+            if best_option is None:
                 raise ValueError("The considered subgraph is not connected")
-            best_option = min(options, key=lambda x: x[2])
+            path = distances.path(best_option[1], best_option[0])
             vertices.append(best_option[0])
-            edges += best_option[3]
-            steiner = [v for edge in best_option[3] for v in edge if v not in vertices]
+            edges += path
+            steiner = [v for edge in path for v in edge if v not in vertices]
             steiner_pnts += steiner
             nodes.remove(best_option[0])
         edges = list(set(edges)) #removes duplicates
 
+        top_down = []
         vs = {start} # Start with the root
         n_edges = len(edges)
         yielded_edges = set()
@@ -459,12 +710,12 @@ class Architecture():
             es = [e for e in edges for v in vs if e[0] == v] # Find all vertices connected to previously yielded vertices
             old_vs = [v for v in vs]
             for edge in es: # yield the corresponding edges.
-                yield (self.vertex2qubit(edge[0]), self.vertex2qubit(edge[1]))
+                top_down.append((self.vertex2qubit(edge[0]), self.vertex2qubit(edge[1])))
                 vs.add(edge[1])
                 yielded_edges.add(edge)
             [vs.remove(v) for v in old_vs]
-        yield None # Signal next phase
         # Walk the tree bottom up to remove all ones.
+        bottom_up = []
         while len(edges) > 0:
             # find leaf nodes:
             vs_to_consider = [vertex for vertex in vertices if vertex not in [e0 for e0, e1 in edges]] + \
@@ -472,9 +723,9 @@ class Architecture():
             for v in vs_to_consider:
                 # Get the edge that is connected to this leaf node
                 for edge in [e for e in edges if e[1] == v]:
-                    yield (self.vertex2qubit(edge[0]), self.vertex2qubit(edge[1])) # yield it
+                    bottom_up.append((self.vertex2qubit(edge[0]), self.vertex2qubit(edge[1])))
                     edges.remove(edge) # Remove it from the steiner tree
-        yield None # Signal done
+        return tuple(top_down), tuple(bottom_up)
 
     def transpose(self):
         # TODO make a transposed copy of self
@@ -491,6 +742,126 @@ class Architecture():
         arities.sort(key=lambda p: p[1], reverse=True)
         return arities
 
+def coupling_graph_hash(graph: BaseGraph) -> str:
+    """
+    Returns a hash of the vertices (in order) and the edges of a coupling graph.
+    """
+    es = sorted(tuple(sorted(graph.edge_st(e))) for e in graph.edges())
+    data = [list(graph.vertices()), es]
+    return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+
+class ArchitectureCache(ResultCache):
+    """
+    A directory of precomputed architecture data, keyed by the coupling graph.
+
+    Each entry is a single file with a small JSON header holding the qubit placement, the reduce order, the adjacency
+    and the non-cutting vertex sets, followed by the distance matrices of :func:`Architecture.pre_calc_distances` as raw integers.
+    Loading an entry only reads the header; the distances are memory-mapped, so they are paged in when routing uses them.
+    Loaded entries are kept in memory, so creating the same architecture again in the same process is nearly free.
+
+    For instance::
+
+        cache = ArchitectureCache('.pyzx_architectures')
+        arch = create_architecture(IBM_ROCHESTER, cache=cache) # Computed and stored
+        arch = create_architecture(IBM_ROCHESTER, cache=cache) # Loaded
+
+    :param directory: Where to store the entries. It is created if it does not exist.
+    :param max_bytes: The maximal total size of the entries, see :class:`~pyzx.cache.ResultCache`.
+    """
+    suffix = '.arch'
+    magic = b'PYZXARCH'
+    format_version = 1
+
+    def __init__(self, directory: str, max_bytes: int=1024*1024*1024) -> None:
+        super().__init__(directory, max_bytes)
+        self._loaded: Dict[str, Dict[str, Any]] = {}
+
+    def architecture_key(self, graph: BaseGraph, qubit_map: Optional[List[int]]=None, reduce_order: Optional[List[int]]=None) -> str:
+        """
+        Returns the key of the architecture with the given coupling graph and the given qubit map and reduce order, if any.
+        """
+        config = {'qubit_map': qubit_map, 'reduce_order': reduce_order, 'format': self.format_version}
+        return self.key('architecture', coupling_graph_hash(graph), config)
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the stored data of an architecture, or None if it is not in the cache.
+
+        :return: A dict with the "qubit_map", "reduce_order", "distances" and "non_cutting_vertices" of the architecture
+        """
+        path = self._path(key)
+        if key in self._loaded and os.path.exists(path):
+            self.hits += 1
+            return self._loaded[key]
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(self.magic)) != self.magic:
+                    raise ValueError("Not an architecture cache entry: " + path)
+                header_size = int.from_bytes(f.read(8), 'little')
+                header = json.loads(f.read(header_size).decode('utf-8'))
+            data = np.memmap(path, dtype=header["dtype"], mode='r', offset=len(self.magic) + 8 + header_size)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        vertices = header["vertices"]
+        n = len(vertices)
+        distances: Dict[Literal["upper", "full"], List[ShortestPaths]] = {"upper": [], "full": []}
+        offset = 0
+        for until in range(n):
+            size = n - until
+            block = data[offset:offset + size*size].reshape(size, size)
+            distances["upper"].append(ShortestPaths(vertices[until:], block, header["upper_in_neighbors"], until))
+            offset += size*size
+        for until in range(n):
+            size = until + 1
+            block = data[offset:offset + size*size].reshape(size, size)
+            distances["full"].append(ShortestPaths(vertices[:until+1], block, header["full_in_neighbors"]))
+            offset += size*size
+        result = {"qubit_map": header["qubit_map"], "reduce_order": header["reduce_order"], "distances": distances,
+                  "non_cutting_vertices": {tuple(k): v for k, v in header["non_cutting_vertices"]}}
+        self._loaded[key] = result
+        return result
+
+    def store(self, architecture: Architecture) -> None:
+        """
+        Stores the precomputed data of an architecture created with this cache. Storing it again after routing
+        also saves the non-cutting vertex sets that were computed in the meantime.
+        """
+        if architecture.cache_key is None:
+            raise ValueError("The architecture was not created with a cache")
+        if architecture.distances is None:
+            architecture.distances = architecture.pre_calc_distances()
+        paths = architecture.distances["upper"] + architecture.distances["full"]
+        dtype = paths[0]._dist.dtype if paths else np.dtype(np.int16)
+        header = {"vertices": architecture.vertices,
+                  "qubit_map": architecture.qubit_map,
+                  "reduce_order": architecture.reduce_order,
+                  "dtype": dtype.str,
+                  "upper_in_neighbors": architecture.distances["upper"][0]._in_neighbors if paths else [],
+                  "full_in_neighbors": architecture.distances["full"][0]._in_neighbors if paths else [],
+                  "non_cutting_vertices": [[list(k), v] for k, v in architecture._non_cutting_vertices.items()]}
+        header_bytes = json.dumps(header, default=int).encode('utf-8')
+        # Pad the header so that the distances are aligned
+        header_bytes += b' ' * (-len(header_bytes) % 8)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.magic)
+            f.write(len(header_bytes).to_bytes(8, 'little'))
+            f.write(header_bytes)
+            for p in paths:
+                f.write(np.ascontiguousarray(p._dist, dtype=dtype).tobytes())
+        os.replace(tmp, self._path(architecture.cache_key))
+        self._loaded.pop(architecture.cache_key, None)
+        self.evict()
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        super().clear()
+        self._loaded.clear()
+
 def dynamic_size_architecture_name(base_name: str, n_qubits: int) -> str:
     return str(n_qubits) + "q-" + base_name
 
@@ -1,7 +1,8 @@
 import numpy as np
 
+from concurrent.futures import Executor
 from enum import Enum
-from typing import List, Optional, Tuple
+from typing import List, Optional, Tuple, Union
 
 from pyzx.circuit import Circuit
 
@@ -246,6 +247,8 @@ def permuted_gauss(
     fitness_func: Optional[FitnessFunction] = None,
     x=None,
     y=None,
+    executor: Optional[Executor] = None,
+    seed: Optional[Union[int, np.random.RandomState]] = None,
     **kwargs,
 ) -> Tuple[List[int], Circuit, int]:
     """
@@ -265,6 +268,8 @@ def permuted_gauss(
     :param fitness_func: Optional fitness function to use
     :param x: Optional tracker for the row operations
     :param y: Optional tracker for the column operations
+    :param executor: Optional executor, e.g. a :class:`~concurrent.futures.ProcessPoolExecutor`, in which the genetic algorithm evaluates the fitness of each generation
+    :param seed: Optional seed or random state for the genetic algorithm, otherwise the global numpy random state is used
     :return: Best permutation found, list of CNOTS corresponding to the
         elimination.
     """
@@ -285,6 +290,8 @@ def permuted_gauss(
             crossover_prob,
             mutate_prob,
             fitness_func,
+            executor=executor,
+            seed=seed,
         )
         permsize = len(matrix.data) if row else len(matrix.data[0])
         best_permutation = optimizer.find_optimum(
@@ -414,6 +421,9 @@ def sequential_gauss(
                 **kwargs,
             )
 
+        # The particles are stepped in parallel instead of the fitness evaluations
+        executor = kwargs.pop("executor", None)
+        seed = kwargs.pop("seed", None)
         step_func = StepFunction(
             matrices, new_mode, architecture, fitness_func, **kwargs
         )
@@ -423,6 +433,8 @@ def sequential_gauss(
             s_best_crossover=s_crossover,
             p_best_crossover=p_crossover,
             mutation=pso_mutation,
+            executor=executor,
+            seed=seed,
         )
         best_solution = optimizer.find_optimum(
             architecture.n_qubits if architecture is not None else n_qubits,
@@ -451,13 +463,13 @@ class StepFunction:
             Mat2(np.asarray(m.data).T.tolist()) for m in reversed(matrices)
         ]  # Reverse and transpose the parity matrices to create the reversed equivalent sequence
 
-    def __call__(self, initial_perm):
+    def __call__(self, initial_perm, rng=None):
         matrices = self.matrices
         new_mode = self.mode
         architecture = self.architecture
         fitness_func = self.fitness_func
         rev_matrices = self.rev_matrices
-        kwargs = self.kwargs
+        kwargs = self.kwargs if rng is None else dict(self.kwargs, seed=rng)
         # Apply the original qubit placement
         ms = [
             Mat2([[row[i] for i in initial_perm] for row in m.data])
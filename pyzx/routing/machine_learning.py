@@ -15,12 +15,18 @@
 # limitations under the License.
 
 
+from collections import OrderedDict
+from concurrent.futures import Executor
 from multiprocessing import cpu_count
 from multiprocessing.pool import Pool
-from typing import Any, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 import numpy as np
 
 
+def _evaluate_all(fitness_func, chromosomes):
+    return [fitness_func(c) for c in chromosomes]
+
+
 class GeneticAlgorithm:
     def __init__(
         self,
@@ -29,7 +35,25 @@ class GeneticAlgorithm:
         mutation_prob: float,
         fitness_func,
         maximize: bool = False,
+        executor: Optional[Executor] = None,
+        memo_size: int = 1024,
+        seed: Optional[Union[int, np.random.RandomState]] = None,
     ):
+        """
+        Setup the optimizer
+
+        :param population_size: The number of chromosomes (permutations) in the population.
+        :param crossover_prob: The probability that a child is created from two parents in each generation.
+        :param mutation_prob: The probability that a child is mutated.
+        :param fitness_func: The function giving the fitness of a permutation. It should be deterministic.
+        :param maximize: Whether to maximize the fitness function.
+        :param executor: If given, the new chromosomes of each generation are evaluated in parallel in this executor,
+            e.g. a :class:`~concurrent.futures.ProcessPoolExecutor`, in which case the fitness function must be picklable.
+            The random choices are all made in this process, so the result does not depend on the executor.
+        :param memo_size: The number of permutations whose fitness is remembered, so that chromosomes that reappear
+            are not evaluated again. Use 0 to disable.
+        :param seed: The seed for the random choices, or the random state to draw them from. If None, the global numpy random state is used.
+        """
         self.population_size = population_size
         self.negative_population_size = int(np.sqrt(population_size))
         self.crossover_prob = crossover_prob
@@ -39,6 +63,48 @@ class GeneticAlgorithm:
         self.maximize = maximize
         self.n_qubits = 0
         self.population: List[Tuple[List[int], Any]] = []
+        self.executor = executor
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[Tuple[int, ...], Any]" = OrderedDict()
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self._rng: Any = seed if isinstance(seed, np.random.RandomState) else (
+            np.random.RandomState(seed) if seed is not None else np.random)
+
+    def _evaluate(self, chromosomes) -> List[Any]:
+        """Returns the fitness of each chromosome, looking them up in the memo first."""
+        keys = [tuple(int(g) for g in c) for c in chromosomes]
+        fitness: Dict[Tuple[int, ...], Any] = {}
+        todo: Dict[Tuple[int, ...], Any] = {}
+        for k, c in zip(keys, chromosomes):
+            if k in self._memo:
+                self._memo.move_to_end(k)
+                fitness[k] = self._memo[k]
+                self.memo_hits += 1
+            elif k in todo:
+                self.memo_hits += 1
+            else:
+                todo[k] = c
+                self.memo_misses += 1
+        if self.executor is not None and len(todo) > 1:
+            # Send the chromosomes in a few chunks, so that the fitness function is pickled only once per chunk
+            n_chunks = min(len(todo), cpu_count())
+            chunks = [list(todo.items())[i::n_chunks] for i in range(n_chunks)]
+            results = self.executor.map(
+                _evaluate_all,
+                [self.fitness_func] * n_chunks,
+                [[c for _, c in chunk] for chunk in chunks],
+            )
+            for chunk, fs in zip(chunks, results):
+                fitness.update(zip([k for k, _ in chunk], fs))
+        else:
+            fitness.update((k, self.fitness_func(c)) for k, c in todo.items())
+        if self.memo_size > 0:
+            for k in todo:
+                self._memo[k] = fitness[k]
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return [fitness[k] for k in keys]
 
     def _select(self):
         fitness_scores = [f for c, f in self.population]
@@ -50,15 +116,15 @@ class GeneticAlgorithm:
             adjusted_scores = [max_fitness - f for f in fitness_scores]
             adjusted_total = sum(adjusted_scores)
             selection_chance = [f / adjusted_total for f in adjusted_scores]
-        return np.random.choice(
+        return self._rng.choice(
             self.population_size, size=2, replace=False, p=selection_chance
         )
 
     def _create_population(self, n):
-        population = [np.random.permutation(n) for _ in range(self.population_size)]
+        population = [self._rng.permutation(n) for _ in range(self.population_size)]
         self.population = [
-            (list(chromosome), self.fitness_func(chromosome))
-            for chromosome in population
+            (list(chromosome), fitness)
+            for chromosome, fitness in zip(population, self._evaluate(population))
         ]
         self._sort(self.population)
         self.negative_population = self.population[-self.negative_population_size :]
@@ -88,14 +154,12 @@ class GeneticAlgorithm:
 
     def _add_children(self, children):
         n_child = len(children)
-        self.population.extend(
-            [(child, self.fitness_func(child)) for child in children]
-        )
+        self.population.extend(zip(children, self._evaluate(children)))
         self._sort(self.population)
         self.negative_population.extend(self.population[-n_child:])
         self.negative_population = [
             self.negative_population[i]
-            for i in np.random.choice(
+            for i in self._rng.choice(
                 self.negative_population_size + n_child,
                 size=self.negative_population_size,
                 replace=False,
@@ -106,23 +170,23 @@ class GeneticAlgorithm:
     def _update_population(self, n_child: int):
         children = []
         # Create a child from weak parents to avoid local optima
-        p1, p2 = np.random.choice(self.negative_population_size, size=2, replace=False)
+        p1, p2 = self._rng.choice(self.negative_population_size, size=2, replace=False)
         child = self._crossover(
             self.negative_population[p1][0], self.negative_population[p2][0]
         )
         children.append(child)
         for _ in range(n_child):
-            if np.random.random() < self.crossover_prob:
+            if self._rng.random_sample() < self.crossover_prob:
                 p1, p2 = self._select()
                 child = self._crossover(self.population[p1][0], self.population[p2][0])
-                if np.random.random() < self.mutation_prob:
+                if self._rng.random_sample() < self.mutation_prob:
                     child = self._mutate(child)
                 children.append(child)
         self._add_children(children)
 
     def _crossover(self, parent1, parent2):
-        crossover_start = np.random.choice(int(self.n_qubits / 2))
-        crossover_length = np.random.choice(self.n_qubits - crossover_start)
+        crossover_start = self._rng.choice(int(self.n_qubits / 2))
+        crossover_length = self._rng.choice(self.n_qubits - crossover_start)
         crossover_end = crossover_start + crossover_length
         child = -1 * np.ones_like(parent1)
         child[crossover_start:crossover_end] = parent1[crossover_start:crossover_end]
@@ -136,7 +200,7 @@ class GeneticAlgorithm:
         return child
 
     def _mutate(self, parent):
-        gen1, gen2 = np.random.choice(len(parent), size=2, replace=False)
+        gen1, gen2 = self._rng.choice(len(parent), size=2, replace=False)
         _ = parent[gen1]
         parent[gen1] = parent[gen2]
         parent[gen2] = _
@@ -156,17 +220,23 @@ class ParticleSwarmOptimization:
         mutation: float,
         maximize: bool = False,
         n_threads: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        seed: Optional[int] = None,
     ):
         """
         Setup the optimizer
 
         :param swarm_size: Swarm size for the swarm optimization.
-        :param step_function: The to progress the swarm.
+        :param step_function: The function to progress the swarm. It is called as step_func(point, rng) with the current point
+            of a particle and the random state of that particle, and returns the new point, the solution and its fitness.
         :param s_best_crossover: The crossover percentage with the best particle in the swarm. Must be between 0.0 and 1.0.
         :param p_best_crossover: The crossover percentage with the personal best of a particle. Must be between 0.0 and 1.0.
         :param mutation: The mutation percentage of a particle. Must be between 0.0 and 1.0.
         :param maximize: Whether to maximize the fitness function.
         :param n_threads: Number of threads to use for the optimization. If None, use all available threads.
+        :param executor: If given, the particles are stepped in this executor instead of in a pool of `n_threads` processes.
+        :param seed: The seed for the random choices. If None, the global numpy random state is used.
+            Every particle has its own random state, so the result does not depend on the number of processes.
         """
         self.step_func = step_func
         self.size = swarm_size
@@ -177,10 +247,12 @@ class ParticleSwarmOptimization:
         self.maximize = maximize
         self.swarm: List[Particle] = []
         self.pool: Optional[Pool] = None
+        self.executor = executor
+        self._rng: Any = np.random.RandomState(seed) if seed is not None else np.random
         n_threads = (
             min(n_threads, cpu_count()) if n_threads is not None else cpu_count()
         )
-        if n_threads > 1:
+        if n_threads > 1 and executor is None:
             self.pool = Pool(n_threads)
 
     def __getstate__(self):
@@ -188,6 +260,7 @@ class ParticleSwarmOptimization:
         # Don't pickle baz
         # del state["fitness_func"]
         del state["pool"]
+        del state["executor"]
         return state
 
     def __setstate__(self, state):
@@ -195,6 +268,7 @@ class ParticleSwarmOptimization:
         # Add baz back since it doesn't exist in the pickle
         # self.fitness_func = None
         self.pool = None
+        self.executor = None
 
     def _create_swarm(self, n):
         self.swarm = [
@@ -206,6 +280,7 @@ class ParticleSwarmOptimization:
                 self.mutation,
                 self.maximize,
                 id=i,
+                seed=self._rng.randint(2**31),
             )
             for i in range(self.size)
         ]
@@ -237,7 +312,11 @@ class ParticleSwarmOptimization:
         return p
 
     def _update_swarm(self):
-        if self.pool is not None:
+        if self.executor is not None:
+            self.swarm = list(self.executor.map(
+                self.particle_update_func, [(self.best_particle, p) for p in self.swarm]
+            ))
+        elif self.pool is not None:
             self.swarm = self.pool.map(
                 self.particle_update_func, [(self.best_particle, p) for p in self.swarm]
             )
@@ -267,10 +346,12 @@ class Particle:
         mutation,
         maximize=False,
         id=None,
+        seed=None,
     ):
         self.step_func = step_func
         self.size = size
-        self.current = np.random.permutation(size)
+        self.rng = np.random.RandomState(seed if seed is not None else np.random.randint(2**31))
+        self.current = self.rng.permutation(size)
         self.best_point = self.current
         self.best = None
         self.best_solution = None
@@ -289,7 +370,9 @@ class Particle:
             return x > self.best
 
     def step(self, swarm_best):
-        new, solution, fitness = self.step_func(self.current)
+        # The step function gets the random state of the particle for its random choices (e.g. a genetic algorithm),
+        # so that the step does not depend on the process it runs in.
+        new, solution, fitness = self.step_func(self.current, self.rng)
         is_better = self.best is None or not self.compare(fitness)
         if is_better:
             self.best = fitness
@@ -310,14 +393,14 @@ class Particle:
 
     def _mutate(self, particle):
         new_particle = particle.copy()
-        m_idxs = np.random.choice(self.size, size=self.mutation, replace=False)
-        m_perm = np.random.permutation(self.mutation)
+        m_idxs = self.rng.choice(self.size, size=self.mutation, replace=False)
+        m_perm = self.rng.permutation(self.mutation)
         for old_i, new_i in enumerate(m_perm):
             new_particle[m_idxs[old_i]] = particle[m_idxs[new_i]]
         return new_particle
 
     def _crossover(self, particle, best_particle, n):
-        cross_idxs = np.random.choice(self.size, size=n, replace=False)
+        cross_idxs = self.rng.choice(self.size, size=n, replace=False)
         new_particle = -1 * np.ones_like(particle)
         new_particle[cross_idxs] = best_particle[cross_idxs]
         idx = 0
@@ -15,9 +15,9 @@
 # limitations under the License.
 
 
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 from pyzx.circuit import Circuit, Gate, gate_types, CNOT
-from pyzx.linalg import Z2, Mat2, MatLike
+from pyzx.linalg import Z2, Mat2, MatLike, _BitRows
 
 import numpy as np
 
@@ -80,6 +80,34 @@ class CNOT_tracker(Circuit):
         self.prepend_gate("CNOT", q1, q0)
         self.matrix.col_add(q0, q1)
 
+    def row_adds(self, ops: Iterable[Tuple[int, int]]):
+        """Track a sequence of row additions, the same as calling :meth:`row_add` for each pair (q0, q1) in order.
+        The matrix is updated on packed rows, which is much faster for long sequences."""
+        if type(self).row_add is not CNOT_tracker.row_add:
+            # Subclasses that track more than the gates and the matrix
+            for q0, q1 in ops:
+                self.row_add(q0, q1)
+            return
+        ops = list(ops)
+        self.gates.extend(CNOT(q0, q1) for q0, q1 in ops)
+        rows = _BitRows(self.matrix.data)
+        for q0, q1 in ops:
+            rows.row_add(q0, q1)
+        rows.write_rows(self.matrix.data, self.matrix.cols())
+
+    def col_adds(self, ops: Iterable[Tuple[int, int]]):
+        """Track a sequence of column additions, the same as calling :meth:`col_add` for each pair (q0, q1) in order."""
+        if type(self).col_add is not CNOT_tracker.col_add:
+            for q0, q1 in ops:
+                self.col_add(q0, q1)
+            return
+        ops = list(ops)
+        self.gates[:0] = [CNOT(q1, q0) for q0, q1 in reversed(ops)]
+        cols = _BitRows(self.matrix.transpose().data)
+        for q0, q1 in ops:
+            cols.col_add(q0, q1)
+        cols.write_cols(self.matrix.data)
+
     @staticmethod
     def get_metric_names() -> List[str]:
         """Metric names for the CNOT tracker."""
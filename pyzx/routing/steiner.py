@@ -14,16 +14,62 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List, Tuple, Optional
+from typing import Any, List, Tuple, Optional
 
 from pyzx.routing.parity_maps import CNOT_tracker
 
 from .architecture import Architecture
-from ..linalg import Mat2
+from ..linalg import Mat2, _BitRows, _unpack
 
 debug = False
 
 
+class _Reduction:
+    """
+    The rows of a matrix under constrained Gaussian elimination, packed into ints so that
+    reading an entry is a shift and adding a row is a single XOR.
+
+    The row additions are recorded and only applied to the matrix and the trackers by :meth:`finish`,
+    which lets CNOT_tracker objects apply them all at once with :meth:`~CNOT_tracker.row_adds`.
+    """
+
+    def __init__(self, matrix: Mat2, x: Optional[Any], y: Optional[Any]):
+        self.matrix = matrix
+        self.packed = _BitRows(matrix.data)
+        self.rows = self.packed.rows
+        self.x = x
+        self.y = y
+        self.ops: List[Tuple[int, int]] = []
+
+    def bit(self, r: int, c: int) -> int:
+        return (self.rows[r] >> c) & 1
+
+    def column(self, c: int) -> List[int]:
+        return [(row >> c) & 1 for row in self.rows]
+
+    def row_add(self, c0: int, c1: int):
+        self.rows[c1] ^= self.rows[c0]
+        self.ops.append((c0, c1))
+        if debug:
+            print("Reducing", c0, c1)
+
+    def finish(self):
+        self.packed.write_rows(self.matrix.data, self.matrix.cols())
+        if self.x is not None:
+            if hasattr(self.x, "row_adds"):
+                self.x.row_adds(self.ops)
+            else:
+                for c0, c1 in self.ops:
+                    self.x.row_add(c0, c1)
+        if self.y is not None:
+            col_ops = [(c1, c0) for c0, c1 in self.ops]
+            if hasattr(self.y, "col_adds"):
+                self.y.col_adds(col_ops)
+            else:
+                for c1, c0 in col_ops:
+                    self.y.col_add(c1, c0)
+
+
 def steiner_gauss(
     matrix: Mat2,
     architecture: Architecture,
@@ -41,15 +87,9 @@ def steiner_gauss(
     :param y: Optional CNOT_tracker object to track column operations
     :return: Rank of the given matrix
     """
-
-    def row_add(c0, c1):
-        matrix.row_add(c0, c1)
-        if debug:
-            print("Reducing", c0, c1)
-        if x != None:
-            x.row_add(c0, c1)
-        if y != None:
-            y.col_add(c1, c0)
+    reduction = _Reduction(matrix, x, y)
+    bit = reduction.bit
+    row_add = reduction.row_add
 
     def steiner_reduce(col: int, root: int, nodes: List[int], upper: bool):
         steiner_tree = architecture.steiner_tree(root, nodes, upper)
@@ -59,26 +99,17 @@ def steiner_gauss(
             zeros = []
             while next_check is not None:
                 s0, s1 = next_check
-                if matrix[s0, col] == 0:  # s1 is a new steiner point or root = 0
+                if bit(s0, col) == 0:  # s1 is a new steiner point or root = 0
                     zeros.append(next_check)
                 next_check = next(steiner_tree)
             while len(zeros) > 0:
                 s0, s1 = zeros.pop(-1)
-                if matrix[s0, col] == 0:
+                if bit(s0, col) == 0:
                     row_add(s1, s0)
                     if debug:
-                        print(matrix[s0, col], matrix[s1, col])
-            if (
-                next_check is not None and matrix[next_check[0], col] == 0
-            ):  # root is zero
-                print("WARNING : Root is 0 => reducing non-pivot column", matrix.data)
+                        print(bit(s0, col), bit(s1, col))
             if debug:
-                print("Step 1: remove zeros", matrix[:, col])
-            while next_check is not None:
-                s0, s1 = next_check
-                if matrix[s1, col] == 0:  # s1 is a new steiner point
-                    row_add(s0, s1)
-                next_check = next(steiner_tree)
+                print("Step 1: remove zeros", reduction.column(col))
         # Reduce stuff
         if debug:
             print("Step 2: remove ones")
@@ -102,7 +133,7 @@ def steiner_gauss(
         found_pivot = False
         nodes = []
         while not found_pivot and pivot < cols:
-            nodes = [r for r in range(current_row, rows) if matrix[r, pivot] == 1]
+            nodes = [r for r in range(current_row, rows) if bit(r, pivot) == 1]
             if len(nodes) > 0:
                 p_cols.append(pivot)
                 found_pivot = True
@@ -125,7 +156,7 @@ def steiner_gauss(
     #         pivot += 1
 
     if debug:
-        print("Upper triangle form", matrix)
+        print("Upper triangle form", [_unpack(row, cols) for row in reduction.rows])
     rank = len(p_cols)
     if debug:
         print(p_cols)
@@ -133,7 +164,7 @@ def steiner_gauss(
     if full_reduce:
         for current_row in reversed(range(len(p_cols))):
             pivot = p_cols[current_row]
-            nodes = [r for r in range(0, current_row) if matrix[r, pivot] == 1]
+            nodes = [r for r in range(0, current_row) if bit(r, pivot) == 1]
             if len(nodes) > 0:
                 nodes.append(current_row)
                 steiner_reduce(pivot, current_row, nodes, False)
@@ -146,6 +177,7 @@ def steiner_gauss(
     #         if len(nodes) > 1:
     #             steiner_reduce(c, pivot, nodes, False)
     #         pivot -= 1
+    reduction.finish()
     return rank
 
 
@@ -174,14 +206,8 @@ def rec_steiner_gauss(
     else:
         matrix.permute_cols(permutation)
 
-    def row_add(c0, c1):
-        matrix.row_add(c0, c1)
-        if debug:
-            print("Reducing", c0, c1)
-        if x != None:
-            x.row_add(c0, c1)
-        if y != None:
-            y.col_add(c1, c0)
+    reduction = _Reduction(matrix, x, y)
+    bit = reduction.bit
 
     def steiner_reduce(col, root, nodes, usable_nodes, rec_nodes, upper):
         if not all([q in usable_nodes for q in nodes]):
@@ -192,23 +218,21 @@ def rec_steiner_gauss(
             )
         generator = steiner_reduce_column(
             architecture,
-            [row[col] for row in matrix.data],
+            reduction.column(col),
             root,
             nodes,
             usable_nodes,
             rec_nodes,
             upper,
         )
+        allowed = set(usable_nodes + rec_nodes)
         cnot = next(generator, None)
         tree_nodes = []
         while cnot is not None:
-            if (
-                cnot[0] not in usable_nodes + rec_nodes
-                or cnot[1] not in usable_nodes + rec_nodes
-            ):
+            if cnot[0] not in allowed or cnot[1] not in allowed:
                 raise Exception("Steiner tree not sticking to constraints")
             tree_nodes.extend(cnot)
-            row_add(*cnot)
+            reduction.row_add(*cnot)
             cnot = next(generator, None)
         return tree_nodes
 
@@ -219,20 +243,18 @@ def rec_steiner_gauss(
         pivots = list(sorted(qubit_removal_order))
         for pivot_idx, c in enumerate(pivots):
             # Get all the nodes in the row below the diagonal (rows[i:]) where the entry equals 1 or it is the diagonal
-            nodes = [r for r in pivots[pivot_idx:] if c == r or matrix.data[r][c] == 1]
+            nodes = [r for r in pivots[pivot_idx:] if c == r or bit(r, c) == 1]
             # Perform the steiner_reduce on the current column (c) with root rows2[pivot] and you can use the full matrix
             steiner_reduce(c, c, nodes, pivots[pivot_idx:], [], True)
         # Quick check upper triangular form - should never be printing!
-        if not all(
-            [all([matrix.data[i][j] == 0 for j in range(0, i)]) for i in range(size)]
-        ):
+        if any(reduction.rows[i] & ((1 << i) - 1) for i in range(size)):
             print(
                 "This should never be printed. If you read this, there is a bug in pyzx/routing/steiner.py"
             )
             print()
             print("not upper triangular form?")
-            for row in matrix.data:
-                print(row)
+            for row in reduction.rows:
+                print(_unpack(row, matrix.cols()))
             print("--------")
         # Full reduce requires the recursion
         if full_reduce:
@@ -255,7 +277,7 @@ def rec_steiner_gauss(
 
                 # Apply steiner up:
                 # Pick the nodes of the steiner tree: all rows with a 1 in column c or the pivot row (diagonal)
-                nodes = [r for r in usable_nodes if (r == c or matrix.data[r][c] == 1)]
+                nodes = [r for r in usable_nodes if (r == c or bit(r, c) == 1)]
 
                 if (
                     len(nodes) > 1
@@ -270,6 +292,7 @@ def rec_steiner_gauss(
 
     # The qubit order is the order in which the spanning tree R is traversed
     rec_step(architecture.reduce_order)
+    reduction.finish()
 
 
 def steiner_reduce_column(
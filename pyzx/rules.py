@@ -103,13 +103,16 @@ def match_bialg_parallel(
     if matchf is not None: candidates_set = set([e for e in g.edges() if matchf(e)])
     else: candidates_set = g.edge_set()
     candidates = list(Counter(candidates_set).elements())
+    discarded: Set[ET] = set()
     phases = g.phases()
     types = g.types()
 
     i = 0
     m: List[MatchBialgType[VT]] = []
     while (num == -1 or i < num) and len(candidates) > 0:
-        v0, v1 = g.edge_st(candidates.pop())
+        e = candidates.pop()
+        if e in discarded: continue
+        v0, v1 = g.edge_st(e)
         if g.is_ground(v0) or g.is_ground(v1):
             continue
         v0t = types[v0]
@@ -128,9 +131,7 @@ def match_bialg_parallel(
                 i += 1
                 for vn in [v0n, v1n]:
                     for v in vn:
-                        for c in g.incident_edges(v):
-                            if c in candidates:
-                                candidates.remove(c)
+                        discarded.update(g.incident_edges(v))
                 m.append((v0,v1,v0n,v1n))
     return m
 
@@ -409,6 +410,7 @@ def match_pivot_parallel(
     if matchf is not None: candidates_set = set([e for e in g.edges() if matchf(e)])
     else: candidates_set = g.edge_set()
     candidates = list(Counter(candidates_set).elements())
+    discarded: Set[ET] = set()
     types = g.types()
     phases = g.phases()
 
@@ -416,6 +418,7 @@ def match_pivot_parallel(
     m: List[MatchPivotType[VT]] = []
     while (num == -1 or i < num) and len(candidates) > 0:
         e = candidates.pop()
+        if e in discarded: continue
         if check_edge_types and g.edge_type(e) != EdgeType.HADAMARD: continue
         v0, v1 = g.edge_st(e)
 
@@ -460,9 +463,7 @@ def match_pivot_parallel(
         i += 1
         for vn in [v0n, v1n]:
             for v in vn:
-                for c in g.incident_edges(v):
-                    if c in candidates:
-                        candidates.remove(c)
+                discarded.update(g.incident_edges(v))
         b0 = list(v0b)
         b1 = list(v1b)
         m.append(((v0,v1),(b0,b1)))
@@ -478,6 +479,7 @@ def match_pivot_gadget(
     if matchf is not None: candidates_set = set([e for e in g.edges() if matchf(e)])
     else: candidates_set = g.edge_set()
     candidates = list(Counter(candidates_set).elements())
+    discarded: Set[ET] = set()
     types = g.types()
     phases = g.phases()
     rs = g.rows()
@@ -487,6 +489,7 @@ def match_pivot_gadget(
     m: List[MatchPivotType[VT]] = []
     while (num == -1 or i < num) and len(candidates) > 0:
         e = candidates.pop()
+        if e in discarded: continue
         v0, v1 = g.edge_st(e)
 
         if not (types[v0] == VertexType.Z and types[v1] == VertexType.Z): continue
@@ -535,9 +538,7 @@ def match_pivot_gadget(
 
         m.append(((v0,v1),([],[v])))
         i += 1
-        for c in discard_edges:
-            if c in candidates:
-                candidates.remove(c)
+        discarded.update(discard_edges)
     g.add_edges(edge_list,EdgeType.SIMPLE)
     return m
 
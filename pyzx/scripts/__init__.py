@@ -24,6 +24,7 @@ The options for command are:
     router    -- Map any circuit onto restricted architectures
     cnots     -- Generate random CNOT circuits 
     phasepoly -- Generates random phase polynomial circuits and stores them as QASM files
+    bench     -- Run the benchmark suite and compare the results to a baseline
 
 For help on the arguments for these commands run for instance 'python -m pyzx opt --help'
 """
@@ -34,6 +35,7 @@ from . import circ2tikz
 from . import circuit_router
 from . import cnot_generator
 from . import phase_poly_generator
+from . import bench
    
 def main(argv):
     parser = argparse.ArgumentParser(prog="PyZX", description="PyZX commandline interface",
@@ -43,7 +45,7 @@ def main(argv):
         parser.print_help()
         exit(1)
     args = parser.parse_args(argv[1:2])
-    if args.command not in ('opt', 'tikz', 'router', 'cnots', 'phasepoly'):
+    if args.command not in ('opt', 'tikz', 'router', 'cnots', 'phasepoly', 'bench'):
         print("Unrecognized command '{}'".format(args.command))
         parser.print_help()
         exit(1)
@@ -57,4 +59,6 @@ def main(argv):
     if args.command == 'cnots':
         cnot_generator.main(argv[2:])
     if args.command == 'phasepoly':
-        phase_poly_generator.main(argv[2:])
\ No newline at end of file
+        phase_poly_generator.main(argv[2:])
+    if args.command == 'bench':
+        bench.main(argv[2:])
\ No newline at end of file
@@ -0,0 +1,123 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import sys
+
+from ..benchmark import SUITES, TASKS, load_cases, run_benchmarks, save_results, load_results, compare_results
+
+description="""Benchmark suite for PyZX
+
+To run the benchmarks on the circuits in circuits/Fast and store the results run
+    python -m pyzx bench run -s fast -o baseline.json
+
+After a change, run them again and compare to the baseline
+    python -m pyzx bench run -s fast -o new.json --compare baseline.json
+
+Or compare two stored sets of results
+    python -m pyzx bench compare baseline.json new.json --threshold 0.2
+
+The available suites are {} and the available tasks are {}.
+A comparison exits with status 1 if the new results contain a regression in time,
+memory or quality of the output.
+""".format(', '.join(SUITES), ', '.join(TASKS))
+
+import argparse
+parser = argparse.ArgumentParser(prog="pyzx bench", description=description, formatter_class=argparse.RawTextHelpFormatter)
+subparsers = parser.add_subparsers(dest='command')
+
+run_parser = subparsers.add_parser('run', help='Run the benchmarks')
+run_parser.add_argument('-s',type=str,default='fast,generated', dest='suites',
+    help='Comma-separated list of suites to run (default fast,generated)')
+run_parser.add_argument('-t',type=str,default='', dest='tasks',
+    help='Comma-separated list of tasks to run (default all)')
+run_parser.add_argument('-k',type=str,default='', dest='filter',
+    help='Only run the cases whose name contains this string')
+run_parser.add_argument('-r',type=int,default=1, dest='repeat',
+    help='Number of timed runs of each benchmark, of which the fastest is kept (default 1)')
+run_parser.add_argument('--no-memory',default=False, action='store_true', dest='no_memory',
+    help='Do not measure the peak memory use, which takes an extra run of each benchmark')
+run_parser.add_argument('--max-tensor-qubits',type=int,default=10, dest='max_tensor_qubits',
+    help='Only run tensorfy on circuits with at most this many qubits (default 10)')
+run_parser.add_argument('--max-phase-block-tcount',type=int,default=120, dest='max_phase_block_tcount',
+    help='Only run phase_block_optimize on circuits with at most this T-count (default 120)')
+run_parser.add_argument('--circuits',type=str,default=None, dest='circuits',
+    help='Directory containing the circuit suites (default the circuits directory of the repository)')
+run_parser.add_argument('-o',type=str,default='', dest='output',
+    help='File to write the results to as JSON')
+run_parser.add_argument('--compare',type=str,default='', dest='baseline',
+    help='Results to compare the new results to')
+
+compare_parser = subparsers.add_parser('compare', help='Compare two stored sets of results')
+compare_parser.add_argument('baseline',type=str,help='the old results')
+compare_parser.add_argument('new',type=str,help='the new results')
+
+for p in (run_parser, compare_parser):
+    p.add_argument('--threshold',type=float,default=0.25, dest='threshold',
+        help='Fraction by which the time or memory may grow before it is flagged (default 0.25)')
+    p.add_argument('--min-time',type=float,default=0.01, dest='min_time',
+        help='Differences in time below this many seconds are ignored (default 0.01)')
+    p.add_argument('--no-quality',default=False, action='store_true', dest='no_quality',
+        help='Do not flag an increase in gate count, T-count, 2-qubit count or depth')
+
+def print_result(r):
+    if r['status'] != 'ok':
+        print("{:<45} {:<20} ERROR {}".format(r['suite'] + '/' + r['case'], r['task'], r['error']))
+        return
+    mem = "{:8.1f}MB".format(r['peak_memory']/2**20) if 'peak_memory' in r else ''
+    quality = ' '.join("{}={}".format(k, v) for k, v in r['quality'].items())
+    print("{:<45} {:<20} {:8.3f}s {} {}".format(r['suite'] + '/' + r['case'], r['task'], r['time'], mem, quality))
+    sys.stdout.flush()
+
+def report(baseline, new, options):
+    regressions = compare_results(baseline, new, options.threshold, options.min_time,
+                                  quality=not options.no_quality)
+    if not regressions:
+        print("No regressions")
+        return 0
+    print("{} regressions:".format(len(regressions)))
+    for reg in regressions:
+        print("  {:<8} {}".format(reg.kind, reg))
+    return 1
+
+def main(args):
+    options = parser.parse_args(args)
+    if options.command == 'compare':
+        sys.exit(report(load_results(options.baseline), load_results(options.new), options))
+    if options.command != 'run':
+        parser.print_help()
+        sys.exit(1)
+
+    tasks = options.tasks.split(',') if options.tasks else None
+    for t in tasks or []:
+        if t not in TASKS:
+            print("Unknown task '{}', pick from {}".format(t, ', '.join(TASKS)))
+            sys.exit(1)
+    try:
+        cases = load_cases(options.suites.split(','), options.circuits)
+    except (ValueError, OSError) as e:
+        print(e)
+        sys.exit(1)
+    if options.filter:
+        cases = [c for c in cases if options.filter in c.name]
+    results = run_benchmarks(cases, tasks, options.repeat, not options.no_memory,
+                             {'max_tensor_qubits': options.max_tensor_qubits,
+                              'max_phase_block_tcount': options.max_phase_block_tcount}, print_result)
+    if options.output:
+        save_results(results, options.output)
+        print("Results written to {}".format(options.output))
+    if options.baseline:
+        sys.exit(report(load_results(options.baseline), results, options))
@@ -17,11 +17,19 @@
 
 import os
 import sys
+import glob
+import json
+import csv
+import time
+import traceback
+import multiprocessing as mp
+from multiprocessing.connection import wait
 
 from ..circuit import Circuit, determine_file_type
 from .. import simplify
 from .. import extract
 from .. import optimize
+from ..cache import ResultCache, circuit_hash
 
 description="""End-to-end circuit optimizer
 
@@ -32,12 +40,22 @@ This puts an optimised version of the circuit in the same directory and of the s
 
 If we want to specify the output location and type we can run
     python -m pyzx opt -d outputfile.qc -t qc inputfile.qasm
+
+Batch mode is used when several sources, a directory or a glob pattern are given,
+or when one of the options -j, --timeout or -o is used:
+    python -m pyzx opt -j 4 --timeout 600 -o results.csv -d optimized/ circuits/ 'other/*.qasm'
+
+Every circuit is then optimized in its own process, at most -j at a time. A circuit that
+takes longer than --timeout seconds is stopped, and errors and crashes only affect the
+circuit that caused them. A line with the gate counts and the time taken by every stage is
+written to the -o file (.csv or .jsonl, by default JSON lines on standard output) as soon as
+a circuit finishes. If -d is given, the optimized circuits are written to that directory.
 """
 
 import argparse
 parser = argparse.ArgumentParser(prog="pyzx opt", description=description, formatter_class=argparse.RawTextHelpFormatter)
-parser.add_argument('source',type=str,help='source circuit')
-parser.add_argument('-d',type=str,help='destination for output file', dest='dest',default='')
+parser.add_argument('source',type=str,nargs='+',help='source circuit, or in batch mode circuits, directories or glob patterns')
+parser.add_argument('-d',type=str,help='destination for output file (in batch mode an output directory)', dest='dest',default='')
 parser.add_argument('-t',type=str,default='match', dest='outformat',
     help='Specify the output format (qasm, qc, quipper). By default matches the input')
 parser.add_argument('-v',default=False, action='store_true', dest='verbose',
@@ -46,9 +64,23 @@ parser.add_argument('-g',type=str,default='full', dest='simp',
     help='ZX-simplifier to use. Options are full (default), cliff, or tele')
 parser.add_argument('-p',default=False, action='store_true', dest='phasepoly',
     help='Whether to also run the phase-polynomial optimizer (default is false)')
+parser.add_argument('--cache',type=str,default='', dest='cache',
+    help='Directory in which to cache optimized circuits, so that optimizing the same circuit again is a lookup')
+parser.add_argument('--cache-size',type=float,default=256, dest='cache_size',
+    help='Maximal size of the cache in megabytes (default 256)')
+parser.add_argument('-j',type=int,default=1, dest='workers',
+    help='Batch mode: number of circuits to optimize in parallel (default 1)')
+parser.add_argument('--timeout',type=float,default=0, dest='timeout',
+    help='Batch mode: maximal number of seconds per circuit (default no limit)')
+parser.add_argument('-o',type=str,default='', dest='results',
+    help='Batch mode: file to write the results to, in CSV or JSON lines format depending on the extension')
 
 def main(args):
     options = parser.parse_args(args)
+    if is_batch(options):
+        batch_main(options)
+        return
+    options.source = options.source[0]
     if not os.path.exists(options.source):
         print("File {} does not exist".format(options.source))
         return
@@ -70,19 +102,49 @@ def main(args):
     if options.verbose:
         print("Starting circuit:")
         print(c.to_basic_gates().stats())
+    c3 = cached_optimize_circuit(c, options)
+    write_output(c3, dest, dtype, options.verbose)
+
+def cached_optimize_circuit(c, options, times=None):
+    """Runs :func:`optimize_circuit`, looking up the result in the cache if one was specified."""
+    if not options.cache:
+        return optimize_circuit(c, options, times)
+    cache = ResultCache(options.cache, int(options.cache_size*1024*1024))
+    key = cache.key('circ2circ', circuit_hash(c), {'simp': options.simp, 'phasepoly': options.phasepoly})
+    cached = cache.get(key)
+    if cached is not None:
+        if options.verbose: print("Found optimized circuit in cache")
+        if times is not None: times['cached'] = True
+        return Circuit.from_qasm(cached)
+    c3 = optimize_circuit(c, options, times)
+    cache.put(key, c3.to_qasm())
+    return c3
+
+def optimize_circuit(c, options, times=None):
+    """Simplifies, extracts and optimizes the circuit. If ``times`` is a dictionary,
+    the time taken by each stage is stored in it."""
+    if times is None: times = {}
+    start = time.perf_counter()
     g = c.to_graph()
     if options.verbose: print("Running simplification algorithm...")
     if options.simp == 'tele':
         g = simplify.teleport_reduce(g,quiet=(not options.verbose))
+        times['simplify'] = time.perf_counter() - start
+        start = time.perf_counter()
         c2 = Circuit.from_graph(g)
         c2 = c2.split_phase_gates()
+        times['extract'] = time.perf_counter() - start
     else:
         if options.simp == 'full':
             simplify.full_reduce(g,quiet=(not options.verbose))
         if options.simp == 'cliff':
             simplify.clifford_simp(g,quiet=(not options.verbose))
+        times['simplify'] = time.perf_counter() - start
+        start = time.perf_counter()
         if options.verbose: print("Extracting circuit...")
         c2 = extract.extract_circuit(g)
+        times['extract'] = time.perf_counter() - start
+    start = time.perf_counter()
     if options.verbose: print("Optimizing...")
     if options.phasepoly:
         c3 = optimize.full_optimize(c2.to_basic_gates())
@@ -90,11 +152,169 @@ def main(args):
         c3 = optimize.basic_optimization(c2.to_basic_gates())
     c3 = c3.to_basic_gates()
     c3 = c3.split_phase_gates()
-    if options.verbose: print(c3.stats())
-    print("Writing output to {}".format(os.path.abspath(dest)))
+    times['optimize'] = time.perf_counter() - start
+    return c3
+
+def write_output(c3, dest, dtype, verbose, quiet=False):
+    if verbose: print(c3.stats())
+    if not quiet: print("Writing output to {}".format(os.path.abspath(dest)))
     if dtype == 'qc': output = c3.to_qc()
     if dtype == 'qasm': output = c3.to_qasm()
     if dtype == 'quipper': output = c3.to_quipper()
     f = open(dest, 'w')
     f.write(output)
     f.close()
+
+
+RESULT_FIELDS = ['file', 'status', 'qubits', 'gates_before', 'gates_after', 'tcount_before', 'tcount_after',
+                 'twoqubit_before', 'twoqubit_after', 'time_load', 'time_simplify', 'time_extract',
+                 'time_optimize', 'time_total', 'cached', 'error']
+
+def is_batch(options):
+    sources = options.source
+    if options.results or options.timeout > 0 or options.workers > 1: return True
+    return len(sources) > 1 or os.path.isdir(sources[0]) or glob.has_magic(sources[0])
+
+def glob_root(pattern):
+    """Returns the leading part of a glob pattern that contains no wildcards."""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep)[:-1]:
+        if glob.has_magic(part): break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+def expand_sources(sources):
+    """Returns the circuit files in the given files, directories and glob patterns,
+    as pairs ``(path, name)``. The name is the path relative to the directory or to
+    the leading non-wildcard part of the pattern it was found through, so that files
+    with the same name in different subdirectories can be told apart."""
+    files = {}
+    for source in sources:
+        if glob.has_magic(source):
+            root = glob_root(source)
+            paths = sorted(glob.glob(source, recursive=True))
+        else:
+            root = source if os.path.isdir(source) else os.path.dirname(source)
+            paths = [source]
+        for path in paths:
+            if os.path.isdir(path):
+                for dirpath, dirs, fnames in os.walk(path):
+                    dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                    for f in sorted(fnames):
+                        if f.startswith('.'): continue
+                        full = os.path.join(dirpath, f)
+                        files.setdefault(full, os.path.relpath(full, root))
+            else:
+                files.setdefault(path, os.path.relpath(path, root or os.curdir))
+    return list(files.items())
+
+def output_path(path, name, options):
+    """Returns the file that the optimized version of ``path`` is written to in batch mode,
+    together with its circuit type."""
+    dtype = determine_file_type(path) if options.outformat == 'match' else options.outformat
+    return os.path.join(options.dest, os.path.splitext(name)[0] + '.' + dtype), dtype
+
+def batch_job(path, name, options, conn):
+    """Optimizes a single circuit in a worker process and sends the result row through ``conn``."""
+    row = {'file': path, 'status': 'ok'}
+    try:
+        start = time.perf_counter()
+        c = Circuit.load(path)
+        row['time_load'] = time.perf_counter() - start
+        basic = c.to_basic_gates()
+        row.update(qubits=c.qubits, gates_before=len(basic.gates), tcount_before=basic.tcount(),
+                   twoqubit_before=basic.twoqubitcount())
+        times = {}
+        c3 = cached_optimize_circuit(c, options, times)
+        row.update(gates_after=len(c3.gates), tcount_after=c3.tcount(), twoqubit_after=c3.twoqubitcount(),
+                   cached=times.pop('cached', False))
+        for stage, t in times.items(): row['time_' + stage] = t
+        if options.dest:
+            dest, dtype = output_path(path, name, options)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            write_output(c3, dest, dtype, False, quiet=True)
+        row['time_total'] = time.perf_counter() - start
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = '{}: {}'.format(type(e).__name__, e)
+        if options.verbose: traceback.print_exc()
+    conn.send(row)
+    conn.close()
+
+class ResultWriter(object):
+    """Writes result rows as CSV or JSON lines, flushing after every row."""
+    def __init__(self, fname):
+        self.f = open(fname, 'w', newline='') if fname else sys.stdout
+        self.csv = None
+        if fname.endswith('.csv'):
+            self.csv = csv.DictWriter(self.f, RESULT_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.csv is not None: self.csv.writerow(row)
+        else: self.f.write(json.dumps(row) + '\n')
+        self.f.flush()
+
+    def close(self):
+        if self.f is not sys.stdout: self.f.close()
+
+def batch_main(options):
+    if options.outformat not in ('match', 'qasm', 'qc', 'quipper'):
+        print("Unsupported circuit type {}. Please use qasm, qc or quipper".format(options.outformat))
+        return
+    files = expand_sources(options.source)
+    if options.dest:
+        # Sources given separately can still map to the same output file
+        seen = {}
+        for path, name in files:
+            dest = output_path(path, name, options)[0]
+            if dest in seen:
+                print("Both {} and {} would be written to {}".format(seen[dest], path, dest), file=sys.stderr)
+                return
+            seen[dest] = path
+        os.makedirs(options.dest, exist_ok=True)
+    writer = ResultWriter(options.results)
+    counts = {}
+    # Every circuit gets its own process, so that it can be killed when it times out
+    # and a crash does not take down the whole batch.
+    pending = list(reversed(files))
+    running = {} # connection -> (process, file, start time)
+    try:
+        while pending or running:
+            while pending and len(running) < max(1, options.workers):
+                path, name = pending.pop()
+                recv, send = mp.Pipe(duplex=False)
+                p = mp.Process(target=batch_job, args=(path, name, options, send), daemon=True)
+                p.start()
+                send.close()
+                running[recv] = (p, path, time.perf_counter())
+            timeout = None
+            if options.timeout > 0:
+                now = time.perf_counter()
+                timeout = max(0.0, min(start + options.timeout - now for _, _, start in running.values()))
+            ready = wait(list(running.keys()), timeout)
+            for conn in list(running.keys()):
+                p, path, start = running[conn]
+                row = None
+                if conn in ready:
+                    try:
+                        row = conn.recv()
+                    except EOFError: # The process died without sending a result
+                        p.join()
+                        row = {'file': path, 'status': 'crashed', 'error': 'exit code {}'.format(p.exitcode)}
+                elif options.timeout > 0 and time.perf_counter() - start >= options.timeout:
+                    p.kill()
+                    row = {'file': path, 'status': 'timeout', 'time_total': time.perf_counter() - start}
+                if row is None: continue
+                p.join()
+                conn.close()
+                del running[conn]
+                counts[row['status']] = counts.get(row['status'], 0) + 1
+                writer.write(row)
+                if options.verbose:
+                    print("{} {}".format(row['status'], path), file=sys.stderr)
+    finally:
+        for p, _, _ in running.values(): p.kill()
+        writer.close()
+    print("Optimized {:d} circuits: ".format(len(files)) +
+          ", ".join("{} {:d}".format(k, v) for k, v in sorted(counts.items())), file=sys.stderr)
@@ -20,6 +20,7 @@ from enum import Enum
 import sys, os
 import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Dict, Iterable, List, Union
 
 from pyzx.routing.cnot_mapper import ElimMode, gauss, genetic_elim_modes, basic_elim_modes, pso_elim_modes, sequential_gauss, elim_modes
@@ -396,6 +397,7 @@ def route_circuit(
     s_crossover=0.4,
     p_crossover=0.3,
     pso_mutation=0.2,
+    executor=None,
 ):
     metric = lambda c: len(
         [
@@ -451,6 +453,7 @@ def route_circuit(
                         crossover_prob=crossover_prob,
                         mutate_prob=mutation_prob,
                         n_iterations=iterations,
+                        executor=executor,
                     )
                 else:
                     rank = gauss(
@@ -490,7 +493,7 @@ def route_circuit(
             interior_clifford_simp(rev_g)
             rev_g = rev_g.copy()  # reduces the number of gates when extracting.
 
-            def step(permutation):
+            def step(permutation, rng):
                 new_g = g.copy()
                 compiled_g, output_perm = simple_extract_no_gadgets(
                     new_g,
@@ -607,6 +610,7 @@ def batch_route_circuits(
     s_crossover=0.4,
     p_crossover=0.3,
     pso_mutation=0.2,
+    executor=None,
 ):
     modes = make_into_list(modes)
     architectures = make_into_list(architectures)
@@ -745,6 +749,7 @@ def batch_route_circuits(
                                                                     s_crossover=sco,
                                                                     p_crossover=pco,
                                                                     pso_mutation=pso_m,
+                                                                    executor=executor,
                                                                 )
                                                                 end_time = time.time()
                                                                 if (
@@ -1243,6 +1248,8 @@ def main(args):
     parser.add_argument("--metrics_csv",default=None,help="The location to store compiling metrics as csv, if not given, the metrics are not calculated. Only used when the source is a folder")
     parser.add_argument("--n_compile",default=1,type=int,help="How often to run the Quilc compiler, since it is not deterministic.")
     parser.add_argument("--subfolder", default=None,type=str,nargs="+",help="Possible subfolders from the main QASM source to compile from. Less typing when source folders are in the same folder. Can also be used for subfiles.")
+    parser.add_argument("--workers",default=1,type=int,help="The number of processes in which the genetic algorithm evaluates its populations.")
+    parser.add_argument("--seed",default=None,type=int,help="The seed for the random choices, to make the genetic and particle swarm modes reproducible.")
 
     # args = parser.parse_args(args)
     args, unknown = parser.parse_known_args(args)
@@ -1288,6 +1295,10 @@ def main(args):
     else:
         mode = args.mode
 
+    if args.seed is not None:
+        np.random.seed(args.seed)
+    executor = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+
     all_circuits = []
     for source in sources:
         print("Mapping qasm files in path:", source)
@@ -1309,8 +1320,11 @@ def main(args):
             s_crossover=args.sco,
             p_crossover=args.pco,
             pso_mutation=args.mutation_perc,
+            executor=executor,
         )
         all_circuits.extend(circuits)
+    if executor is not None:
+        executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -30,13 +30,15 @@ __all__ = ['bialg_simp','spider_simp', 'id_simp', 'phase_free_simp', 'pivot_simp
 from ast import Mult
 from functools import reduce
 from optparse import Option
-from typing import List, Callable, Optional, Union, Generic, Tuple, Dict, Iterator, cast
+from typing import List, Callable, Optional, Union, Generic, Tuple, Dict, Set, Any, Iterator, cast
 
 from .utils import EdgeType, VertexType, phase_is_clifford, toggle_edge, vertex_is_zx, toggle_vertex
 from .rules import *
 from .graph.base import BaseGraph, VT, ET
 from .graph.multigraph import Multigraph
 from .circuit import Circuit
+from . import profiling
+from .profiling import profiled
 
 class Stats(object):
     def __init__(self) -> None:
@@ -56,6 +58,76 @@ class Stats(object):
         return s
 
 
+class Worklist(Generic[VT, ET]):
+    """Keeps track of the vertices that have been touched by rewrites, so that
+    :func:`simp` only has to look for new matches in the parts of the graph that
+    changed since a rule was last applied, instead of rematching the whole graph.
+
+    A worklist can be passed to :func:`spider_simp`, :func:`id_simp`, :func:`pivot_simp`,
+    :func:`lcomp_simp`, :func:`clifford_simp`, :func:`full_reduce` and friends.
+    It is shared between the rules, so every rule learns about the changes made by the others.
+    The first time a rule is applied it matches on the whole graph.
+
+    The changes are recorded based on the output of the rewrite functions, so changes made to the
+    graph by any other means are not seen. Call :meth:`reset` after such changes.
+
+    Args:
+        g: The graph the simplifications are applied to.
+        full_rescan: Whenever a rule finds no more matches in its worklist, check this by
+            matching on the whole graph, and continue if anything is found.
+            Matches found this way are counted in ``missed``, which should stay zero.
+    """
+    def __init__(self, g: BaseGraph[VT,ET], full_rescan: bool=False) -> None:
+        self.g = g
+        self.full_rescan = full_rescan
+        self.missed: int = 0
+        # rule name -> vertices that changed since that rule last found all its matches
+        self._pending: Dict[str, Set[VT]] = {}
+
+    def reset(self) -> None:
+        """Forgets all recorded changes, so that every rule matches on the whole graph the next time."""
+        self._pending = {}
+
+    def mark(self, touched: Set[VT]) -> None:
+        """Records that the phases or edges of the given vertices have changed."""
+        for pending in self._pending.values():
+            pending.update(touched)
+
+    def touched_by(self, etab: Dict[Tuple[VT,VT],List[int]], rem_verts: List[VT], rem_edges: List[ET]) -> Set[VT]:
+        """Given the output of a rewrite function, before it has been applied to the graph,
+        returns the vertices it touches. These are the endpoints of the edges that are
+        added or removed, and the neighbours of the vertices that are removed."""
+        g = self.g
+        touched: Set[VT] = set()
+        for s,t in etab:
+            touched.add(s)
+            touched.add(t)
+        for e in rem_edges: touched.update(g.edge_st(e))
+        for v in rem_verts: touched.update(g.neighbors(v))
+        return touched
+
+    def take(self, name: str) -> Optional[Set[Any]]:
+        """Returns the vertices and edges where the rule ``name`` should look for matches,
+        and empties its worklist. Returns None if the whole graph should be matched."""
+        if name not in self._pending:
+            self._pending[name] = set()
+            return None
+        g = self.g
+        vs = g.vertex_set()
+        touched = self._pending[name] & vs
+        self._pending[name] = set()
+        # The rewrite rules also change the phases of the neighbours of touched vertices,
+        # and a match depends on the neighbours of the candidate, so we look two steps out.
+        region: Set[Any] = set(touched)
+        for _ in range(2):
+            for v in list(region): region.update(g.neighbors(v))
+            if 2*len(region) > len(vs):
+                # Most of the graph changed, so a full match is cheaper.
+                return None
+        for v in list(region): region.update(g.incident_edges(v))
+        return region
+
+
 def simp(
     g: BaseGraph[VT,ET],
     name: str,
@@ -64,7 +136,8 @@ def simp(
     auto_simplify_parallel_edges: bool = False,
     matchf:Optional[Union[Callable[[ET],bool], Callable[[VT],bool]]]=None,
     quiet:bool=True,
-    stats:Optional[Stats]=None) -> int:
+    stats:Optional[Stats]=None,
+    worklist:Optional[Worklist[VT,ET]]=None) -> int:
     """Helper method for constructing simplification strategies based on the rules present in rules_.
     It uses the ``match`` function to find matches, and then rewrites ``g`` using ``rewrite``.
     If ``matchf`` is supplied, only the vertices or edges for which matchf() returns True are considered for matches.
@@ -81,6 +154,8 @@ def simp(
         matchf: An optional filtering function on candidate vertices or edges, which
            is passed as the second argument to the match function.
         quiet: Suppress output on numbers of matches found during simplification.
+        worklist: An optional :class:`Worklist`. If supplied, only the parts of the graph
+           that changed since the last round are rematched, and the changes made are recorded in it.
 
     Returns:
         Number of iterations of ``rewrite`` that had to be applied before no more matches were found."""
@@ -89,56 +164,80 @@ def simp(
     if auto_simplify_parallel_edges:
         g.set_auto_simplify(True)
     i = 0
-    new_matches = True
-    while new_matches:
-        new_matches = False
-        if matchf is not None:
-            m = match(g, matchf)
-        else:
-            m = match(g)
-        if len(m) > 0:
-            i += 1
-            if i == 1 and not quiet: print("{}: ".format(name),end='')
-            if not quiet: print(len(m), end='')
-            #print(len(m), end='', flush=True) #flush only supported on Python >3.3
-            etab, rem_verts, rem_edges, check_isolated_vertices = rewrite(g, m)
-            g.add_edge_table(etab)
-            g.remove_edges(rem_edges)
-            g.remove_vertices(rem_verts)
-            if check_isolated_vertices: g.remove_isolated_vertices()
-            if not quiet: print('. ', end='')
-            #print('. ', end='', flush=True)
-            new_matches = True
-            if stats is not None: stats.count_rewrites(name, len(m))
+    prof = profiling.active
+    if prof is not None: prof.enter(name)
+    try:
+        new_matches = True
+        while new_matches:
+            new_matches = False
+            if prof is not None: t = prof.clock()
+            region = worklist.take(name) if worklist is not None else None
+            if region is None:
+                m = match(g, matchf) if matchf is not None else match(g)
+            elif region:
+                reg, f = region, matchf
+                m = match(g, lambda x: x in reg and (f is None or f(x)))
+            else:
+                m = []
+            if len(m) == 0 and region is not None and worklist is not None and worklist.full_rescan:
+                m = match(g, matchf) if matchf is not None else match(g)
+                worklist.missed += len(m)
+            if prof is not None: t = prof.lap('match', t)
+            if len(m) > 0:
+                i += 1
+                if i == 1 and not quiet: print("{}: ".format(name),end='')
+                if not quiet: print(len(m), end='')
+                #print(len(m), end='', flush=True) #flush only supported on Python >3.3
+                etab, rem_verts, rem_edges, check_isolated_vertices = rewrite(g, m)
+                if prof is not None: t = prof.lap('rewrite', t)
+                if worklist is not None:
+                    touched = worklist.touched_by(etab, rem_verts, rem_edges)
+                g.add_edge_table(etab)
+                if prof is not None: t = prof.lap('add_edge_table', t)
+                g.remove_edges(rem_edges)
+                if prof is not None: t = prof.lap('remove_edges', t)
+                g.remove_vertices(rem_verts)
+                if check_isolated_vertices: g.remove_isolated_vertices()
+                if prof is not None: t = prof.lap('remove_vertices', t)
+                if worklist is not None: worklist.mark(touched)
+                if prof is not None:
+                    prof.count_matches(name, len(m))
+                    prof.sample_graph(name, g)
+                if not quiet: print('. ', end='')
+                #print('. ', end='', flush=True)
+                new_matches = True
+                if stats is not None: stats.count_rewrites(name, len(m))
+    finally:
+        if prof is not None: prof.exit()
     if not quiet and i>0: print(' {!s} iterations'.format(i))
     if auto_simplify_parallel_edges:
         g.set_auto_simplify(auto_simp_value)
     return i
 
-def pivot_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[ET],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
+def pivot_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[ET],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None, worklist:Optional[Worklist[VT,ET]]=None) -> int:
     return simp(g, 'pivot_simp', match_pivot_parallel, pivot, 
-                auto_simplify_parallel_edges=True, matchf=matchf, quiet=quiet, stats=stats)
+                auto_simplify_parallel_edges=True, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
 
 def pivot_gadget_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[ET],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
     return simp(g, 'pivot_gadget_simp', match_pivot_gadget, pivot, 
                 auto_simplify_parallel_edges=True, matchf=matchf, quiet=quiet, stats=stats)
 
-def pivot_boundary_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[ET],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
+def pivot_boundary_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[ET],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None, worklist:Optional[Worklist[VT,ET]]=None) -> int:
     return simp(g, 'pivot_boundary_simp', match_pivot_boundary, pivot, 
-                auto_simplify_parallel_edges=True, matchf=matchf, quiet=quiet, stats=stats)
+                auto_simplify_parallel_edges=True, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
 
-def lcomp_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[VT],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
+def lcomp_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[VT],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None, worklist:Optional[Worklist[VT,ET]]=None) -> int:
     return simp(g, 'lcomp_simp', match_lcomp_parallel, lcomp, 
-                auto_simplify_parallel_edges=True, matchf=matchf, quiet=quiet, stats=stats)
+                auto_simplify_parallel_edges=True, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
 
 def bialg_simp(g: BaseGraph[VT,ET], quiet:bool=True, stats: Optional[Stats]=None) -> int:
     return simp(g, 'bialg_simp', match_bialg_parallel, bialg, quiet=quiet, stats=stats)
 
-def spider_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[VT],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
-    return simp(g, 'spider_simp', match_spider_parallel, spider, matchf=matchf, quiet=quiet, stats=stats)
+def spider_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[VT],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None, worklist:Optional[Worklist[VT,ET]]=None) -> int:
+    return simp(g, 'spider_simp', match_spider_parallel, spider, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
 
-def id_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[VT],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
-    return simp(g, 'id_simp', match_ids_parallel, remove_ids, matchf=matchf, quiet=quiet, stats=stats)
+def id_simp(g: BaseGraph[VT,ET], matchf:Optional[Callable[[VT],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None, worklist:Optional[Worklist[VT,ET]]=None) -> int:
+    return simp(g, 'id_simp', match_ids_parallel, remove_ids, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
 
 def gadget_simp(g: BaseGraph[VT,ET], matchf: Optional[Callable[[VT],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
     return simp(g, 'gadget_simp', match_phase_gadgets, merge_phase_gadgets, 
@@ -173,28 +272,30 @@ def basic_simp(g: BaseGraph[VT,ET], matchf: Optional[Callable[[Union[VT, ET]],bo
         i += 1
     return i
 
-def interior_clifford_simp(g: BaseGraph[VT,ET], matchf: Optional[Callable[[Union[VT, ET]],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
+@profiled('interior_clifford_simp')
+def interior_clifford_simp(g: BaseGraph[VT,ET], matchf: Optional[Callable[[Union[VT, ET]],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None, worklist:Optional[Worklist[VT,ET]]=None) -> int:
     """Keeps doing the simplifications ``id_simp``, ``spider_simp``,
     ``pivot_simp`` and ``lcomp_simp`` until none of them can be applied anymore."""
-    spider_simp(g, matchf=matchf, quiet=quiet, stats=stats)
-    to_gh(g)
+    spider_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
+    if to_gh(g) and worklist is not None: worklist.reset()
     i = 0
     while True:
-        i1 = id_simp(g, matchf=matchf, quiet=quiet, stats=stats)
-        i2 = spider_simp(g, matchf=matchf, quiet=quiet, stats=stats)
-        i3 = pivot_simp(g, matchf=matchf, quiet=quiet, stats=stats)
-        i4 = lcomp_simp(g, matchf=matchf, quiet=quiet, stats=stats)
+        i1 = id_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
+        i2 = spider_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
+        i3 = pivot_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
+        i4 = lcomp_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
         if i1+i2+i3+i4==0: break
         i += 1
     return i
 
-def clifford_simp(g: BaseGraph[VT,ET], matchf: Optional[Callable[[Union[VT, ET]],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> int:
+@profiled('clifford_simp')
+def clifford_simp(g: BaseGraph[VT,ET], matchf: Optional[Callable[[Union[VT, ET]],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None, worklist:Optional[Worklist[VT,ET]]=None) -> int:
     """Keeps doing rounds of :func:`interior_clifford_simp` and
     :func:`pivot_boundary_simp` until they can't be applied anymore."""
     i = 0
     while True:
-        i += interior_clifford_simp(g, matchf=matchf, quiet=quiet, stats=stats)
-        i2 = pivot_boundary_simp(g, matchf=matchf, quiet=quiet, stats=stats)
+        i += interior_clifford_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
+        i2 = pivot_boundary_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
         if i2 == 0:
             break
     return i
@@ -222,22 +323,28 @@ def reduce_scalar(g: BaseGraph[VT,ET], quiet:bool=True, stats:Optional[Stats]=No
     return i
 
 
-def full_reduce(g: BaseGraph[VT,ET], matchf: Optional[Callable[[Union[VT, ET]],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None) -> None:
+@profiled('full_reduce')
+def full_reduce(g: BaseGraph[VT,ET], matchf: Optional[Callable[[Union[VT, ET]],bool]]=None, quiet:bool=True, stats:Optional[Stats]=None, worklist:Optional[Worklist[VT,ET]]=None) -> None:
     """The main simplification routine of PyZX. It uses a combination of :func:`clifford_simp` and
-    the gadgetization strategies :func:`pivot_gadget_simp` and :func:`gadget_simp`."""
+    the gadgetization strategies :func:`pivot_gadget_simp` and :func:`gadget_simp`.
+    If a :class:`Worklist` is supplied, the Clifford simplifications only rematch the parts
+    of the graph that changed. The gadget simplifications always match on the whole graph."""
     if any(g.types()[h] == VertexType.H_BOX for h in g.vertices()):
         raise ValueError("Input graph is not a ZX-diagram as it contains an H-box. "
                          "Maybe call pyzx.hsimplify.from_hypergraph_form(g) first?")
-    interior_clifford_simp(g, matchf=matchf, quiet=quiet, stats=stats)
-    pivot_gadget_simp(g, matchf=matchf, quiet=quiet, stats=stats)
+    interior_clifford_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
+    j = pivot_gadget_simp(g, matchf=matchf, quiet=quiet, stats=stats)
     while True:
-        clifford_simp(g, matchf=matchf, quiet=quiet, stats=stats)
+        if j and worklist is not None: worklist.reset()
+        clifford_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
         i = gadget_simp(g, matchf=matchf, quiet=quiet, stats=stats)
-        interior_clifford_simp(g, matchf=matchf, quiet=quiet, stats=stats)
+        if i and worklist is not None: worklist.reset()
+        interior_clifford_simp(g, matchf=matchf, quiet=quiet, stats=stats, worklist=worklist)
         j = pivot_gadget_simp(g, matchf=matchf, quiet=quiet, stats=stats)
         if i+j == 0:
             break
 
+@profiled('teleport_reduce')
 def teleport_reduce(g: BaseGraph[VT,ET], quiet:bool=True, stats:Optional[Stats]=None) -> BaseGraph[VT,ET]:
     """This simplification procedure runs :func:`full_reduce` in a way
     that does not change the graph structure of the resulting diagram.
@@ -302,15 +409,19 @@ class Simplifier(Generic[VT, ET]):
 
 
 
-def to_gh(g: BaseGraph[VT,ET],quiet:bool=True) -> None:
-    """Turns every red node into a green node by changing regular edges into hadamard edges"""
+def to_gh(g: BaseGraph[VT,ET],quiet:bool=True) -> int:
+    """Turns every red node into a green node by changing regular edges into hadamard edges.
+    Returns the number of nodes that were changed."""
     ty = g.types()
+    i = 0
     for v in g.vertices():
         if ty[v] == VertexType.X:
+            i += 1
             g.set_type(v, VertexType.Z)
             for e in g.incident_edges(v):
                 et = g.edge_type(e)
                 g.set_edge_type(e, toggle_edge(et))
+    return i
 
 
 def max_cut(g: BaseGraph[VT,ET], vs0: Optional[Set[VT]]=None, vs1: Optional[Set[VT]]=None) -> Tuple[Set[VT],Set[VT]]:
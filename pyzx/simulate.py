@@ -19,12 +19,17 @@
 # https://journals.aps.org/prx/pdf/10.1103/PhysRevX.6.021043
 # In particular the text below equation (10) and equation (11) itself.
 
+import os
+import json
+import time
 import random
 import math
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 sq2 = math.sqrt(2)
 omega = (1+1j)/sq2
 from fractions import Fraction
-from typing import List, Optional, Dict, Tuple, Any
+from typing import List, Optional, Dict, Tuple, Any, Iterator, Callable, Union
 
 import numpy as np
 
@@ -32,6 +37,9 @@ from .utils import EdgeType, FractionLike, VertexType, toggle_vertex, toggle_edg
 from . import simplify
 from .circuit import Circuit
 from .graph.base import BaseGraph,VT,ET
+from .graph.graph import Graph
+from .graph.scalar import Scalar
+from .tensor import plan_contraction
 from .symbolic import Poly
 
 MAGIC_GLOBAL = -(7+5*sq2)/(2+2j)
@@ -42,6 +50,88 @@ MAGIC_O6 = -14 + 10*sq2
 MAGIC_K6 = 7 - 5*sq2
 MAGIC_PHI = 10 - 7*sq2
 
+def _pack_graph(g: BaseGraph) -> Tuple:
+    """Compact picklable form of a graph used to send terms to worker processes.
+    Vertex indices are preserved, so a term can be matched with its original."""
+    vs = list(g.vertices())
+    edges: List[Any] = []
+    for e in g.edges():
+        edges.extend(g.edge_st(e))
+        edges.append(g.edge_type(e))
+    vdata = {v: {k: g.vdata(v,k) for k in g.vdata_keys(v)} for v in vs if g.vdata_keys(v)}
+    sc = g.scalar
+    scalar = (sc.power2, sc.phase, list(sc.phasenodes), sc.floatfactor, sc.is_unknown, sc.is_zero)
+    return (g.backend, vs, [g.type(v) for v in vs], [g.phase(v) for v in vs],
+            [g.qubit(v) for v in vs], [g.row(v) for v in vs], edges, vdata,
+            g.inputs(), g.outputs(), scalar)
+
+def _unpack_graph(data: Tuple) -> BaseGraph:
+    """Inverse of :func:`_pack_graph`."""
+    backend, vs, types, phases, qubits, rows, edges, vdata, inputs, outputs, scalar = data
+    g = Graph(backend)
+    if backend == 'multigraph': g.set_auto_simplify(False) # type: ignore
+    for v, t, p, q, r in zip(vs, types, phases, qubits, rows):
+        g.add_vertex_indexed(v)
+        g.set_type(v, t)
+        g.set_phase(v, p)
+        g.set_qubit(v, q)
+        g.set_row(v, r)
+    for v, d in vdata.items():
+        for k, val in d.items(): g.set_vdata(v, k, val)
+    for i in range(0, len(edges), 3):
+        g.add_edge((edges[i], edges[i+1]), edges[i+2])
+    g.set_inputs(inputs)
+    g.set_outputs(outputs)
+    sc = Scalar()
+    sc.power2, sc.phase, sc.phasenodes, sc.floatfactor, sc.is_unknown, sc.is_zero = scalar
+    g.scalar = sc
+    return g
+
+def _reduce_terms(terms: List[Tuple], mode: str, arg: Any=None) -> Any:
+    """Worker function for :meth:`SumGraph.map_terms`. Reduces each of the packed ``terms``
+    and returns the nonzero reduced terms (``mode`` is ``'full_reduce'`` or ``'reduce_scalar'``),
+    or the sum of their tensors (``'tensor'``) or values (``'number'``, ``'inner'``)."""
+    reduced = []
+    total: Any = 0
+    for data in terms:
+        g = _unpack_graph(data)
+        if g.scalar.is_zero: continue
+        if mode == 'reduce_scalar':
+            simplify.reduce_scalar(g, quiet=True)
+        elif mode == 'tensor':
+            total = total + g.to_tensor(True)
+            continue
+        elif mode == 'inner':
+            total += _inner_product_with_effect(g, *arg)
+            continue
+        else:
+            simplify.full_reduce(g, quiet=True)
+        if g.scalar.is_zero: continue
+        if mode == 'number':
+            total += g.to_tensor(True).flatten()[0] if g.num_vertices() else g.scalar.to_number()
+        else:
+            reduced.append(_pack_graph(g))
+    return reduced if mode in ('full_reduce', 'reduce_scalar') else total
+
+def _inner_product_with_effect(g: BaseGraph, phases: List[Fraction], connections: List[Tuple[int,int]]) -> complex:
+    """Composes the Clifford state ``g`` with the equatorial Clifford effect given by ``phases``
+    and ``connections`` and returns the resulting scalar."""
+    g = g.copy()
+    vs = g.outputs()
+    for i, v in enumerate(vs):
+        g.set_type(v, VertexType.Z)
+        g.set_phase(v, phases[i])
+    g.set_outputs(())
+    g.add_edges([(vs[i1],vs[i2]) for (i1,i2) in connections],EdgeType.HADAMARD)
+    g.scalar.add_power(len(connections))
+    # Now that we have composed g with a right sort of effect, 
+    # we need to calculate the value of the resulting inner product.
+    # Since the diagram is a scalar, full_reduce() will completely annihilate it.
+    simplify.full_reduce(g)
+    g.remove_isolated_vertices()
+    if g.num_vertices() != 0: raise Exception("Diagram wasn't fully reduced")
+    return g.scalar.to_number()
+
 class SumGraph(object):
     """Container class for a sum of ZX-diagrams"""
     graphs: List[BaseGraph]
@@ -51,12 +141,42 @@ class SumGraph(object):
         else:
             self.graphs = []
             
-    def to_tensor(self) -> np.ndarray:
+    def map_terms(self, mode: str, arg: Any=None, workers: int=1, chunksize: Optional[int]=None) -> Iterator[Tuple[int, Any]]:
+        """Applies :func:`_reduce_terms` with the given ``mode`` to chunks of the terms, and
+        yields pairs of the chunk index and the result as soon as a chunk is done.
+
+        If ``workers`` is larger than 1, the chunks are spread over that many processes
+        with a :class:`~concurrent.futures.ProcessPoolExecutor`. The terms are sent in the
+        compact form produced by :func:`_pack_graph`. If ``chunksize`` is not given,
+        the terms are split in roughly four chunks per worker."""
+        terms = [g for g in self.graphs if not g.scalar.is_zero]
+        if not terms: return
+        if chunksize is None:
+            chunksize = max(1, math.ceil(len(terms) / (4*workers)))
+        chunks = [[_pack_graph(g) for g in terms[i:i+chunksize]] for i in range(0, len(terms), chunksize)]
+        if workers <= 1:
+            for i, chunk in enumerate(chunks):
+                yield i, _reduce_terms(chunk, mode, arg)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_reduce_terms, chunk, mode, arg): i for i, chunk in enumerate(chunks)}
+            for f in as_completed(futures):
+                yield futures[f], f.result()
+
+    def to_tensor(self, workers: int=1, chunksize: Optional[int]=None) -> np.ndarray:
+        """Returns the sum of the tensors of the terms. See :meth:`map_terms` for
+        the meaning of ``workers`` and ``chunksize``."""
         if not self.graphs: return np.zeros((1,1))
-        t = self.graphs[0].to_tensor(True)
-        for i in range(len(self.graphs)-1):
-            t = t + self.graphs[i+1].to_tensor(True)
-        return t
+        if workers <= 1:
+            t = self.graphs[0].to_tensor(True)
+            for i in range(len(self.graphs)-1):
+                t = t + self.graphs[i+1].to_tensor(True)
+            return t
+        g = self.graphs[0]
+        total = np.zeros([2]*(g.num_outputs()+g.num_inputs()), dtype=complex)
+        for _, r in self.map_terms('tensor', workers=workers, chunksize=chunksize):
+            total = total + r
+        return total
 
     def to_matrix(self) -> np.ndarray:
         if not self.graphs: return np.zeros((1,1))
@@ -65,27 +185,41 @@ class SumGraph(object):
             t = t + self.graphs[i+1].to_matrix(True)
         return t
 
-    def full_reduce(self, quiet:bool=True) -> None:
-        terms = []
-        for i, g in enumerate(self.graphs):
-            if not quiet:
-                print("Graph {:d}:".format(i))
-            simplify.full_reduce(g, quiet=quiet)
-            if not g.scalar.is_zero: terms.append(g)
-            elif not quiet: print("Graph {:d} is zero".format(i))
-        self.graphs = terms
-
-    def reduce_scalar(self, quiet:bool=True) -> None:
-        terms = []
-        for i, g in enumerate(self.graphs):
-            if not quiet:
-                print("Graph {:d}:".format(i))
-            simplify.reduce_scalar(g, quiet=quiet)
-            if not g.scalar.is_zero: terms.append(g)
-            elif not quiet: print("Graph {:d} is zero".format(i))
-        self.graphs = terms
-
-    def inner_product_with_random_state(self) -> complex:
+    def to_number(self, workers: int=1, chunksize: Optional[int]=None) -> complex:
+        """Returns the value of a sum of scalar diagrams. Each term is simplified with
+        :func:`~pyzx.simplify.full_reduce` and whatever is left is contracted.
+        See :meth:`map_terms` for the meaning of ``workers`` and ``chunksize``."""
+        return sum((r for _, r in self.map_terms('number', workers=workers, chunksize=chunksize)), complex(0))
+
+    def _reduce(self, mode: str, quiet: bool, workers: int, chunksize: Optional[int]) -> None:
+        if workers <= 1:
+            terms = []
+            for i, g in enumerate(self.graphs):
+                if not quiet:
+                    print("Graph {:d}:".format(i))
+                if mode == 'full_reduce': simplify.full_reduce(g, quiet=quiet)
+                else: simplify.reduce_scalar(g, quiet=quiet)
+                if not g.scalar.is_zero: terms.append(g)
+                elif not quiet: print("Graph {:d} is zero".format(i))
+            self.graphs = terms
+            return
+        results: Dict[int, List[Tuple]] = {}
+        for i, r in self.map_terms(mode, workers=workers, chunksize=chunksize):
+            results[i] = r
+            if not quiet: print("Chunk {:d}: {:d} nonzero terms".format(i, len(r)))
+        self.graphs = [_unpack_graph(d) for i in sorted(results) for d in results[i]]
+
+    def full_reduce(self, quiet:bool=True, workers: int=1, chunksize: Optional[int]=None) -> None:
+        """Simplifies every term with :func:`~pyzx.simplify.full_reduce` and drops the terms
+        that are zero. See :meth:`map_terms` for the meaning of ``workers`` and ``chunksize``."""
+        self._reduce('full_reduce', quiet, workers, chunksize)
+
+    def reduce_scalar(self, quiet:bool=True, workers: int=1, chunksize: Optional[int]=None) -> None:
+        """Simplifies every term with :func:`~pyzx.simplify.reduce_scalar` and drops the terms
+        that are zero. See :meth:`map_terms` for the meaning of ``workers`` and ``chunksize``."""
+        self._reduce('reduce_scalar', quiet, workers, chunksize)
+
+    def inner_product_with_random_state(self, workers: int=1, chunksize: Optional[int]=None) -> complex:
         """All the graphs should be Clifford states with same amount of outputs.
         We compose them with a random equatorial Clifford effect,
         and we calculate the resulting inner product. 
@@ -102,23 +236,11 @@ class SumGraph(object):
         phases = [Fraction(random.randint(0,3),2) for _ in range(q)]
         connections = [(i1,i2) for i1 in range(q) for i2 in range(i1+1,q) if random.random() > 0.5]
         
+        if workers > 1:
+            return sum((r for _, r in self.map_terms('inner', (phases, connections), workers, chunksize)), complex(0))
         val: complex = 0
         for g in terms:
-            g = g.copy()
-            vs = g.outputs()
-            for i, v in enumerate(vs):
-                g.set_type(v, VertexType.Z)
-                g.set_phase(v, phases[i])
-            g.set_outputs(())
-            g.add_edges([(vs[i1],vs[i2]) for (i1,i2) in connections],EdgeType.HADAMARD)
-            g.scalar.add_power(len(connections))
-            # Now that we have composed g with a right sort of effect, 
-            # we need to calculate the value of the resulting inner product.
-            # Since the diagram is a scalar, full_reduce() will completely annihilate it.
-            simplify.full_reduce(g)
-            g.remove_isolated_vertices()
-            if g.num_vertices() != 0: raise Exception("Diagram wasn't fully reduced")
-            val += g.scalar.to_number()
+            val += _inner_product_with_effect(g, phases, connections)
         return val
 
     def estimate_norm(self, epsilon:float=0.05) -> float:
@@ -316,6 +438,319 @@ def max_terms_needed(g: BaseGraph[VT,ET]) -> int:
     return count
 
 
+
+def _t_like(g: BaseGraph[VT,ET], v: VT) -> bool:
+    p = g.phase(v)
+    return isinstance(p, Fraction) and p.denominator == 4
+
+def _find_cat(g: BaseGraph[VT,ET]) -> Optional[Tuple[VT, int]]:
+    """Finds a Clifford spider whose neighbours are all T-like spiders connected by Hadamard
+    edges, so that one of the cat decompositions applies. The cat4 decomposition is preferred
+    as it removes the most T-spiders per term, followed by cat6, cat5 and cat3."""
+    best: Optional[Tuple[VT, int]] = None
+    preference = {4: 0, 6: 1, 5: 2, 3: 3}
+    io = set(g.inputs()).union(g.outputs())
+    for v in g.vertices():
+        d = g.vertex_degree(v)
+        if d not in preference or g.type(v) != VertexType.Z: continue
+        p = g.phase(v)
+        if not isinstance(p, (Fraction, int)) or p % 1 != 0: continue
+        if best is not None and preference[d] >= preference[best[1]]: continue
+        if all(w not in io and g.type(w) == VertexType.Z and _t_like(g, w)
+               and g.edge_type(g.edge(v, w)) == EdgeType.HADAMARD for w in g.neighbors(v)):
+            best = (v, d)
+            if d == 4: break
+    return best
+
+def _split(g: BaseGraph[VT,ET]) -> List[Callable[[], BaseGraph[VT,ET]]]:
+    """Returns functions producing the terms of a single stabilizer decomposition step
+    applied to the T-like spiders of ``g``. The terms of a cat or magic5 decomposition are
+    computed together, while the seven terms of the decomposition of Bravyi, Smith and
+    Smolin are each only built when asked for."""
+    cat = _find_cat(g)
+    if cat is not None:
+        v, n = cat
+        terms = {3: apply_cat3, 4: apply_cat4, 5: apply_cat5, 6: apply_cat6}[n](g, v).graphs
+        return [lambda h=h: h for h in terms] # type: ignore
+    ts = [v for v in g.vertices() if _t_like(g, v)]
+    if len(ts) == 5 or (len(ts) > 6 and len(ts) % 6 == 5):
+        terms = apply_magic5(g, ts[:5]).graphs
+        return [lambda h=h: h for h in terms] # type: ignore
+    gsum_funcs: List[Callable[[], BaseGraph[VT,ET]]] = []
+    if len(ts) >= 6:
+        g = g.copy() # So that copying g again preserves the vertex labels
+        verts = [v for v in g.vertices() if _t_like(g, v)][:6]
+        for func in [replace_B60, replace_B66, replace_E6, replace_O6, replace_K6, replace_phi1, replace_phi2]:
+            def term(func: Callable = func) -> BaseGraph[VT,ET]:
+                h = func(g.copy(), verts)
+                h.scalar.add_float(MAGIC_GLOBAL)
+                return h
+            gsum_funcs.append(term)
+        return gsum_funcs
+    terms = replace_magic_states(g).graphs
+    return [lambda h=h: h for h in terms] # type: ignore
+
+def stream_stabilizer_terms(g: BaseGraph[VT,ET], skip: Optional[List[int]]=None) -> Iterator[Tuple[List[int], BaseGraph[VT,ET]]]:
+    """Lazily decomposes a Clifford+T diagram into a sum of Clifford diagrams.
+
+    This works depth-first: after every decomposition step each term is simplified
+    with :func:`~pyzx.simplify.full_reduce` and decomposed further before the next term
+    is even constructed. Hence only O(depth) diagrams are held in memory at any time,
+    instead of the exponentially many terms that :func:`find_stabilizer_decomp` builds.
+    Terms that reduce to zero are dropped. At each step a cat decomposition
+    (:func:`apply_cat3` to :func:`apply_cat6`) is used if applicable, then :func:`apply_magic5`,
+    and otherwise the decompositions of :func:`replace_magic_states`.
+
+    Args:
+        g: A diagram whose phases are all multiples of pi/4. It is not modified.
+        skip: A path as yielded earlier by this function. All the terms up to and
+            including it are skipped, which is used to resume an interrupted computation.
+
+    Yields:
+        Pairs of the path of the term, i.e. which branch was taken at every step, and the
+        fully reduced Clifford term itself.
+    """
+    g = g.copy()
+    simplify.full_reduce(g, quiet=True)
+    if g.scalar.is_zero: return
+    for v in g.vertices():
+        p = g.phase(v)
+        if not isinstance(p, (Fraction, int)) or (4*p) % 1 != 0:
+            raise ValueError("Only diagrams with phases that are multiples of pi/4 can be decomposed")
+    if simplify.tcount(g) == 0:
+        if skip is None: yield [], g
+        return
+    # Each frame holds the branches of one decomposition step and the index of the next one.
+    # path[d] is the branch taken in the frame at depth d.
+    stack: List[Tuple[List[Optional[Callable[[], BaseGraph[VT,ET]]]], int]] = [(list(_split(g)), 0)]
+    path: List[int] = []
+    resuming = bool(skip)
+    while stack:
+        branches, i = stack[-1]
+        d = len(stack) - 1
+        if resuming and skip is not None and d < len(skip) and path == skip[:d] and i < skip[d]:
+            i = skip[d]
+        if i >= len(branches):
+            stack.pop()
+            if path: path.pop()
+            continue
+        stack[-1] = (branches, i+1)
+        f = branches[i]
+        branches[i] = None # Don't keep finished terms around
+        assert f is not None
+        h = f()
+        simplify.full_reduce(h, quiet=True)
+        if h.scalar.is_zero: continue
+        path.append(i)
+        if simplify.tcount(h) != 0:
+            stack.append((list(_split(h)), 0))
+            continue
+        if not resuming or skip is None or path > skip:
+            resuming = False
+            yield list(path), h
+        elif path == skip:
+            resuming = False
+        path.pop()
+
+def stabilizer_amplitude(
+        g: BaseGraph[VT,ET],
+        checkpoint: Optional[str]=None,
+        checkpoint_interval: float=60.0,
+        max_terms: Optional[int]=None,
+        quiet: bool=True
+        ) -> complex:
+    """Computes the scalar value of a Clifford+T diagram by summing the terms of
+    :func:`stream_stabilizer_terms`, so that the memory use stays bounded by the depth
+    of the decomposition rather than by the number of terms.
+
+    Args:
+        g: The diagram to evaluate. Any remaining inputs and outputs should have been plugged,
+            e.g. with :meth:`~pyzx.graph.base.BaseGraph.apply_state` and
+            :meth:`~pyzx.graph.base.BaseGraph.apply_effect`.
+        checkpoint: Optional path of a JSON file to which the progress is written at most every
+            ``checkpoint_interval`` seconds and when the computation finishes or is interrupted.
+            If the file already exists, the computation is resumed from it.
+        checkpoint_interval: The time in seconds between writing checkpoints.
+        max_terms: If given, stop after summing this many new terms. Combined with ``checkpoint``
+            this allows a long computation to be split into several runs.
+        quiet: Whether to print progress.
+
+    Returns:
+        The sum of the terms computed so far, which is the value of the diagram if all terms were
+        visited.
+    """
+    value = 0j
+    count = 0
+    skip: Optional[List[int]] = None
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            data = json.load(f)
+        skip = data['path']
+        value = complex(*data['value'])
+        count = data['terms']
+
+    def save(path: Optional[List[int]]) -> None:
+        if checkpoint is None or path is None: return
+        tmp = checkpoint + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'path': path, 'value': [value.real, value.imag], 'terms': count}, f)
+        os.replace(tmp, checkpoint)
+
+    last_save = time.time()
+    path = skip
+    new_terms = 0
+    try:
+        for path, h in stream_stabilizer_terms(g, skip):
+            if h.num_vertices() == 0:
+                value += h.scalar.to_number()
+            else:
+                value += complex(h.to_tensor().flatten()[0])
+            count += 1
+            new_terms += 1
+            if not quiet and count % 1000 == 0:
+                print("{:d} terms, current value {}".format(count, value))
+            if checkpoint is not None and time.time() - last_save > checkpoint_interval:
+                save(path)
+                last_save = time.time()
+            if max_terms is not None and new_terms >= max_terms:
+                break
+    finally:
+        save(path)
+    return value
+
+
+def evaluate_scalar_diagram(g: BaseGraph[VT,ET], max_width: int=20) -> complex:
+    """Returns the value of a ZX-diagram without inputs or outputs. The diagram is
+    simplified in place with :func:`~pyzx.simplify.full_reduce`. If what remains can be
+    contracted as a tensor network whose intermediate tensors have at most ``max_width``
+    wires this is done, and otherwise it is evaluated with :func:`stabilizer_amplitude`."""
+    simplify.full_reduce(g, quiet=True)
+    if g.scalar.is_zero: return 0j
+    g.remove_isolated_vertices()
+    if g.num_vertices() == 0: return complex(g.scalar.to_number())
+    plan = plan_contraction(g)
+    if plan.width <= max_width:
+        return complex(plan.contract().flatten()[0])
+    return stabilizer_amplitude(g)
+
+_bulk_in_worker: Optional[BaseGraph] = None
+
+def _set_bulk_in_worker(data: Tuple) -> None:
+    global _bulk_in_worker
+    _bulk_in_worker = _unpack_graph(data)
+
+def _answer_query(bulk: BaseGraph, query: Tuple[str, str], max_width: int) -> complex:
+    """Evaluates an ``('amplitude', effect)`` or ``('marginal', effect)`` query on the
+    simplified circuit state ``bulk``. For a marginal, the outputs marked with '/'
+    in ``effect`` are traced out by composing with the adjoint."""
+    kind, effect = query
+    g = bulk.copy()
+    g.apply_effect(effect)
+    if kind == 'marginal':
+        simplify.full_reduce(g, quiet=True)
+        if g.scalar.is_zero: return 0j
+        g.compose(g.adjoint())
+    return evaluate_scalar_diagram(g, max_width)
+
+def _answer_queries_in_worker(queries: List[Tuple[str, str]], max_width: int) -> List[complex]:
+    assert _bulk_in_worker is not None
+    return [_answer_query(_bulk_in_worker, q, max_width) for q in queries]
+
+
+class Simulator(object):
+    """Computes output amplitudes and marginal probabilities of a circuit by
+    ZX-simplification.
+
+    The circuit is converted into a diagram, the input state is plugged in, and
+    the result is simplified once with :func:`~pyzx.simplify.full_reduce`. Every
+    query then starts from a copy of this simplified "bulk" diagram, so only the
+    part of the work that depends on the queried bitstring is repeated. Queries
+    are evaluated with :func:`evaluate_scalar_diagram`.
+
+    Args:
+        circuit: The circuit, or a ZX-diagram with as many inputs as outputs.
+        state: The input state as a string of '0', '1', '+' and '-', as in
+            :meth:`~pyzx.graph.base.BaseGraph.apply_state`. Defaults to all zeros.
+        workers: Number of processes used to answer batches of queries. The bulk
+            diagram is sent to every worker once.
+        max_width: Passed on to :func:`evaluate_scalar_diagram`.
+    """
+    def __init__(self,
+                 circuit: Union[Circuit, BaseGraph],
+                 state: Optional[str]=None,
+                 workers: int=1,
+                 max_width: int=20
+                 ) -> None:
+        g = circuit.to_graph() if isinstance(circuit, Circuit) else circuit.copy()
+        if state is None: state = '0'*g.num_inputs()
+        g.apply_state(state)
+        simplify.full_reduce(g, quiet=True)
+        self.bulk: BaseGraph = g
+        self.qubits: int = g.num_outputs()
+        self.workers: int = workers
+        self.max_width: int = max_width
+
+    def _run(self, queries: List[Tuple[str, str]]) -> List[complex]:
+        # Identical queries are only answered once
+        unique = list(dict.fromkeys(queries))
+        if self.workers <= 1 or len(unique) <= 1:
+            answers = [_answer_query(self.bulk, q, self.max_width) for q in unique]
+        else:
+            chunksize = max(1, len(unique) // (4*self.workers))
+            chunks = [unique[i:i+chunksize] for i in range(0, len(unique), chunksize)]
+            with ProcessPoolExecutor(self.workers, initializer=_set_bulk_in_worker,
+                                     initargs=(_pack_graph(self.bulk),)) as executor:
+                answers = [a for res in executor.map(_answer_queries_in_worker, chunks,
+                                                     [self.max_width]*len(chunks)) for a in res]
+        table = dict(zip(unique, answers))
+        return [table[q] for q in queries]
+
+    def _check(self, bitstring: str) -> None:
+        if len(bitstring) != self.qubits or any(b not in '01' for b in bitstring):
+            raise ValueError("Expected a bitstring of length {:d}, got {!r}".format(self.qubits, bitstring))
+
+    def amplitude(self, bitstring: str) -> complex:
+        """Returns the amplitude <bitstring|C|state> of the circuit."""
+        return self.amplitudes([bitstring])[0]
+
+    def amplitudes(self, bitstrings: List[str]) -> np.ndarray:
+        """Returns the amplitudes of all the given output bitstrings as a batch."""
+        for b in bitstrings: self._check(b)
+        return np.array(self._run([('amplitude', b) for b in bitstrings]), dtype=complex)
+
+    def probabilities(self, bitstrings: List[str]) -> np.ndarray:
+        """Returns the probabilities of measuring the given output bitstrings."""
+        return np.abs(self.amplitudes(bitstrings))**2
+
+    def marginal(self, outcome: Dict[int, str]) -> float:
+        """Returns the probability that measuring the qubits in ``outcome`` gives the
+        values it specifies, e.g. ``{0: '1', 3: '0'}``, while ignoring the other qubits."""
+        return self.marginals_of([outcome])[0]
+
+    def marginals_of(self, outcomes: List[Dict[int, str]]) -> List[float]:
+        """Batched version of :meth:`marginal`."""
+        queries = []
+        for outcome in outcomes:
+            effect = ['/']*self.qubits
+            for q, b in outcome.items():
+                if not 0 <= q < self.qubits or b not in ('0', '1'):
+                    raise ValueError("Invalid outcome {!r} for qubit {!r}".format(b, q))
+                effect[q] = b
+            if '/' in effect:
+                queries.append(('marginal', ''.join(effect)))
+            else: # No need to double the diagram
+                queries.append(('amplitude', ''.join(effect)))
+        answers = self._run(queries)
+        return [abs(a)**2 if kind == 'amplitude' else a.real for (kind, _), a in zip(queries, answers)]
+
+    def marginals(self, qubits: List[int]) -> Dict[str, float]:
+        """Returns the marginal distribution of the given qubits, as a dictionary from
+        the bitstrings of their outcomes (in the order of ``qubits``) to probabilities."""
+        keys = [''.join(bits) for bits in itertools.product('01', repeat=len(qubits))]
+        probs = self.marginals_of([dict(zip(qubits, k)) for k in keys])
+        return dict(zip(keys, probs))
+
+
 def replace_magic_states(g: BaseGraph[VT,ET], pick_random:Any=False) -> SumGraph:
     """This function takes in a ZX-diagram in graph-like form 
     (all spiders fused, only Z spiders, only H-edges between spiders),
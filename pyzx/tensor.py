@@ -20,26 +20,32 @@ This module is not meant as an efficient quantum simulator.
 Due to the way the tensor is calculated it can only handle
 circuits of small size before running out of memory on a regular machine.
 Currently, it can reliably transform 9 qubit circuits into tensors.
+Diagrams with few open wires, such as amplitudes of wide but shallow circuits,
+can be much larger; use :func:`plan_contraction` to estimate the cost first.
 If the ZX-diagram is not circuit-like, but instead has nodes with high degree,
 it will run out of memory even sooner."""
 
 __all__ = ['tensorfy', 'compare_tensors', 'compose_tensors',
             'adjoint', 'is_unitary','tensor_to_matrix',
-            'find_scalar_correction']
+            'find_scalar_correction', 'plan_contraction', 'ContractionPlan',
+            'circuit_unitaries', 'compare_circuits']
 
+import heapq
 import itertools
+from functools import partial
 from math import pi, sqrt
 
 from typing import Optional
 
 from .symbolic import Poly
+from .profiling import profiled
 
 
 import numpy as np
 np.set_printoptions(suppress=True)
 
 # typing imports
-from typing import TYPE_CHECKING, List, Dict, Union
+from typing import TYPE_CHECKING, List, Dict, Union, Tuple, Set, Callable, Any
 from .utils import FractionLike, FloatInt, VertexType, EdgeType, get_z_box_label
 if TYPE_CHECKING:
     from .graph.base import BaseGraph, VT, ET
@@ -96,10 +102,304 @@ def pop_and_shift(verts, indices):
             indices[w] = l2
     return res
 
-def tensorfy(g: 'BaseGraph[VT,ET]', preserve_scalar:bool=True) -> np.ndarray:
+class ContractionPlan(object):
+    """A tensor network built from a ZX-diagram together with an order in which to
+    contract it. Create one with :func:`plan_contraction`. The estimates below are
+    computed from the shapes alone, so they can be inspected before anything is
+    contracted. All wires have dimension 2.
+
+    Attributes:
+        path: The pairwise contractions. Leaf tensors are numbered ``0..n-1`` and the
+            result of the k'th contraction gets number ``n+k``.
+        max_size: Number of entries of the largest tensor that occurs.
+        peak_size: Largest total number of entries held in memory at once.
+        flops: Number of complex multiply-adds needed by the contractions.
+    """
+    def __init__(self, leaves: List[Tuple[List[int], Callable[[], np.ndarray]]],
+                 open_labels: List[int], path: List[Tuple[int,int]], scalar: complex) -> None:
+        self.leaves = leaves
+        self.open_labels = open_labels
+        self.path = path
+        self.scalar = scalar
+        legs = [set(l) for l, _ in leaves]
+        sizes = [2**len(l) for l in legs]
+        self.max_size = max(sizes, default=1)
+        self.flops = 0
+        self.peak_size = 0
+        live = 0 # total size of the intermediate tensors that are alive
+        for a, b in path:
+            s = legs[a] ^ legs[b]
+            self.flops += 2**len(legs[a] | legs[b])
+            legs.append(s)
+            sizes.append(2**len(s))
+            self.max_size = max(self.max_size, sizes[-1])
+            self.peak_size = max(self.peak_size, live + sizes[a] + sizes[b] + sizes[-1])
+            live += sizes[-1] - sum(sizes[i] for i in (a, b) if i >= len(leaves))
+        self.peak_size = max(self.peak_size, self.max_size)
+
+    @property
+    def width(self) -> int:
+        """Base-2 logarithm of :attr:`max_size`, i.e. the number of open wires of
+        the largest intermediate tensor."""
+        return self.max_size.bit_length() - 1
+
+    @property
+    def peak_memory(self) -> int:
+        """Estimated peak memory in bytes, assuming complex128 entries."""
+        return 16 * self.peak_size
+
+    def __str__(self) -> str:
+        return "ContractionPlan({} tensors, {} contractions, width {}, peak memory {} bytes, {} flops)".format(
+            len(self.leaves), len(self.path), self.width, self.peak_memory, self.flops)
+    def __repr__(self) -> str:
+        return str(self)
+
+    @profiled('contract')
+    def contract(self, preserve_scalar: bool=True) -> np.ndarray:
+        """Contracts the network in the planned order and returns the tensor, with
+        the indices for the outputs first followed by those for the inputs, just as
+        :func:`tensorfy`."""
+        tensors: Dict[int, Tuple[np.ndarray, List[int]]] = {}
+        n = len(self.leaves)
+        def get(i: int) -> Tuple[np.ndarray, List[int]]:
+            if i < n:
+                l, f = self.leaves[i]
+                return f(), l
+            return tensors.pop(i)
+        for k, (a, b) in enumerate(self.path):
+            ta, la = get(a)
+            tb, lb = get(b)
+            shared = [l for l in la if l in lb]
+            t = np.tensordot(ta, tb, axes=([la.index(l) for l in shared], [lb.index(l) for l in shared]))
+            tensors[n+k] = (t, [l for l in la if l not in shared] + [l for l in lb if l not in shared])
+            if not preserve_scalar and t.size:
+                # Any nonzero rescaling is allowed, so keep the values from under- or overflowing
+                top = np.abs(t).max()
+                if top > 0 and not 10**-3 < top < 10**3: tensors[n+k] = (t / top, tensors[n+k][1])
+        if tensors:
+            tensor, labels = tensors.popitem()[1]
+        elif n == 1:
+            tensor, labels = get(0)
+        else:
+            tensor, labels = np.array(1.0, dtype='complex128'), []
+        tensor = np.transpose(tensor, [labels.index(l) for l in self.open_labels])
+        if preserve_scalar: tensor = np.asarray(tensor * self.scalar)
+        elif tensor.size and 0 < np.abs(tensor).max() < 10**-6: tensor = np.asarray(tensor / np.abs(tensor).max())
+        return tensor
+
+
+def _tensor_network(g: 'BaseGraph[VT,ET]') -> Tuple[List[Tuple[List[int], Callable[[], np.ndarray]]], List[int]]:
+    """Builds the tensor network of a ZX-diagram. Returns a list of leaf tensors, given as
+    their list of wire labels and a function that builds the tensor, and the labels of the
+    open wires: first the outputs, then the inputs.
+
+    X-spiders are turned into Z-spiders with a Hadamard on every leg, and Z-spiders and
+    Z-boxes with more than three legs are split into a chain of three-legged ones, so
+    that no leaf tensor is larger than necessary."""
+    if g.is_hybrid():
+        raise ValueError("Hybrid graphs are not supported.")
+    inputs = g.inputs()
+    outputs = g.outputs()
+    if not inputs and not outputs:
+        if any(g.type(v)==VertexType.BOUNDARY for v in g.vertices()):
+            raise ValueError("Diagram contains BOUNDARY-type vertices, but has no inputs or outputs set. Perhaps call g.auto_detect_io() first?")
+    had = 1/sqrt(2)*np.array([[1,1],[1,-1]], dtype='complex128')
+    id2 = np.identity(2, dtype='complex128')
+    leaves: List[Tuple[List[int], Callable[[], np.ndarray]]] = []
+    fresh = itertools.count()
+    legs: Dict[Any, List[int]] = {v: [] for v in g.vertices()}
+    hads: Dict[Any, bool] = {v: g.type(v) == VertexType.X for v in g.vertices()}
+
+    for e in g.edges():
+        s, t = g.edge_st(e)
+        h = (g.edge_type(e) == EdgeType.HADAMARD) != (hads[s] != hads[t])
+        if g.edge_type(e) not in (EdgeType.SIMPLE, EdgeType.HADAMARD):
+            raise NotImplementedError(f"Tensor contraction with {repr(e)} edges is not implemented.")
+        ls, lt = next(fresh), next(fresh)
+        legs[s].append(ls)
+        legs[t].append(lt)
+        # a Hadamard edge or a self-loop gets a tensor of its own joining both ends
+        if h: leaves.append(([ls, lt], lambda: had))
+        else: leaves.append(([ls, lt], lambda: id2))
+
+    open_labels = []
+    for v in itertools.chain(outputs, inputs):
+        if g.type(v) != VertexType.BOUNDARY: raise ValueError("Wrong type for input or output:", v, g.type(v))
+        if len(legs[v]) != 1: raise ValueError("Weird output" if v in outputs else "Weird input")
+        open_labels.append(legs[v][0])
+    io = set(inputs).union(outputs)
+
+    for v in g.vertices():
+        if v in io: continue
+        ty = g.type(v)
+        p = g.phase(v)
+        if isinstance(p, Poly):
+            raise ValueError(f"Can't convert diagram with parameters to tensor: {str(p)}")
+        phase = pi*p
+        l = legs[v]
+        if ty == VertexType.Z or ty == VertexType.X or ty == VertexType.Z_BOX:
+            if ty == VertexType.Z_BOX:
+                if phase != 0: raise ValueError("Phase on Z box")
+                param = complex(get_z_box_label(g, v))
+            else:
+                param = np.exp(1j*phase)
+            while len(l) > 3:
+                c = next(fresh)
+                leaves.append((l[:2] + [c], partial(Z_box_to_tensor, 3, 1)))
+                l = [c] + l[2:]
+            leaves.append((l, partial(Z_box_to_tensor, len(l), param)))
+        elif ty == VertexType.H_BOX:
+            leaves.append((l, partial(H_to_tensor, len(l), phase)))
+        elif ty == VertexType.W_INPUT or ty == VertexType.W_OUTPUT:
+            if phase != 0: raise ValueError("Phase on W node")
+            leaves.append((l, partial(W_to_tensor, len(l))))
+        else:
+            raise ValueError("Vertex %s has non-ZXH type but is not an input or output" % str(v))
+    return leaves, open_labels
+
+
+def _greedy_path(legs: List[Set[int]]) -> List[Tuple[int,int]]:
+    """Repeatedly contracts the pair of connected tensors for which the size of the result
+    minus the sizes of the inputs is smallest. Disconnected pieces are joined at the end,
+    smallest first."""
+    legs = list(legs)
+    alive = set(range(len(legs)))
+    holders: Dict[int, Set[int]] = {}
+    for i, l in enumerate(legs):
+        for x in l: holders.setdefault(x, set()).add(i)
+    heap: List[Tuple[int,int,int]] = []
+    def push(i: int) -> None:
+        for j in set().union(*(holders[x] for x in legs[i])):
+            if j != i:
+                a, b = min(i,j), max(i,j)
+                heapq.heappush(heap, (2**len(legs[a] ^ legs[b]) - 2**len(legs[a]) - 2**len(legs[b]), a, b))
+    for i in range(len(legs)): push(i)
+    path = []
+    while heap:
+        _, a, b = heapq.heappop(heap)
+        if a not in alive or b not in alive: continue
+        path.append((a,b))
+        c = len(legs)
+        legs.append(legs[a] ^ legs[b])
+        alive -= {a, b}
+        alive.add(c)
+        for x in legs[a] | legs[b]:
+            holders[x] -= {a, b}
+            if x in legs[c]: holders[x].add(c)
+        push(c)
+    rest = sorted(alive, key=lambda i: len(legs[i]))
+    while len(rest) > 1:
+        a, b = rest.pop(0), rest.pop(0)
+        path.append((a,b))
+        legs.append(legs[a] | legs[b])
+        rest.append(len(legs)-1)
+        rest.sort(key=lambda i: len(legs[i]))
+    return path
+
+def _elimination_path(legs: List[Set[int]]) -> List[Tuple[int,int]]:
+    """Eliminates the wires one by one in min-fill order, the usual heuristic for finding
+    tree decompositions: each time it picks the wire whose elimination connects the
+    fewest pairs of wires that did not yet meet in a tensor. The tensors attached to
+    the chosen wire are contracted pairwise, smallest first."""
+    legs = list(legs)
+    holders: Dict[int, Set[int]] = {}
+    for i, l in enumerate(legs):
+        for x in l: holders.setdefault(x, set()).add(i)
+    inner = {x for x, h in holders.items() if len(h) > 1}
+    path = []
+    while inner:
+        cache: Dict[int, Set[int]] = {}
+        def adj(y: int) -> Set[int]:
+            if y not in cache: cache[y] = set().union(*(legs[i] for i in holders[y])) - {y}
+            return cache[y]
+        def fill(x: int) -> Tuple[int,int]:
+            nb = [y for y in adj(x) if not holders[y] <= holders[x]]
+            missing = sum(1 for k, u in enumerate(nb) for w in nb[k+1:] if w not in adj(u))
+            return (missing, len(nb))
+        x = min(sorted(inner), key=fill)
+        group = sorted(holders[x], key=lambda i: (len(legs[i]), i))
+        while len(group) > 1:
+            a, b = group.pop(0), group.pop(0)
+            path.append((a,b))
+            c = len(legs)
+            legs.append(legs[a] ^ legs[b])
+            for y in legs[a] | legs[b]:
+                holders[y] -= {a, b}
+                if y in legs[c]: holders[y].add(c)
+                if len(holders[y]) < 2: inner.discard(y)
+            group.append(c)
+            group.sort(key=lambda i: (len(legs[i]), i))
+    alive = set(range(len(legs))) - {i for p in path for i in p}
+    rest = sorted(alive, key=lambda i: (len(legs[i]), i))
+    while len(rest) > 1:
+        a, b = rest.pop(0), rest.pop(0)
+        path.append((a,b))
+        legs.append(legs[a] | legs[b])
+        rest.append(len(legs)-1)
+        rest.sort(key=lambda i: (len(legs[i]), i))
+    return path
+
+@profiled('plan_contraction')
+def plan_contraction(g: 'BaseGraph[VT,ET]', method: str='greedy') -> ContractionPlan:
+    """Builds the tensor network of a ZX-diagram and finds an order in which to contract it.
+
+    Args:
+        g: The diagram.
+        method: Either ``'greedy'``, which repeatedly contracts the pair of tensors that
+            grows the total size least, or ``'elimination'``, which eliminates wires
+            in min-fill order as used for finding tree decompositions. The latter is
+            slower to plan but often finds a lower width.
+
+    Returns:
+        A :class:`ContractionPlan` whose ``peak_memory``, ``flops`` and ``width`` can be
+        inspected before calling :meth:`ContractionPlan.contract`.
+
+    Example::
+
+        plan = plan_contraction(g)
+        if plan.peak_memory < 10**9:
+            t = plan.contract()
+    """
+    leaves, open_labels = _tensor_network(g)
+    legs = [set(l) for l, _ in leaves]
+    if method == 'greedy': path = _greedy_path(legs)
+    elif method == 'elimination': path = _elimination_path(legs)
+    else: raise ValueError("Unknown contraction method: " + str(method))
+    return ContractionPlan(leaves, open_labels, path, g.scalar.to_number())
+
+def _row_order_width(g: 'BaseGraph[VT,ET]') -> int:
+    """The largest number of open wires of the tensor built when contracting the
+    vertices row by row, as ``tensorfy(g, method='rows')`` does."""
+    rows = g.rows()
+    order = sorted(g.vertices(), key=lambda v: (rows[v], v))
+    inputs = set(g.inputs())
+    done = set(inputs)
+    # The contracted tensor keeps one wire for every input, and one for every edge
+    # between a contracted vertex and one that is not contracted yet.
+    open_edges = sum(g.vertex_degree(v) for v in inputs)
+    width = len(inputs) + open_edges
+    for v in order:
+        if v in done: continue
+        done.add(v)
+        inner = sum(1 for w in g.neighbors(v) if w in done and w != v)
+        open_edges += g.vertex_degree(v) - 2*inner
+        width = max(width, len(inputs) + open_edges + inner)
+    return width
+
+@profiled('tensorfy')
+def tensorfy(g: 'BaseGraph[VT,ET]', preserve_scalar:bool=True, method:str='auto') -> np.ndarray:
     """Takes in a Graph and outputs a multidimensional numpy array
     representing the linear map the ZX-diagram implements.
-    Beware that quantum circuits take exponential memory to represent."""
+    Beware that quantum circuits take exponential memory to represent.
+
+    The ``method`` is passed to :func:`plan_contraction` to pick the order in which the
+    tensor network is contracted. ``'rows'`` instead contracts the vertices row by row.
+    The default ``'auto'`` uses the greedy plan, unless contracting row by row keeps
+    the intermediate tensors smaller, as is often the case for long, narrow circuits."""
+    if method != 'rows':
+        plan = plan_contraction(g, 'greedy' if method == 'auto' else method)
+        if method != 'auto' or plan.width <= _row_order_width(g):
+            return plan.contract(preserve_scalar)
     if g.is_hybrid():
         raise ValueError("Hybrid graphs are not supported.")
     rows = g.rows()
@@ -316,3 +616,157 @@ def is_unitary(g: 'BaseGraph') -> bool:
     adj = g.adjoint()
     adj.compose(g)
     return compare_tensors(adj.to_tensor(), identity(len(g.inputs()),2).to_tensor(), False)
+
+
+_H = np.array([[1, 1], [1, -1]], dtype=complex) / sqrt(2)
+_CNOT = np.array([[1,0,0,0],[0,1,0,0],[0,0,0,1],[0,0,1,0]], dtype=complex)
+_CZ = np.diag([1,1,1,-1]).astype(complex)
+
+def _basic_gate_matrix(g: Any) -> Tuple[Tuple[int, ...], np.ndarray]:
+    """Returns the qubits a gate produced by :meth:`~pyzx.circuit.Circuit.to_basic_gates`
+    acts on, and its unitary with the first of these qubits as the most significant bit."""
+    from .circuit.gates import ZPhase, XPhase, HAD, CNOT, CZ
+    if isinstance(g, (ZPhase, XPhase)):
+        if isinstance(g.phase, Poly):
+            raise TypeError("Gates with symbolic phases are not supported: {}".format(str(g)))
+        m = np.diag(np.array([1, np.exp(1j*pi*float(g.phase))]))
+        return (g.target,), (m if isinstance(g, ZPhase) else _H @ m @ _H)
+    if isinstance(g, HAD):
+        return (g.target,), _H
+    if isinstance(g, CNOT):
+        return (g.control, g.target), _CNOT
+    if isinstance(g, CZ):
+        return (g.control, g.target), _CZ
+    raise TypeError("Unsupported gate {}".format(str(g)))
+
+def _circuit_layers(c: 'Circuit') -> Tuple[Tuple[Tuple[Tuple[int,int], ...], ...], List[List[np.ndarray]], List[np.ndarray]]:
+    """Splits a circuit into layers of 2-qubit gates on disjoint qubits, scheduled as early as possible.
+    Runs of single-qubit gates are multiplied together and folded into the next 2-qubit gate on
+    their qubit, or else into a final layer of single-qubit gates on every qubit.
+
+    Returns the structure of the layers, i.e. the qubits of the gates in each layer, the 4x4 matrices
+    of the gates in each layer, and the 2x2 matrices of the final layer."""
+    n = c.qubits
+    pending: List[Optional[np.ndarray]] = [None]*n
+    free = [0]*n  # The first layer in which each qubit is free
+    layers: List[List[Tuple[Tuple[int,int], np.ndarray]]] = []
+    for g in c.to_basic_gates().gates:
+        qs, m = _basic_gate_matrix(g)
+        if len(qs) == 1:
+            q = qs[0]
+            pending[q] = m if pending[q] is None else m @ pending[q]
+            continue
+        a, b = qs
+        if a > b:
+            m = m.reshape(2,2,2,2).transpose(1,0,3,2).reshape(4,4)
+            a, b = b, a
+        pa, pb = pending[a], pending[b]
+        if pa is not None or pb is not None:
+            m = m @ np.kron(pa if pa is not None else np.eye(2), pb if pb is not None else np.eye(2))
+            pending[a] = pending[b] = None
+        l = max(free[a], free[b])
+        if l == len(layers): layers.append([])
+        layers[l].append(((a,b), m))
+        free[a] = free[b] = l + 1
+    structure = []
+    matrices = []
+    for layer in layers:
+        layer.sort(key=lambda x: x[0])
+        structure.append(tuple(qs for qs, _ in layer))
+        matrices.append([m for _, m in layer])
+    final = [p if p is not None else np.eye(2, dtype=complex) for p in pending]
+    return tuple(structure), matrices, final
+
+def _contract_layers(n: int, structure: Tuple[Tuple[Tuple[int,int], ...], ...],
+                     matrices: List[List[List[np.ndarray]]], final: List[List[np.ndarray]]) -> np.ndarray:
+    """Computes the unitaries of a batch of circuits with the same layer structure,
+    with one ``einsum`` per layer for the whole batch."""
+    b = len(matrices)
+    dim = 2**n
+    state = np.broadcast_to(np.eye(dim, dtype=complex).reshape((2,)*n + (dim,)), (b,) + (2,)*n + (dim,))
+    # Index labels: 0 for the batch, 1..n for the qubits, n+1 for the input basis and
+    # n+2..2n+1 for the qubits after the layer.
+    current = list(range(1, n+1))
+    col = n + 1
+    def apply(blocks: List[Tuple[Tuple[int, ...], np.ndarray]], state: np.ndarray) -> np.ndarray:
+        args: List[Any] = []
+        out = [0] + current + [col]
+        for qs, stacked in blocks:
+            args.append(stacked.reshape((b,) + (2,)*(2*len(qs))))
+            args.append([0] + [n+2+q for q in qs] + [1+q for q in qs])
+            for q in qs: out[1+q] = n+2+q
+        args.extend([state, [0] + current + [col], out])
+        return np.einsum(*args, optimize='greedy')
+    for i, qubits in enumerate(structure):
+        blocks: List[Tuple[Tuple[int, ...], np.ndarray]] = [
+            (qs, np.stack([m[i][j] for m in matrices])) for j, qs in enumerate(qubits)]
+        state = apply(blocks, state)
+    state = apply([((q,), np.stack([f[q] for f in final])) for q in range(n)], state)
+    return state.reshape(b, dim, dim)
+
+def circuit_unitaries(circuits: List['Circuit'], max_bytes: int=2**28) -> List[np.ndarray]:
+    """Returns the unitary matrices of the circuits, in the same convention as
+    :meth:`~pyzx.circuit.Circuit.to_matrix`.
+
+    Instead of going through :func:`tensorfy`, the unitaries are built directly from the gates.
+    Circuits with the same number of qubits and the same structure of layers of 2-qubit
+    gates, such as the circuits of a parameter sweep, are computed together, with one
+    ``einsum`` per layer for the whole batch. At most ``max_bytes`` of matrices are
+    computed at a time, which limits the size of the batches."""
+    groups: Dict[Tuple[int, Tuple], List[int]] = {}
+    layers = []
+    for i, c in enumerate(circuits):
+        structure, matrices, final = _circuit_layers(c)
+        layers.append((matrices, final))
+        groups.setdefault((c.qubits, structure), []).append(i)
+    result: List[np.ndarray] = [np.empty(0)]*len(circuits)
+    for (n, structure), indices in groups.items():
+        size = max(1, max_bytes // (2 * 16 * 4**n))
+        for start in range(0, len(indices), size):
+            chunk = indices[start:start+size]
+            us = _contract_layers(n, structure, [layers[i][0] for i in chunk], [layers[i][1] for i in chunk])
+            for i, u in zip(chunk, us):
+                result[i] = u
+    return result
+
+def compare_circuits(pairs: List[Tuple['Circuit', 'Circuit']], preserve_scalar: bool=False,
+                     atol: float=1e-8, max_bytes: int=2**28) -> Tuple[np.ndarray, np.ndarray]:
+    """Checks for each pair of circuits whether they implement the same unitary, using
+    :func:`circuit_unitaries` to compute all the unitaries in batches. This is much faster
+    than calling :func:`compare_tensors` on each pair, for instance to check the results of
+    optimizing many small circuits::
+
+        passed, scalars = compare_circuits([(c, zx.optimize.full_optimize(c)) for c in circuits])
+
+    Args:
+        pairs: The pairs of circuits to compare. The circuits in a pair should have the same number of qubits.
+        preserve_scalar: When False (the default), equality is checked up to a global phase.
+        atol: The absolute tolerance on the entries of the unitaries.
+        max_bytes: See :func:`circuit_unitaries`.
+
+    Returns:
+        A boolean array saying which pairs are equal, and an array with for each pair the
+        number ``z`` such that the unitary of the first circuit is ``z`` times that of the second,
+        i.e. the scalar correction. For pairs that are not equal up to a scalar, this is the best
+        fit in the least squares sense.
+    """
+    for c1, c2 in pairs:
+        if c1.qubits != c2.qubits:
+            raise TypeError("Circuits have different amounts of qubits, {!s} vs {!s}".format(c1.qubits, c2.qubits))
+    us = circuit_unitaries([c for pair in pairs for c in pair], max_bytes)
+    passed = np.zeros(len(pairs), dtype=bool)
+    scalars = np.zeros(len(pairs), dtype=complex)
+    by_size: Dict[int, List[int]] = {}
+    for i, (c1, _) in enumerate(pairs):
+        by_size.setdefault(c1.qubits, []).append(i)
+    for indices in by_size.values():
+        u1 = np.stack([us[2*i] for i in indices])
+        u2 = np.stack([us[2*i+1] for i in indices])
+        z = np.einsum('bij,bij->b', u2.conj(), u1) / np.einsum('bij,bij->b', u2.conj(), u2).real
+        residual = np.abs(u1 - z[:, None, None]*u2).max(axis=(1,2))
+        ok = residual <= atol
+        if preserve_scalar:
+            ok &= np.abs(z - 1) <= atol
+        passed[indices] = ok
+        scalars[indices] = z
+    return passed, scalars
@@ -1,7 +1,19 @@
 #!/usr/bin/python
 # type: ignore
 import pathlib
-from setuptools import setup
+from setuptools import setup, Extension
+
+try:
+    from Cython.Build import cythonize
+    import numpy
+except ImportError:
+    ext_modules = []
+else:
+    # Optional compiled Mat2. pyzx.linalg falls back to pure Python when it is absent.
+    ext_modules = cythonize([Extension("pyzx.linalg_c", ["pyzx/linalg_c.pyx"],
+                                       include_dirs=[numpy.get_include()],
+                                       optional=True)],
+                            language_level=3)
 
 HERE = pathlib.Path(__file__).parent
 README = (HERE / "readme.md").read_text()
@@ -33,6 +45,7 @@ setup(
         "pyzx.routing",
         "pyzx.local_search",
         "pyzx.scripts",
+        "pyzx.benchmark",
     ],
     python_requires='>=3.9',
     install_requires=["typing_extensions>=3.7.4",
@@ -42,4 +55,5 @@ setup(
                       "ipywidgets>=7.5",
                       "lark>=1.2.2"],
     include_package_data=True,
+    ext_modules=ext_modules,
 )
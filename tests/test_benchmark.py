@@ -0,0 +1,94 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+import sys
+import os
+import io
+import copy
+import tempfile
+import contextlib
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.benchmark import load_cases, run_benchmarks, save_results, load_results, compare_results
+from pyzx.scripts import bench
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        cases = load_cases(['generated'])
+        self.cases = [c for c in cases if c.name in ('cnot_had_phase_8x200', 'cnots_9x100')]
+
+    def test_generated_cases_are_reproducible(self):
+        for case in self.cases:
+            self.assertEqual(case.load().to_qasm(), case.load().to_qasm())
+
+    def test_file_cases(self):
+        cases = load_cases(['fast'])
+        self.assertTrue(cases)
+        self.assertTrue(all(os.path.isfile(c.path) for c in cases))
+        self.assertFalse(any('tpar' in c.path or 'after' in c.path for c in cases))
+        with self.assertRaises(ValueError):
+            load_cases(['nonexistent'])
+
+    def test_run_and_compare(self):
+        results = run_benchmarks(self.cases, ['full_reduce', 'extract_circuit', 'routing'])
+        tasks = {(r['case'], r['task']) for r in results['results']}
+        self.assertIn(('cnot_had_phase_8x200', 'extract_circuit'), tasks)
+        self.assertIn(('cnots_9x100', 'routing'), tasks)
+        self.assertNotIn(('cnot_had_phase_8x200', 'routing'), tasks)
+        for r in results['results']:
+            self.assertEqual(r['status'], 'ok', r.get('error'))
+            self.assertGreaterEqual(r['time'], 0)
+            self.assertGreater(r['peak_memory'], 0)
+        self.assertEqual(compare_results(results, results), [])
+
+        worse = copy.deepcopy(results)
+        r = worse['results'][0]
+        r['time'] = 2 * r['time'] + 1
+        r['quality']['tcount'] += 1
+        worse['results'][1]['status'] = 'error'
+        kinds = sorted(reg.kind for reg in compare_results(results, worse))
+        self.assertEqual(kinds, ['quality', 'status', 'time'])
+        kinds = sorted(reg.kind for reg in compare_results(results, worse, min_time=2, quality=False))
+        self.assertEqual(kinds, ['status'])
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as d:
+            out = os.path.join(d, 'results.json')
+            with contextlib.redirect_stdout(io.StringIO()):
+                bench.main(['run', '-s', 'generated', '-k', 'cnots_9x100', '-t', 'routing',
+                            '--no-memory', '-o', out])
+            results = load_results(out)
+            self.assertEqual(len(results['results']), 1)
+            self.assertNotIn('peak_memory', results['results'][0])
+
+            results['results'][0]['quality']['gates'] -= 1
+            baseline = os.path.join(d, 'baseline.json')
+            save_results(results, baseline)
+            with contextlib.redirect_stdout(io.StringIO()) as f:
+                with self.assertRaises(SystemExit) as cm:
+                    bench.main(['compare', baseline, out])
+            self.assertEqual(cm.exception.code, 1)
+            self.assertIn('gates', f.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
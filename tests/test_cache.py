@@ -0,0 +1,127 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+import sys
+import os
+import tempfile
+import random
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.circuit import Circuit
+from pyzx.generate import CNOT_HAD_PHASE_circuit
+from pyzx.optimize import full_optimize
+from pyzx.simplify import full_reduce
+from pyzx.tensor import compare_tensors
+from pyzx.cache import ResultCache, circuit_hash, graph_hash, cached_full_optimize, cached_full_reduce
+from pyzx.routing.architecture import create_architecture, ArchitectureCache, IBMQ_SINGAPORE, SQUARE
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        random.seed(1)
+        self.circuit = CNOT_HAD_PHASE_circuit(4, 40, p_had=0.2, p_t=0.3)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_hashes(self):
+        c = self.circuit
+        self.assertEqual(circuit_hash(c), circuit_hash(c.copy()))
+        c2 = c.copy()
+        c2.add_gate("T", 0)
+        self.assertNotEqual(circuit_hash(c), circuit_hash(c2))
+        g = c.to_graph()
+        h = g.copy()
+        full_reduce(h)
+        self.assertEqual(graph_hash(g), graph_hash(c.to_graph()))
+        self.assertNotEqual(graph_hash(g), graph_hash(h))
+
+    def test_cached_full_optimize(self):
+        cache = ResultCache(self.dir.name)
+        c1 = cached_full_optimize(self.circuit, cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        c2 = cached_full_optimize(self.circuit, cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(c1.to_qasm(), c2.to_qasm())
+        self.assertEqual(c2.to_qasm(), full_optimize(self.circuit).to_qasm())
+        self.assertTrue(compare_tensors(c2, self.circuit))
+        # A second cache object on the same directory sees the entry
+        cached_full_optimize(self.circuit, ResultCache(self.dir.name))
+        self.assertEqual(len(cache.entries()), 1)
+
+    def test_cached_full_reduce(self):
+        cache = ResultCache(self.dir.name)
+        g = self.circuit.to_graph()
+        h1 = cached_full_reduce(g, cache)
+        h2 = cached_full_reduce(g, cache)
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(compare_tensors(h2, g))
+        self.assertEqual(graph_hash(h1), graph_hash(h2))
+
+    def test_lru_eviction(self):
+        cache = ResultCache(self.dir.name, max_bytes=250)
+        keys = [cache.key('test', str(i)) for i in range(4)]
+        for i, k in enumerate(keys[:3]):
+            cache.put(k, 'x'*100)
+            os.utime(cache._path(k), (i, i))
+        self.assertEqual(len(cache.entries()), 2)
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[1])) # Now the most recently used
+        cache.put(keys[3], 'x'*100)
+        self.assertIsNone(cache.get(keys[2]))
+        self.assertIsNotNone(cache.get(keys[1]))
+        self.assertLessEqual(cache.size(), 250)
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+
+    def test_architecture_cache(self):
+        cache = ArchitectureCache(self.dir.name)
+        arch = create_architecture(IBMQ_SINGAPORE, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertIsNotNone(arch.distances)
+        arch._non_cutting_vertices[(0, 1)] = [1]
+        cache.store(arch)
+
+        other = ArchitectureCache(self.dir.name)
+        loaded = create_architecture(IBMQ_SINGAPORE, cache=other)
+        create_architecture(IBMQ_SINGAPORE, cache=other)
+        self.assertEqual((other.hits, other.misses), (2, 0))
+        self.assertEqual(loaded.cache_key, arch.cache_key)
+        self.assertEqual(loaded.qubit_map, arch.qubit_map)
+        self.assertEqual(loaded.reduce_order, arch.reduce_order)
+        self.assertEqual(loaded.non_cutting_vertices([0, 1]), [1])
+        expected = create_architecture(IBMQ_SINGAPORE).pre_calc_distances()
+        for kind in ("upper", "full"):
+            for paths, expected_paths in zip(loaded.distances[kind], expected[kind]):
+                self.assertEqual(dict(paths), dict(expected_paths))
+
+        # Another coupling graph or qubit placement is another entry
+        create_architecture(SQUARE, n_qubits=9, cache=other)
+        create_architecture(IBMQ_SINGAPORE, qubit_map=list(range(20)), cache=other)
+        self.assertEqual((other.hits, other.misses), (2, 2))
+        self.assertEqual(len(other.entries()), 3)
+        with self.assertRaises(ValueError):
+            cache.store(create_architecture(SQUARE, n_qubits=9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,8 +16,10 @@
 
 
 import copy
+import random
 import unittest
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Optional
 
 if __name__ == "__main__":
@@ -41,6 +43,8 @@ from pyzx.routing.architecture import (
     create_architecture,
     SQUARE,
     FULLY_CONNECTED,
+    LINE,
+    IBM_Q20_TOKYO,
     IBMQ_SINGAPORE,
 )
 from pyzx.routing.parity_maps import CNOT_tracker
@@ -48,7 +52,7 @@ from pyzx.routing.machine_learning import GeneticAlgorithm
 from pyzx.circuit import CNOT
 from pyzx.extract import permutation_as_swaps
 from pyzx.generate import build_random_parity_map
-from pyzx.routing.steiner import steiner_gauss
+from pyzx.routing.steiner import steiner_gauss, rec_steiner_gauss
 
 SEED = 42
 
@@ -278,6 +282,43 @@ class TestSteiner(unittest.TestCase):
                     self.matrix[i], best_permutation, best_permutation
                 )
 
+    def test_parallel_genetic_optimization(self):
+        fitness_func = FitnessFunction(CostMetric.COMBINED, self.matrix[0], ElimMode.STEINER_MODE, self.arch)
+        serial = GeneticAlgorithm(6, 0.8, 0.2, fitness_func, seed=SEED)
+        result = serial.find_optimum(self.n_qubits, 4)
+        self.assertGreater(serial.memo_hits, 0)
+        self.assertEqual(len(serial._memo), serial.memo_misses)
+        with ProcessPoolExecutor(2) as executor:
+            parallel = GeneticAlgorithm(6, 0.8, 0.2, fitness_func, executor=executor, memo_size=0, seed=SEED)
+            self.assertEqual(list(parallel.find_optimum(self.n_qubits, 4)), list(result))
+            _, _, score = sequential_gauss(
+                [m.copy() for m in self.matrix],  # type: ignore # MatLike should be a valid ArrayLike
+                mode=ElimMode.PSO_STEINER_MODE,
+                architecture=self.arch,
+                n_steps=2,
+                swarm_size=3,
+                population_size=4,
+                n_iterations=1,
+                executor=executor,
+                seed=SEED,
+            )
+        state = np.random.get_state()
+        _, _, serial_score = sequential_gauss(
+            [m.copy() for m in self.matrix],  # type: ignore # MatLike should be a valid ArrayLike
+            mode=ElimMode.PSO_STEINER_MODE,
+            architecture=self.arch,
+            n_steps=2,
+            swarm_size=3,
+            population_size=4,
+            n_iterations=1,
+            seed=SEED,
+        )
+        self.assertEqual(score, serial_score)
+        # A seeded run leaves the global random state alone
+        new_state = np.random.get_state()
+        self.assertTrue(np.array_equal(state[1], new_state[1]))
+        self.assertEqual(state[2:], new_state[2:])
+
     def test_pso_optimization(self):
         modes = [
             ElimMode.STEINER_MODE,
@@ -399,6 +440,108 @@ class TestSteiner(unittest.TestCase):
         steiner_gauss(c.matrix, arch, full_reduce=True, y=tracker)
         self.assertGates(tracker, architecture=arch)
 
+    def test_batched_tracking(self):
+        class Tracker(CNOT_tracker):
+            # Overriding row_add and col_add makes row_adds and col_adds call them one by one
+            def row_add(self, q0: int, q1: int):
+                super().row_add(q0, q1)
+
+            def col_add(self, q0: int, q1: int):
+                super().col_add(q0, q1)
+
+        for gauss_func in (steiner_gauss, rec_steiner_gauss):
+            for full_reduce in (False, True):
+                with self.subTest(gauss_func=gauss_func.__name__, full_reduce=full_reduce):
+                    results = []
+                    for tracker_class in (CNOT_tracker, Tracker):
+                        matrix = self.matrix[0].copy()
+                        x, y = tracker_class(self.n_qubits), tracker_class(self.n_qubits)
+                        gauss_func(matrix, self.arch, full_reduce=full_reduce, x=x, y=y)
+                        self.assertGates(x)
+                        self.assertEqual(x.matrix * self.matrix[0], matrix)
+                        self.assertEqual(y.matrix * matrix, self.matrix[0])
+                        results.append((matrix.data, x.gates, x.matrix.data, y.gates, y.matrix.data))
+                    self.assertEqual(results[0], results[1])
+                    if full_reduce and gauss_func is rec_steiner_gauss:
+                        self.assertEqual(matrix, Mat2.id(self.n_qubits))
+
+    def test_steiner_tree_cache(self):
+        arch = create_architecture(SQUARE, n_qubits=9, steiner_cache_size=2)
+        trees = arch.steiner_trees
+        edges = list(arch.steiner_tree(0, [0, 4, 8]))
+        self.assertEqual(list(arch.steiner_tree(0, [8, 4, 0])), edges)
+        self.assertEqual((trees.hits, trees.misses, trees.hit_rate), (1, 1, 0.5))
+        arch.steiner_tree_edges(1, [1, 5])
+        arch.steiner_tree_edges(2, [2, 6])
+        self.assertEqual(len(trees), 2)
+        arch.steiner_tree_edges(0, [0, 4, 8])  # Evicted
+        self.assertEqual(trees.misses, 4)
+
+        # Changing the placement invalidates the trees
+        rec_steiner_gauss(self.matrix[0].copy(), arch, full_reduce=True)
+        qubit_map = list(reversed(arch.qubit_map))
+        arch.qubit_map = qubit_map
+        self.assertEqual(len(trees), 0)
+        fresh = create_architecture(SQUARE, n_qubits=9, qubit_map=qubit_map)
+        self.assertEqual(arch.steiner_tree_edges(8, [8, 4, 0]), fresh.steiner_tree_edges(8, [8, 4, 0]))
+        results = []
+        for a in (arch, fresh):
+            matrix = self.matrix[0].copy()
+            x = CNOT_tracker(self.n_qubits)
+            rec_steiner_gauss(matrix, a, full_reduce=True, x=x)
+            self.assertGates(x, architecture=a)
+            results.append(x.gates)
+        self.assertEqual(results[0], results[1])
+
+    def test_pre_calc_distances(self):
+        arch = create_architecture(IBMQ_SINGAPORE)
+        distances = arch.pre_calc_distances()
+        vertices = arch.vertices
+        for until in range(len(vertices)):
+            for upper, subgraph in ((True, vertices[until:]), (False, vertices[: until + 1])):
+                paths = distances["upper" if upper else "full"][until]
+                expected = arch.floyd_warshall(subgraph, upper=upper)
+                with self.subTest(until=until, upper=upper):
+                    self.assertEqual(set(paths.keys()), set(expected.keys()))
+                    for (v1, v2), (dist, path) in paths.items():
+                        self.assertEqual(dist, expected.distance(v1, v2))
+                        self.assertEqual(len(path), dist)
+                        self.assertEqual([e[0] for e in path[1:]], [e[1] for e in path[:-1]])
+                        if path:
+                            self.assertEqual((path[0][0], path[-1][1]), (v1, v2))
+                        for u, v in path:
+                            self.assertTrue(arch.graph.connected(u, v))
+                            self.assertIn(v, subgraph)
+                            if not upper:
+                                self.assertGreater(arch.vertex2qubit(u), arch.vertex2qubit(v))
+        # The two ends of a line are only connected through the middle
+        line = create_architecture("line", n_qubits=5)
+        paths = line.floyd_warshall([line.qubit2vertex(q) for q in (0, 1, 3, 4)])
+        self.assertIn((line.qubit2vertex(0), line.qubit2vertex(1)), paths)
+        self.assertNotIn((line.qubit2vertex(0), line.qubit2vertex(4)), paths)
+        self.assertEqual(len(paths), 8)
+
+
+    def test_rec_steiner_gauss_cnot_counts(self):
+        # Regression check on the routing output: the CNOT counts depend on which of the
+        # equally short paths are used to build the Steiner trees.
+        expected = {
+            SQUARE: [47, 38, 49, 46, 32, 61],
+            LINE: [61, 74, 62, 61, 77, 88],
+            IBM_Q20_TOKYO: [222, 194, 171, 179, 204, 215],
+        }
+        for name, counts in expected.items():
+            arch = create_architecture(name, n_qubits=9)
+            for seed, count in enumerate(counts):
+                random.seed(seed)
+                np.random.seed(seed)
+                matrix = Mat2(build_random_parity_map(arch.n_qubits, 2 * arch.n_qubits))
+                circuit = CNOT_tracker(arch.n_qubits)
+                rec_steiner_gauss(matrix.copy(), arch, full_reduce=True, y=circuit)
+                with self.subTest(architecture=name, seed=seed):
+                    self.assertEqual(len(circuit.gates), count)
+                    self.assertGates(circuit, arch)
+                    self.assertMat2Equal(circuit.matrix, matrix)
 
 if __name__ == "__main__":
     unittest.main()
@@ -18,6 +18,7 @@
 import unittest
 import random
 import sys
+import itertools
 from types import ModuleType
 from typing import Optional
 
@@ -26,9 +27,12 @@ if __name__ == '__main__':
     sys.path.append('.')
 from pyzx.circuit import Circuit
 from pyzx.circuit.gates import CNOT
-from pyzx.generate import cliffordT
-from pyzx.simplify import clifford_simp
-from pyzx.extract import extract_circuit
+from pyzx.generate import cliffordT, CNOT_HAD_PHASE_circuit
+from pyzx.simplify import clifford_simp, full_reduce
+from pyzx.extract import (extract_circuit, ExtractStats, FrontierMatrix, bi_adj, lookahead_full,
+                          anytime_extract, LookaheadStats, find_minimal_sums, greedy_reduction,
+                          column_optimal_swap)
+from pyzx.linalg import Mat2
 
 np: Optional[ModuleType]
 try:
@@ -71,7 +75,118 @@ class TestExtract(unittest.TestCase):
                 cnot_count+=1
         self.assertTrue(cnot_count==4)
         self.assertTrue(c.verify_equality(c2))
-        
+
+    def test_frontier_matrix_is_kept_in_sync(self):
+        random.seed(SEED)
+        update = FrontierMatrix.update
+        def checked_update(fm, g, frontier, neighbor_set):
+            m, neighbors = update(fm, g, frontier, neighbor_set)
+            self.assertEqual(set(neighbors), neighbor_set)
+            self.assertEqual(m.data, bi_adj(g, neighbors, frontier).data)
+            return m, neighbors
+        FrontierMatrix.update = checked_update # type: ignore
+        try:
+            for i in range(4):
+                c = CNOT_HAD_PHASE_circuit(6, 100, p_had=0.2, p_t=0.2)
+                g = c.to_graph()
+                full_reduce(g)
+                for optimize_cnots in (0, 2, 3):
+                    stats = ExtractStats()
+                    c2 = extract_circuit(g.copy(), optimize_cnots=optimize_cnots, stats=stats)
+                    with self.subTest(i=i, optimize_cnots=optimize_cnots):
+                        self.assertTrue(c.verify_equality(c2))
+                        self.assertEqual(stats.full_rebuilds, 1)
+                        self.assertGreater(stats.rows_reused, 0)
+        finally:
+            FrontierMatrix.update = update # type: ignore
+
+    def test_find_minimal_sums(self):
+        random.seed(SEED)
+        def weight_of_sum(m, rows):
+            return sum(sum(m.data[i][j] for i in rows) % 2 for j in range(m.cols()))
+        for i in range(100):
+            m = Mat2([[int(random.random() < 0.4) for _ in range(9)] for _ in range(8)])
+            minimal = next((k for k in range(1, 9) for rows in itertools.combinations(range(8), k)
+                            if weight_of_sum(m, rows) == 1), None)
+            for reversed_search in (False, True):
+                rows = find_minimal_sums(m, reversed_search)
+                with self.subTest(i=i, reversed_search=reversed_search):
+                    if minimal is None:
+                        self.assertIsNone(rows)
+                    elif minimal == 1:
+                        self.assertEqual(rows, ())
+                    else:
+                        self.assertEqual(len(rows), minimal)
+                        self.assertEqual(weight_of_sum(m, rows), 1)
+
+        # A sum of 9 of 30 rows: too deep for a breadth-first search
+        m = Mat2([[int(random.random() < 0.5) for _ in range(40)] for _ in range(29)])
+        m.data.append([int(sum(m.data[i][j] for i in range(8)) % 2 != (j == 0)) for j in range(40)])
+        rows = find_minimal_sums(m)
+        self.assertIsNotNone(rows)
+        self.assertEqual(weight_of_sum(m, rows), 1)
+        ops = greedy_reduction(m)
+        self.assertIsNotNone(ops)
+        for control, target in ops:
+            m.row_add(control, target)
+        self.assertTrue(any(sum(row) == 1 for row in m.data))
+
+    def test_column_optimal_swap(self):
+        random.seed(SEED)
+        for i in range(50):
+            r = random.randint(1, 5)
+            c = random.randint(r, 6)
+            m = Mat2([[int(random.random() < 0.4) for _ in range(c)] for _ in range(r)])
+            col_weights = [sum(row[j] for row in m.data) for j in range(c)]
+            # The most ones on the diagonal, and then the fewest ones in the pivot columns
+            best = min((-sum(m.data[k][p[k]] for k in range(r)),
+                        sum(col_weights[p[k]] for k in range(r) if m.data[k][p[k]]))
+                       for p in itertools.permutations(range(c), r))
+            for weighted in (False, True):
+                target = column_optimal_swap(m, weighted)
+                with self.subTest(i=i, weighted=weighted):
+                    self.assertEqual(sorted(target.keys()), list(range(c)))
+                    self.assertEqual(sorted(target.values()), list(range(c)))
+                    perm = {v: k for k, v in target.items()}
+                    diagonal = [k for k in range(r) if m.data[k][perm[k]]]
+                    self.assertEqual(-len(diagonal), best[0])
+                    if weighted:
+                        self.assertEqual(sum(col_weights[perm[k]] for k in diagonal), best[1])
+
+    def test_parallel_lookahead_full(self):
+        random.seed(SEED)
+        c = CNOT_HAD_PHASE_circuit(5, 80, p_had=0.2, p_t=0.2)
+        g = c.to_graph()
+        full_reduce(g)
+        basic = extract_circuit(g.clone()).to_basic_gates().twoqubitcount()
+        c2 = lookahead_full(g.clone(), workers=2)
+        self.assertTrue(c.verify_equality(c2))
+        self.assertLessEqual(c2.to_basic_gates().twoqubitcount(), basic)
+        c3 = lookahead_full(g.clone(), workers=2, time_budget=0)
+        self.assertTrue(c.verify_equality(c3))
+
+    def test_anytime_extract(self):
+        random.seed(SEED)
+        c = CNOT_HAD_PHASE_circuit(6, 120, p_had=0.2, p_t=0.2)
+        g = c.to_graph()
+        full_reduce(g)
+        basic = extract_circuit(g.clone()).to_basic_gates().twoqubitcount()
+        bests = []
+        stats = LookaheadStats()
+        c1 = anytime_extract(g, callback=lambda s: bests.append(s.best), stats=stats)
+        self.assertTrue(c.verify_equality(c1))
+        self.assertEqual(bests[0], basic)
+        self.assertEqual(bests, sorted(bests, reverse=True))
+        self.assertEqual(c1.to_basic_gates().twoqubitcount(), stats.best)
+        self.assertGreater(stats.nodes, 0)
+
+        stats = LookaheadStats()
+        c2 = anytime_extract(g, node_budget=5, stats=stats)
+        self.assertTrue(c.verify_equality(c2))
+        self.assertLessEqual(stats.nodes, 5)
+        c3 = anytime_extract(g, time_budget=0)
+        self.assertTrue(c.verify_equality(c3))
+        self.assertLessEqual(c3.to_basic_gates().twoqubitcount(), basic)
 
 
 if __name__ == '__main__':
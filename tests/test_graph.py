@@ -26,7 +26,8 @@ if __name__ == '__main__':
 
 from pyzx.graph import Graph
 from pyzx.utils import EdgeType, VertexType
-from pyzx.generate import identity
+from pyzx.generate import identity, cliffordT
+from pyzx.simplify import full_reduce
 
 import numpy as np
 from pyzx.tensor import compare_tensors
@@ -172,6 +173,36 @@ class TestGraphBasicMethods(unittest.TestCase):
                         self.assertEqual(g2.num_vertices(),0)
                         self.assertTrue(compare_tensors(g,g2))
 
+class TestGraphArray(unittest.TestCase):
+
+    def test_vertices_and_edges(self):
+        g = Graph(backend='array')
+        v1, v2, v3 = g.add_vertices(3)
+        g.set_qubit(v1, 0.5)
+        g.add_edges([(v1,v2),(v2,v3)], EdgeType.HADAMARD)
+        self.assertEqual(g.num_edges(), 2)
+        self.assertEqual(set(g.neighbors(v2)), {v1,v3})
+        self.assertEqual(g.edge_type(g.edge(v3,v2)), EdgeType.HADAMARD)
+        self.assertEqual(g.qubit(v1), 0.5)
+        self.assertEqual(g.qubit(v2), -1)
+        self.assertEqual(dict(g.qubits()), {v1: 0.5})
+        g.remove_vertex(v3)
+        self.assertEqual(g.num_vertices(), 2)
+        self.assertFalse(v3 in g.vertices())
+        self.assertEqual(list(g.edges()), [(v1,v2)])
+        self.assertEqual(g.add_vertex(VertexType.Z), v3)
+        self.assertEqual(g.vertex_degree(v3), 0)
+
+    def test_copy_between_backends(self):
+        c = cliffordT(3, 30)
+        g = c.copy(backend='array')
+        self.assertEqual(g.backend, 'array')
+        self.assertTrue(compare_tensors(c, g))
+        g2 = g.clone()
+        full_reduce(g2)
+        self.assertTrue(compare_tensors(g, g2.copy(backend='simple')))
+
+
 class TestGraphCircuitMethods(unittest.TestCase):
 
     def setUp(self):
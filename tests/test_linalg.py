@@ -16,12 +16,13 @@
 
 
 import unittest
+import random
 import sys
 if __name__ == '__main__':
     sys.path.append('..')
     sys.path.append('.')
 
-from pyzx.linalg import Mat2
+from pyzx.linalg import Mat2, CNOTMaker
 
 
 class TestMat2(unittest.TestCase):
@@ -81,5 +82,24 @@ class TestMat2(unittest.TestCase):
         self.assertEqual(m1.rows(),self.m3.rank())
         self.assertEqual(m0*m1, self.m3)
 
+    def test_packed_matches_reference(self):
+        random.seed(1337)
+        for _ in range(50):
+            r, c = random.randint(1,10), random.randint(1,10)
+            d = [[random.randint(0,1) for _ in range(c)] for _ in range(r)]
+            full_reduce = random.random() < 0.5
+            blocksize = random.randint(1,6)
+            results = []
+            for packed in (True, False):
+                m = Mat2([list(row) for row in d])
+                m.packed = packed
+                x, y, cn = Mat2.id(r), Mat2.id(r), CNOTMaker()
+                rank = m.gauss(full_reduce=full_reduce, x=x, y=y, blocksize=blocksize, pivot_cols=[])
+                m = Mat2([list(row) for row in d])
+                m.packed = packed
+                m.gauss(full_reduce=full_reduce, x=cn, blocksize=blocksize, pivot_cols=[])
+                results.append((rank, m.data, x.data, y.data, [str(g) for g in cn.cnots]))
+            self.assertEqual(results[0], results[1])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,110 @@
+# PyZX - Python library for quantum circuit rewriting 
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+import random
+import sys
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx.linalg import Mat2, CNOTMaker
+
+try:
+    from pyzx import linalg_c
+except ImportError:
+    linalg_c = None
+
+
+def random_matrix(rows, cols):
+    return [[random.randint(0,1) for _ in range(cols)] for _ in range(rows)]
+
+def reference(data):
+    m = Mat2([list(row) for row in data])
+    m.packed = False
+    return m
+
+
+@unittest.skipUnless(linalg_c, "the compiled extension pyzx.linalg_c needs to be built for this to run")
+class TestMat2Compiled(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(42)
+        self.matrices = [random_matrix(random.randint(1,12), random.randint(1,12)) for _ in range(60)]
+        self.matrices += [random_matrix(n, n) for n in range(1, 9) for _ in range(5)]
+
+    def test_gauss(self):
+        for d in self.matrices:
+            for full_reduce in (False, True):
+                for blocksize in (1, 3, 6, 70):
+                    m, c = reference(d), linalg_c.Mat2(d)
+                    x, cx = CNOTMaker(), CNOTMaker()
+                    y, cy = Mat2.id(len(d)), linalg_c.Mat2.id(len(d))
+                    y.packed = False
+                    p, cp = [], []
+                    rank = m.gauss(full_reduce=full_reduce, x=x, y=y, blocksize=blocksize, pivot_cols=p)
+                    crank = c.gauss(full_reduce=full_reduce, x=cx, y=cy, blocksize=blocksize, pivot_cols=cp)
+                    self.assertEqual(rank, crank)
+                    self.assertEqual(m.data, c.tolist())
+                    self.assertEqual(y.data, cy.tolist())
+                    self.assertEqual(p, cp)
+                    self.assertEqual([str(g) for g in x.cnots], [str(g) for g in cx.cnots])
+
+    def test_rank_inverse_factor(self):
+        for d in self.matrices:
+            m, c = reference(d), linalg_c.Mat2(d)
+            self.assertEqual(m.rank(), c.rank())
+            inv, cinv = m.inverse(), c.inverse()
+            self.assertEqual(inv is None, cinv is None)
+            if inv is not None:
+                self.assertEqual(inv.data, cinv.tolist())
+            (m0, m1), (c0, c1) = m.factor(), c.factor()
+            self.assertEqual(m0.data, c0.tolist())
+            self.assertEqual(m1.data, c1.tolist())
+            self.assertEqual(c0 * c1, c)
+
+    def test_solve_nullspace(self):
+        for d in self.matrices:
+            m, c = reference(d), linalg_c.Mat2(d)
+            b = random_matrix(len(d), 1)
+            sol, csol = m.solve(reference(b)), c.solve(linalg_c.Mat2(b))
+            self.assertEqual(sol is None, csol is None)
+            if sol is not None:
+                self.assertEqual(sol.data, csol.tolist())
+            self.assertEqual(m.nullspace(), c.nullspace())
+
+    def test_to_cnots(self):
+        for d in self.matrices:
+            if len(d) != len(d[0]) or reference(d).inverse() is None: continue
+            for optimize in (False, True):
+                cnots = reference(d).to_cnots(optimize=optimize)
+                ccnots = linalg_c.Mat2(d).to_cnots(optimize=optimize)
+                self.assertEqual([str(g) for g in cnots], [str(g) for g in ccnots])
+
+    def test_dispatch(self):
+        for d in self.matrices:
+            m, c = reference(d), Mat2([list(row) for row in d])
+            self.assertTrue(c.compiled)
+            x, y, cx, cy = Mat2.id(len(d)), Mat2.id(len(d)), Mat2.id(len(d)), Mat2.id(len(d))
+            x.packed = y.packed = False
+            self.assertEqual(m.gauss(full_reduce=True, x=x, y=y, pivot_cols=[]),
+                             c.gauss(full_reduce=True, x=cx, y=cy, pivot_cols=[]))
+            self.assertEqual((m.data, x.data, y.data), (c.data, cx.data, cy.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
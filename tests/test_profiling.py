@@ -0,0 +1,105 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+import sys
+import json
+import random
+from types import ModuleType
+from typing import Optional
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+
+from pyzx import profiling
+from pyzx.generate import CNOT_HAD_PHASE_circuit
+from pyzx.simplify import full_reduce, spider_simp
+from pyzx.extract import extract_circuit
+from pyzx.optimize import basic_optimization
+
+np: Optional[ModuleType]
+try:
+    import numpy as np
+    from pyzx.tensor import tensorfy
+except ImportError:
+    np = None
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(1)
+        self.circuit = CNOT_HAD_PHASE_circuit(4, 60, p_had=0.2, p_t=0.3)
+
+    def test_inactive_by_default(self):
+        self.assertIsNone(profiling.active)
+        prof = profiling.Profiler()
+        full_reduce(self.circuit.to_graph())
+        self.assertEqual(prof.times, {})
+
+    def test_sections_and_phases(self):
+        g = self.circuit.to_graph()
+        with profiling.profile() as prof:
+            self.assertIs(profiling.active, prof)
+            full_reduce(g)
+            c = extract_circuit(g)
+            basic_optimization(c.to_basic_gates())
+        self.assertIsNone(profiling.active)
+        self.assertEqual(prof.stack, [])
+
+        self.assertIn(('full_reduce',), prof.times)
+        self.assertIn(('full_reduce', 'interior_clifford_simp', 'spider_simp', 'match'), prof.times)
+        self.assertIn(('full_reduce', 'interior_clifford_simp', 'spider_simp', 'add_edge_table'), prof.times)
+        self.assertIn(('extract_circuit', 'clean_frontier'), prof.times)
+        self.assertIn(('extract_circuit', 'apply_cnots'), prof.times)
+        self.assertIn(('basic_optimization', 'forward_pass'), prof.times)
+        self.assertGreater(prof.calls[('extract_circuit', 'apply_cnots')], 1)
+        self.assertTrue(all(n > 0 for n in prof.matches['spider_simp']))
+        labels = {s['label'] for s in prof.samples}
+        self.assertTrue({'spider_simp', 'extract_circuit', 'basic_optimization'} <= labels)
+
+        # A section takes at least as long as its phases
+        for path, t in prof.self_times().items():
+            self.assertGreater(t, -1e-6, path)
+        totals = prof.totals()
+        self.assertAlmostEqual(totals['full_reduce'], prof.times[('full_reduce',)])
+
+        data = json.loads(prof.to_json())
+        self.assertEqual(len(data['sections']), len(prof.times))
+        self.assertEqual(data['matches'], prof.matches)
+
+        for line in prof.collapsed().splitlines():
+            stack, us = line.rsplit(' ', 1)
+            self.assertTrue(stack)
+            self.assertGreater(int(us), 0)
+
+    def test_single_rule(self):
+        with profiling.profile() as prof:
+            spider_simp(self.circuit.to_graph())
+        self.assertEqual(prof.calls[('spider_simp',)], 1)
+        self.assertEqual(len(prof.matches['spider_simp']), prof.calls[('spider_simp', 'rewrite')])
+
+    @unittest.skipUnless(np, "numpy needs to be installed for this to run")
+    def test_tensorfy(self):
+        with profiling.profile() as prof:
+            tensorfy(self.circuit.to_graph())
+        self.assertIn(('tensorfy', 'plan_contraction'), prof.times)
+        self.assertIn(('tensorfy', 'contract'), prof.times)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -56,6 +56,47 @@ class TestScripts(unittest.TestCase):
         os.remove('tests/other_name.bla')
         sys.stdout = sys.__stdout__
 
+    def test_optimize_with_cache(self):
+        import tempfile
+        sys.stdout = io.StringIO()
+        with tempfile.TemporaryDirectory() as d:
+            main('fakepath opt -d tests/cached.qasm -t qasm --cache {} tests/test_circuit.circuit'.format(d).split())
+            with open('tests/cached.qasm') as f: first = f.read()
+            os.remove('tests/cached.qasm')
+            self.assertEqual(len(os.listdir(d)), 1)
+            main('fakepath opt -d tests/cached.qasm -t qasm --cache {} tests/test_circuit.circuit'.format(d).split())
+            with open('tests/cached.qasm') as f: second = f.read()
+            os.remove('tests/cached.qasm')
+        sys.stdout = sys.__stdout__
+        self.assertEqual(first, second)
+
+    def test_batch_optimize(self):
+        import tempfile, csv, json
+        sys.stdout = io.StringIO()
+        sys.stderr = io.StringIO()
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                with open(os.path.join(d, 'broken.qasm'), 'w') as f: f.write('not a circuit')
+                out = os.path.join(d, 'out')
+                results = os.path.join(d, 'results.csv')
+                main(['fakepath', 'opt', '-j', '2', '-d', out, '-o', results, '-t', 'qasm',
+                      'tests/*.circuit', os.path.join(d, 'broken.qasm')])
+                with open(results) as f:
+                    rows = {os.path.basename(r['file']): r for r in csv.DictReader(f)}
+                self.assertEqual(rows['test_circuit.circuit']['status'], 'ok')
+                self.assertEqual(rows['test_circuit.circuit']['tcount_after'], '8')
+                self.assertEqual(rows['broken.qasm']['status'], 'error')
+                self.assertTrue(os.path.isfile(os.path.join(out, 'test_circuit.qasm')))
+
+                results = os.path.join(d, 'results.jsonl')
+                main(['fakepath', 'opt', '--timeout', '0.000001', '-o', results, 'circuits/Fast/adder_8_before'])
+                with open(results) as f:
+                    rows = [json.loads(l) for l in f]
+                self.assertEqual([r['status'] for r in rows], ['timeout'])
+        finally:
+            sys.stdout = sys.__stdout__
+            sys.stderr = sys.__stderr__
+
     def test_tikz_conversion(self):
         sys.stdout = io.StringIO()
         main('fakepath tikz tests/test_circuit.circuit tests/tikz_circuit.tikz'.split())
@@ -32,7 +32,7 @@ from pyzx.circuit.qasmparser import qasm
 from fractions import Fraction
 from pyzx.generate import cliffordT
 from pyzx.simplify import *
-from pyzx.simplify import supplementarity_simp, to_clifford_normal_form_graph
+from pyzx.simplify import supplementarity_simp, to_clifford_normal_form_graph, Worklist
 from pyzx import compare_tensors
 from pyzx.generate import cliffordT
 
@@ -87,6 +87,17 @@ class TestSimplify(unittest.TestCase):
     def test_clifford_simp(self):
         self.func_test(clifford_simp)
 
+    def test_worklist(self):
+        for func in [spider_simp, id_simp, clifford_simp, full_reduce]:
+            for i,c in enumerate(self.circuits):
+                with self.subTest(i=i, func=func.__name__):
+                    g = c.copy()
+                    t = tensorfy(g)
+                    worklist = Worklist(g, full_rescan=True)
+                    func(g, quiet=True, worklist=worklist)
+                    self.assertEqual(worklist.missed, 0)
+                    self.assertTrue(compare_tensors(t,tensorfy(g)))
+
     def test_supplementarity_simp(self):
         g = Graph()
         v = g.add_vertex(1,0,0,phase=Fraction(1,4))
@@ -19,6 +19,9 @@ import sys
 import random
 from types import ModuleType
 from typing import Optional
+import os
+import tempfile
+import itertools
 
 if __name__ == '__main__':
     sys.path.append('..')
@@ -26,12 +29,16 @@ if __name__ == '__main__':
 from pyzx.circuit import Circuit
 from pyzx.graph import Graph, EdgeType, Scalar
 from pyzx.simulate import (
+    SumGraph,
     replace_magic_states,
     cut_vertex,
     cut_edge,
-    gen_catlike_term
+    gen_catlike_term,
+    stream_stabilizer_terms,
+    stabilizer_amplitude,
+    Simulator
 )
-from pyzx.generate import cliffords
+from pyzx.generate import cliffords, CNOT_HAD_PHASE_circuit
 from pyzx.simplify import full_reduce
 
 np: Optional[ModuleType]
@@ -117,6 +124,80 @@ class TestSimulate(unittest.TestCase):
         # Check if the scalar from generated term is correct
         self.assertTrue(G.scalar.to_number() == s.to_number())
 
+    def test_parallel_sum_evaluation(self):
+        random.seed(2)
+        g = CNOT_HAD_PHASE_circuit(6, 140, p_had=0.2, p_t=0.3).to_graph()
+        g.apply_state('0'*6)
+        g.apply_effect('0'*6)
+        full_reduce(g)
+        expected = g.to_tensor().flatten()[0]
+        gsum = replace_magic_states(g)
+        self.assertAlmostEqual(gsum.to_number(), expected)
+        self.assertAlmostEqual(gsum.to_number(workers=2, chunksize=2), expected)
+        self.assertTrue(np.allclose(gsum.to_tensor(workers=2), gsum.to_tensor()))
+        gsum.graphs[0].scalar.is_zero = True
+        gsum2 = SumGraph([h.copy() for h in gsum.graphs])
+        gsum.full_reduce()
+        gsum2.full_reduce(workers=2, chunksize=1)
+        self.assertEqual(len(gsum.graphs), len(gsum2.graphs))
+        self.assertAlmostEqual(gsum.to_number(), gsum2.to_number())
+
+    def test_streaming_stabilizer_decomposition(self):
+        random.seed(1)
+        g = CNOT_HAD_PHASE_circuit(8, 150, p_had=0.25, p_t=0.3).to_graph()
+        g.apply_state('0'*8)
+        g.apply_effect('0'*8)
+        expected = g.to_tensor().flatten()[0]
+        terms = list(stream_stabilizer_terms(g))
+        self.assertGreater(len(terms), 10)
+        self.assertAlmostEqual(sum(h.scalar.to_number() for _, h in terms), expected)
+        self.assertAlmostEqual(stabilizer_amplitude(g), expected)
+        # Resuming after any term should give the remaining terms
+        path = terms[4][0]
+        self.assertEqual([p for p, _ in stream_stabilizer_terms(g, path)], [p for p, _ in terms[5:]])
+
+        with tempfile.TemporaryDirectory() as d:
+            checkpoint = os.path.join(d, 'amplitude.json')
+            partial = stabilizer_amplitude(g, checkpoint=checkpoint, max_terms=7)
+            self.assertNotAlmostEqual(partial, expected)
+            for _ in range(len(terms)):
+                value = stabilizer_amplitude(g, checkpoint=checkpoint, max_terms=7)
+            self.assertAlmostEqual(value, expected)
+
+    def test_simulator_amplitudes_and_marginals(self):
+        random.seed(3)
+        c = CNOT_HAD_PHASE_circuit(5, 100, p_had=0.25, p_t=0.3)
+        g = c.to_graph()
+        g.apply_state('00000')
+        psi = g.to_tensor()
+        bitstrings = [''.join(b) for b in itertools.product('01', repeat=5)]
+        expected = np.array([psi[tuple(int(x) for x in b)] for b in bitstrings])
+        sim = Simulator(c)
+        self.assertTrue(np.allclose(sim.amplitudes(bitstrings), expected))
+        # Force evaluation by stabilizer decomposition
+        sim2 = Simulator(c, max_width=0)
+        self.assertTrue(np.allclose(sim2.amplitudes(bitstrings[:4] + bitstrings[:2]), np.concatenate([expected[:4], expected[:2]])))
+        probs = np.abs(psi)**2
+        marginals = sim.marginals([1, 3])
+        for k, p in marginals.items():
+            self.assertAlmostEqual(p, probs[:, int(k[0]), :, int(k[1]), :].sum())
+        self.assertAlmostEqual(sim.marginal({2: '1'}), probs[:, :, 1].sum())
+        with self.assertRaises(ValueError):
+            sim.amplitude('012')
+
+    def test_parallel_simulator(self):
+        random.seed(4)
+        c = CNOT_HAD_PHASE_circuit(4, 60, p_had=0.25, p_t=0.3)
+        bitstrings = [''.join(b) for b in itertools.product('01', repeat=4)]
+        outcomes = [{0: '1'}, {1: '0', 3: '1'}, {0: '0', 1: '1', 2: '0', 3: '1'}]
+        serial = Simulator(c)
+        parallel = Simulator(c, workers=2)
+        self.assertTrue(np.allclose(parallel.amplitudes(bitstrings), serial.amplitudes(bitstrings)))
+        self.assertTrue(np.allclose(parallel.marginals_of(outcomes), serial.marginals_of(outcomes)))
+        marginals = serial.marginals([0, 2])
+        for k, p in parallel.marginals([0, 2]).items():
+            self.assertAlmostEqual(p, marginals[k])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,143 @@
+# PyZX - Python library for quantum circuit rewriting
+#        and optimization using the ZX-calculus
+# Copyright (C) 2018 - Aleks Kissinger and John van de Wetering
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+import random
+import sys
+from fractions import Fraction
+from types import ModuleType
+from typing import Optional
+
+if __name__ == '__main__':
+    sys.path.append('..')
+    sys.path.append('.')
+from pyzx.circuit import Circuit
+from pyzx.generate import CNOT_HAD_PHASE_circuit
+from pyzx.simplify import full_reduce
+from pyzx.extract import extract_circuit
+
+np: Optional[ModuleType]
+try:
+    import numpy as np
+    from pyzx.circuit.statevector import (simulate, fuse_gates, random_state, random_stabilizer_state,
+                                          EquivalenceChecker)
+except ImportError:
+    np = None
+
+SEED = 1337
+
+
+@unittest.skipUnless(np, "numpy needs to be installed for this to run")
+class TestStatevector(unittest.TestCase):
+
+    def assertEqualUpToPhase(self, s1, s2):
+        self.assertAlmostEqual(abs(np.vdot(s1, s2)), 1)
+
+    def test_against_matrix(self):
+        random.seed(SEED)
+        for q in (2, 3, 5):
+            c = CNOT_HAD_PHASE_circuit(q, 60, p_had=0.2, p_t=0.3)
+            c.add_gate('SWAP', 0, q-1)
+            c.add_gate('YPhase', 1, phase=Fraction(1,3))
+            c.add_gate('CRZ', 1, 0, phase=Fraction(1,3))
+            c.add_gate('U3', 0, theta=Fraction(1,5), phi=Fraction(1,3), rho=Fraction(1,7))
+            if q > 2:
+                c.add_gate('CCZ', 0, 1, q-1)
+                c.add_gate('TOF', q-1, 0, 1)
+            m = c.to_matrix()
+            state = random_state(q, SEED)
+            for max_qubits in (1, 2, 5):
+                self.assertEqualUpToPhase(simulate(c, state, max_qubits=max_qubits), m @ state)
+            self.assertEqualUpToPhase(simulate(c), m[:, 0])
+
+    def test_fusion(self):
+        c = Circuit(4)
+        for q in range(4):
+            c.add_gate('HAD', q)
+        c.add_gate('CZ', 0, 1)
+        c.add_gate('CZ', 2, 3)
+        c.add_gate('T', 1)
+        c.add_gate('CCZ', 0, 2, 3)
+        c.add_gate('CNOT', 0, 1)
+        gates = fuse_gates(c, max_qubits=1, max_diagonal_qubits=4)
+        self.assertEqual([g.size for g in gates], [1, 1, 1, 1, 2, 2, 1])
+        self.assertTrue(gates[4].diagonal and gates[5].diagonal)
+        self.assertEqual(gates[5].qubits, (0, 2, 3))
+        self.assertFalse(gates[6].diagonal)
+        gates = fuse_gates(c, max_qubits=4)
+        self.assertEqual(len(gates), 4)
+        self.assertEqual(sum(g.size for g in gates), len(c.gates))
+
+    def test_inplace(self):
+        random.seed(SEED)
+        c = CNOT_HAD_PHASE_circuit(6, 40)
+        state = random_state(6, SEED, product=True)
+        self.assertAlmostEqual(np.linalg.norm(state), 1)
+        out = simulate(c, state)
+        self.assertFalse(np.allclose(out, state))
+        self.assertTrue(np.shares_memory(simulate(c, state, inplace=True), state))
+        self.assertTrue(np.allclose(out, state))
+        with self.assertRaises(ValueError):
+            simulate(c, np.ones(8))
+        c.add_gate('Measurement', 0, 0)
+        with self.assertRaises(TypeError):
+            simulate(c)
+
+    def test_stabilizer_state(self):
+        state = random_stabilizer_state(4, SEED)
+        amplitudes = np.abs(state[np.abs(state) > 1e-9])
+        self.assertTrue(np.allclose(amplitudes, amplitudes[0]))
+        self.assertAlmostEqual(np.linalg.norm(state), 1)
+
+    def test_equivalence_checker(self):
+        random.seed(SEED)
+        c = CNOT_HAD_PHASE_circuit(6, 150, p_had=0.2, p_t=0.3)
+        g = c.to_graph()
+        full_reduce(g)
+        extracted = extract_circuit(g.copy())
+        permuted = extract_circuit(g.copy(), up_to_perm=True)
+        wrong = extracted.copy()
+        wrong.add_gate('T', 3)
+        phase = c.copy()
+        for _ in range(2):
+            phase.add_gate('NOT', 0)
+            phase.add_gate('Z', 0)
+
+        checker = EquivalenceChecker()
+        self.assertTrue(checker.check(c, extracted))
+        self.assertFalse(checker.check(c, wrong))
+        self.assertTrue(checker.check(c, phase))
+        self.assertFalse(checker.check(c, phase, up_to_global_phase=False))
+        self.assertTrue(checker.check(c, permuted, up_to_swaps=True))
+        self.assertFalse(checker.check(c, wrong, up_to_swaps=True))
+        swapped = c.copy()
+        swapped.add_gate('SWAP', 1, 4)
+        self.assertFalse(checker.check(c, swapped))
+        self.assertTrue(checker.check(c, swapped, up_to_swaps=True))
+        # The 6 circuits and the adjoints of c, permuted and wrong are each simulated once
+        self.assertEqual(checker.misses, 6 + 3)
+        self.assertGreater(checker.hits, 0)
+
+        self.assertTrue(c.verify_equality_random(extracted))
+        self.assertFalse(c.verify_equality_random(wrong))
+        stabilizer = EquivalenceChecker(states='stabilizer')
+        self.assertTrue(stabilizer.check(c, extracted))
+        self.assertFalse(EquivalenceChecker(max_cache_bytes=0).check(c, wrong))
+
+
+if __name__ == '__main__':
+    unittest.main()
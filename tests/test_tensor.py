@@ -20,19 +20,23 @@ import random
 import sys
 from types import ModuleType
 from typing import Optional
+from fractions import Fraction
 
 if __name__ == '__main__':
     sys.path.append('..')
     sys.path.append('.')
 from pyzx.graph import Graph
 from pyzx.graph.multigraph import Multigraph
-from pyzx.generate import cliffords
+from pyzx.generate import cliffords, CNOT_HAD_PHASE_circuit
+from pyzx.simplify import full_reduce
+from pyzx.extract import extract_circuit
 from pyzx.circuit import Circuit
 
 np: Optional[ModuleType]
 try:
     import numpy as np
-    from pyzx.tensor import tensorfy, compare_tensors, compose_tensors, adjoint
+    from pyzx.tensor import (tensorfy, compare_tensors, compose_tensors, adjoint, plan_contraction,
+                             circuit_unitaries, compare_circuits)
 except ImportError:
     np = None
 
@@ -174,5 +178,83 @@ class TestTensor(unittest.TestCase):
         g.add_edges([(i2, i2), (i2, i3)], 2)
         self.assertTrue(compare_tensors(g, np.array([[0,0],[1,0]])))
 
+    def test_contraction_methods_agree(self):
+        random.seed(SEED)
+        for i in range(10):
+            g = CNOT_HAD_PHASE_circuit(4, 30).to_graph()
+            if i % 2: full_reduce(g)
+            t = tensorfy(g, method='rows')
+            for method in ('greedy', 'elimination'):
+                with self.subTest(i=i, method=method):
+                    self.assertTrue(np.allclose(t, tensorfy(g, method=method)))
+
+    def test_auto_method_on_long_circuit(self):
+        random.seed(SEED)
+        c = CNOT_HAD_PHASE_circuit(6, 800, p_had=0.3, p_t=0.2)
+        g = c.to_graph()
+        t = tensorfy(g, method='rows')
+        self.assertTrue(np.allclose(t, tensorfy(g)))
+        # Without the scalar the values should still be of a reasonable size
+        self.assertGreater(np.abs(tensorfy(g, False)).max(), 10**-6)
+        self.assertTrue(compare_tensors(c, t))
+
+    def test_plan_wide_amplitude(self):
+        random.seed(SEED)
+        c = CNOT_HAD_PHASE_circuit(30, 60)
+        g = c.to_graph()
+        g.compose(c.adjoint().to_graph())
+        g.apply_state('0'*30)
+        g.apply_effect('0'*30)
+        for method in ('greedy', 'elimination'):
+            plan = plan_contraction(g, method)
+            self.assertLess(plan.width, 20)
+            self.assertLess(plan.peak_memory, 10**8)
+            self.assertGreater(plan.flops, 0)
+            self.assertAlmostEqual(complex(plan.contract()), 1)
+
+    def test_circuit_unitaries(self):
+        random.seed(SEED)
+        circuits = [CNOT_HAD_PHASE_circuit(q, 30, p_had=0.2, p_t=0.2) for q in (2, 3, 3, 5)]
+        c = Circuit(3)
+        c.add_gate('SWAP', 0, 2)
+        c.add_gate('XPhase', 1, phase=Fraction(1,3))
+        c.add_gate('CCZ', 0, 1, 2)
+        c.add_gate('CNOT', 2, 0)
+        circuits.append(c)
+        # A batch with the same structure of 2-qubit gates
+        for phase in (Fraction(1,4), Fraction(3,8)):
+            c2 = c.copy()
+            c2.add_gate('ZPhase', 1, phase=phase)
+            circuits.append(c2)
+        for c, u in zip(circuits, circuit_unitaries(circuits, max_bytes=2**12)):
+            self.assertTrue(np.allclose(u, c.to_matrix()))
+
+    def test_compare_circuits(self):
+        random.seed(SEED)
+        pairs = []
+        for q in (2, 4, 4):
+            c = CNOT_HAD_PHASE_circuit(q, 40, p_had=0.2, p_t=0.2)
+            g = c.to_graph()
+            full_reduce(g)
+            pairs.append((c, extract_circuit(g)))
+        c = pairs[1][0]
+        wrong = c.copy()
+        wrong.add_gate('T', 0)
+        pairs.append((c, wrong))
+        phase = c.copy()
+        phase.add_gate('NOT', 1)
+        phase.add_gate('Z', 1)
+        phase.add_gate('NOT', 1)
+        phase.add_gate('Z', 1)
+        pairs.append((c, phase))
+        passed, scalars = compare_circuits(pairs)
+        self.assertEqual(list(passed), [True, True, True, False, True])
+        self.assertAlmostEqual(scalars[4], -1)
+        passed, scalars = compare_circuits(pairs, preserve_scalar=True)
+        self.assertFalse(passed[4])
+        self.assertFalse(passed[3])
+        with self.assertRaises(TypeError):
+            compare_circuits([(pairs[0][0], c)])
+
 if __name__ == '__main__':
     unittest.main()